@@ -1,27 +1,91 @@
 # -*- coding: utf-8 -*-
 # Agent Module
-from .medical_agent import *
+# 子模块按需加载 (PEP 562): 仅在首次访问导出名称时才导入对应模块，
+# 只需要异常类的调用方不会连带加载意图分类、知识库等重型模块
+import importlib
 
 __all__ = [
     "IntentType", "SkillPriority", "IntentResult", "SkillRequest", "SkillResponse",
     "DialogueContext", "IntentClassifier", "SkillInvoker", "MedicalAgent",
-    "ResponseFormatter", "HealthKnowledgeBase"
+    "ResponseFormatter", "HealthKnowledgeBase",
+    # Exceptions
+    "MedicalAgentError", "IntentClassificationError", "KnowledgeBaseError",
+    "SkillInvocationError", "SafetyCheckError", "EmergencyDetectedError",
+    "SessionError", "ConfigurationError",
+    # Monitoring
+    "MetricsCollector", "NullMetricsCollector", "get_metrics_collector", "track_time", "track_counter",
+    # User Profile
+    "UserProfile", "ProfileUpdate", "UserProfileBuilder", "create_profile", "create_default_profile",
 ]
 
-# 导入新增模块
-try:
-    from .exceptions import *
-    from .monitoring import MetricsCollector, get_metrics_collector, track_time, track_counter
-    from .user_profile import UserProfile, ProfileUpdate, UserProfileBuilder, create_profile, create_default_profile
-    __all__.extend([
-        # Exceptions
-        "MedicalAgentError", "IntentClassificationError", "KnowledgeBaseError",
-        "SkillInvocationError", "SafetyCheckError", "EmergencyDetectedError",
-        "SessionError", "ConfigurationError",
-        # Monitoring
-        "MetricsCollector", "get_metrics_collector", "track_time", "track_counter",
-        # User Profile
-        "UserProfile", "ProfileUpdate", "UserProfileBuilder", "create_profile", "create_default_profile",
-    ])
-except ImportError:
-    pass
+_MEDICAL_AGENT = ".medical_agent"
+_EXCEPTIONS = ".exceptions"
+_MONITORING = ".monitoring"
+_USER_PROFILE = ".user_profile"
+
+# 导出名称 -> 所在子模块
+_LAZY_EXPORTS = {
+    # Medical Agent
+    "IntentType": _MEDICAL_AGENT,
+    "SkillPriority": _MEDICAL_AGENT,
+    "IntentResult": _MEDICAL_AGENT,
+    "SkillRequest": _MEDICAL_AGENT,
+    "SkillResponse": _MEDICAL_AGENT,
+    "DialogueContext": _MEDICAL_AGENT,
+    "IntentClassifier": _MEDICAL_AGENT,
+    "SkillInvoker": _MEDICAL_AGENT,
+    "MedicalAgent": _MEDICAL_AGENT,
+    "ResponseFormatter": _MEDICAL_AGENT,
+    "HealthKnowledgeBase": _MEDICAL_AGENT,
+    # Exceptions
+    "ErrorSeverity": _EXCEPTIONS,
+    "MedicalAgentError": _EXCEPTIONS,
+    "IntentClassificationError": _EXCEPTIONS,
+    "AmbiguousIntentError": _EXCEPTIONS,
+    "KnowledgeBaseError": _EXCEPTIONS,
+    "KnowledgeNotFoundError": _EXCEPTIONS,
+    "KnowledgeLoadError": _EXCEPTIONS,
+    "SkillInvocationError": _EXCEPTIONS,
+    "SkillNotFoundError": _EXCEPTIONS,
+    "SkillTimeoutError": _EXCEPTIONS,
+    "SafetyCheckError": _EXCEPTIONS,
+    "DrugInteractionError": _EXCEPTIONS,
+    "DrugAllergyError": _EXCEPTIONS,
+    "DrugDoseError": _EXCEPTIONS,
+    "ContraindicationError": _EXCEPTIONS,
+    "EmergencyAction": _EXCEPTIONS,
+    "EmergencyDetectedError": _EXCEPTIONS,
+    "SessionError": _EXCEPTIONS,
+    "SessionNotFoundError": _EXCEPTIONS,
+    "SessionExpiredError": _EXCEPTIONS,
+    "ConfigurationError": _EXCEPTIONS,
+    "format_error_for_user": _EXCEPTIONS,
+    "lazy_format_error_for_user": _EXCEPTIONS,
+    "get_error_recovery_suggestion": _EXCEPTIONS,
+    # Monitoring
+    "MetricsCollector": _MONITORING,
+    "NullMetricsCollector": _MONITORING,
+    "get_metrics_collector": _MONITORING,
+    "track_time": _MONITORING,
+    "track_counter": _MONITORING,
+    # User Profile
+    "UserProfile": _USER_PROFILE,
+    "ProfileUpdate": _USER_PROFILE,
+    "UserProfileBuilder": _USER_PROFILE,
+    "create_profile": _USER_PROFILE,
+    "create_default_profile": _USER_PROFILE,
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 缓存到模块命名空间，后续访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -4,9 +4,12 @@
 定义所有医疗Agent相关的异常类型
 """
 
-from typing import Optional, List, Dict, Any
+import sys
+from typing import Optional, List, Dict, Any, Callable, Sequence
 from enum import Enum
 from dataclasses import dataclass
+from functools import cached_property
+from weakref import WeakKeyDictionary
 
 
 class ErrorSeverity(Enum):
@@ -17,6 +20,34 @@ class ErrorSeverity(Enum):
     CRITICAL = "critical"   # 严重，需要立即处理
 
 
+# 错误码与风险类型为有限集合，统一驻留(intern)后在字典/比较中可走身份判等快速路径
+_INT = sys.intern
+
+_CODE_INTENT_001 = _INT("INTENT_001")
+_CODE_INTENT_002 = _INT("INTENT_002")
+_CODE_KNOWLEDGE_001 = _INT("KNOWLEDGE_001")
+_CODE_KNOWLEDGE_002 = _INT("KNOWLEDGE_002")
+_CODE_KNOWLEDGE_003 = _INT("KNOWLEDGE_003")
+_CODE_SKILL_001 = _INT("SKILL_001")
+_CODE_SKILL_002 = _INT("SKILL_002")
+_CODE_SKILL_003 = _INT("SKILL_003")
+_CODE_SAFETY_001 = _INT("SAFETY_001")
+_CODE_EMERGENCY_001 = _INT("EMERGENCY_001")
+_CODE_SESSION_001 = _INT("SESSION_001")
+_CODE_SESSION_002 = _INT("SESSION_002")
+_CODE_SESSION_003 = _INT("SESSION_003")
+_CODE_CONFIG_001 = _INT("CONFIG_001")
+
+_RISK_DRUG_INTERACTION = _INT("drug_interaction")
+_RISK_ALLERGY = _INT("allergy")
+_RISK_DOSE = _INT("dose")
+_RISK_CONTRAINDICATION = _INT("contraindication")
+
+
+# 需要向用户致歉的严重级别
+_SEVERE = frozenset({ErrorSeverity.CRITICAL, ErrorSeverity.ERROR})
+
+
 # ============================================================
 # 基础异常类
 # ============================================================
@@ -27,6 +58,8 @@ class MedicalAgentError(Exception):
     所有自定义异常的父类
     """
 
+    __slots__ = ('message', 'error_code', 'severity', 'details', '_severity_value', '_cached_dict')
+
     def __init__(
         self,
         message: str,
@@ -38,17 +71,34 @@ class MedicalAgentError(Exception):
         self.message = message
         self.error_code = error_code or self.__class__.__name__
         self.severity = severity
-        self.details = details or {}
+        self._severity_value = severity.value
+        self.details = details if details is not None else {}
+        self._cached_dict: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def _build_details(base: Optional[Dict[str, Any]], **extra: Any) -> Dict[str, Any]:
+        """
+        合并详情字典
+
+        复制一次调用方传入的 details（不修改原字典），并写入值不为 None 的附加字段
+        """
+        details = {} if base is None else dict(base)
+        for key, value in extra.items():
+            if value is not None:
+                details[key] = value
+        return details
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
-            "error_type": self.__class__.__name__,
-            "error_code": self.error_code,
-            "message": self.message,
-            "severity": self.severity.value,
-            "details": self.details
-        }
+        """转换为字典（首次调用后缓存，异常构造完成后状态视为不可变）"""
+        if self._cached_dict is None:
+            self._cached_dict = {
+                "error_type": self.__class__.__name__,
+                "error_code": self.error_code,
+                "message": self.message,
+                "severity": self._severity_value,
+                "details": self.details
+            }
+        return self._cached_dict
 
     def __str__(self) -> str:
         return f"[{self.error_code}] {self.message}"
@@ -64,27 +114,28 @@ class IntentClassificationError(MedicalAgentError):
     当意图分类失败或置信度过低时抛出
     """
 
+    __slots__ = ('input_text', 'confidence', 'alternatives')
+
     def __init__(
         self,
         message: str,
         input_text: Optional[str] = None,
         confidence: Optional[float] = None,
         alternatives: Optional[List[Dict]] = None,
-        **kwargs
+        error_code: str = _CODE_INTENT_001,
+        severity: ErrorSeverity = ErrorSeverity.WARNING,
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        if input_text:
-            details['input_text'] = input_text[:100]  # 限制长度
-        if confidence is not None:
-            details['confidence'] = confidence
-        if alternatives:
-            details['alternatives'] = alternatives
-
         super().__init__(
             message=message,
-            error_code="INTENT_001",
-            severity=ErrorSeverity.WARNING,
-            details=details
+            error_code=error_code,
+            severity=severity,
+            details=self._build_details(
+                details,
+                input_text=input_text[:100] if input_text else None,  # 限制长度
+                confidence=confidence,
+                alternatives=alternatives or None
+            )
         )
         self.input_text = input_text
         self.confidence = confidence
@@ -97,20 +148,19 @@ class AmbiguousIntentError(IntentClassificationError):
     当多个意图具有相似置信度时抛出
     """
 
+    __slots__ = ('candidate_intents',)
+
     def __init__(
         self,
         message: str,
         candidate_intents: List[Dict[str, Any]],
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        details['candidate_intents'] = candidate_intents
-
         super().__init__(
             message=message,
-            error_code="INTENT_002",
+            error_code=_CODE_INTENT_002,
             severity=ErrorSeverity.INFO,
-            details=details
+            details=self._build_details(details, candidate_intents=candidate_intents)
         )
         self.candidate_intents = candidate_intents
 
@@ -125,24 +175,22 @@ class KnowledgeBaseError(MedicalAgentError):
     当知识库加载、查询失败时抛出
     """
 
+    __slots__ = ('query', 'category')
+
     def __init__(
         self,
         message: str,
         query: Optional[str] = None,
         category: Optional[str] = None,
-        **kwargs
+        error_code: str = _CODE_KNOWLEDGE_001,
+        severity: ErrorSeverity = ErrorSeverity.ERROR,
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        if query:
-            details['query'] = query
-        if category:
-            details['category'] = category
-
         super().__init__(
             message=message,
-            error_code="KNOWLEDGE_001",
-            severity=ErrorSeverity.ERROR,
-            details=details
+            error_code=error_code,
+            severity=severity,
+            details=self._build_details(details, query=query or None, category=category or None)
         )
         self.query = query
         self.category = category
@@ -154,24 +202,21 @@ class KnowledgeNotFoundError(KnowledgeBaseError):
     当知识库中未找到相关条目时抛出
     """
 
+    __slots__ = ('suggestions',)
+
     def __init__(
         self,
         message: str,
         query: str,
         suggestions: Optional[List[str]] = None,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        details['query'] = query
-        if suggestions:
-            details['suggestions'] = suggestions
-
         super().__init__(
             message=message,
             query=query,
-            error_code="KNOWLEDGE_002",
+            error_code=_CODE_KNOWLEDGE_002,
             severity=ErrorSeverity.INFO,
-            details=details
+            details=self._build_details(details, query=query, suggestions=suggestions or None)
         )
         self.suggestions = suggestions or []
 
@@ -182,21 +227,19 @@ class KnowledgeLoadError(KnowledgeBaseError):
     当知识库文件加载失败时抛出
     """
 
+    __slots__ = ('file_path',)
+
     def __init__(
         self,
         message: str,
         file_path: Optional[str] = None,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        if file_path:
-            details['file_path'] = file_path
-
         super().__init__(
             message=message,
-            error_code="KNOWLEDGE_003",
+            error_code=_CODE_KNOWLEDGE_003,
             severity=ErrorSeverity.CRITICAL,
-            details=details
+            details=self._build_details(details, file_path=file_path or None)
         )
         self.file_path = file_path
 
@@ -211,25 +254,26 @@ class SkillInvocationError(MedicalAgentError):
     当Skill执行失败时抛出
     """
 
+    __slots__ = ('skill_name', 'input_data')
+
     def __init__(
         self,
         message: str,
         skill_name: Optional[str] = None,
         input_data: Optional[Dict] = None,
-        **kwargs
+        error_code: str = _CODE_SKILL_001,
+        severity: ErrorSeverity = ErrorSeverity.ERROR,
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        if skill_name:
-            details['skill_name'] = skill_name
-        if input_data:
-            # 限制输入数据大小
-            details['input_data'] = str(input_data)[:200]
-
         super().__init__(
             message=message,
-            error_code="SKILL_001",
-            severity=ErrorSeverity.ERROR,
-            details=details
+            error_code=error_code,
+            severity=severity,
+            details=self._build_details(
+                details,
+                skill_name=skill_name or None,
+                input_data=str(input_data)[:200] if input_data else None  # 限制输入数据大小
+            )
         )
         self.skill_name = skill_name
         self.input_data = input_data
@@ -241,24 +285,20 @@ class SkillNotFoundError(SkillInvocationError):
     当请求的Skill不存在时抛出
     """
 
+    __slots__ = ('available_skills',)
+
     def __init__(
         self,
         skill_name: str,
         available_skills: Optional[List[str]] = None,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        message = f"Skill '{skill_name}' not found"
-        details = kwargs.get('details', {})
-        details['skill_name'] = skill_name
-        if available_skills:
-            details['available_skills'] = available_skills
-
         super().__init__(
-            message=message,
+            message=f"Skill '{skill_name}' not found",
             skill_name=skill_name,
-            error_code="SKILL_002",
+            error_code=_CODE_SKILL_002,
             severity=ErrorSeverity.ERROR,
-            details=details
+            details=self._build_details(details, available_skills=available_skills or None)
         )
         self.available_skills = available_skills or []
 
@@ -268,22 +308,20 @@ class SkillTimeoutError(SkillInvocationError):
     Skill执行超时错误
     """
 
+    __slots__ = ('timeout_seconds',)
+
     def __init__(
         self,
         skill_name: str,
         timeout_seconds: float,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        message = f"Skill '{skill_name}' execution timed out after {timeout_seconds}s"
-        details = kwargs.get('details', {})
-        details['timeout_seconds'] = timeout_seconds
-
         super().__init__(
-            message=message,
+            message=f"Skill '{skill_name}' execution timed out after {timeout_seconds}s",
             skill_name=skill_name,
-            error_code="SKILL_003",
+            error_code=_CODE_SKILL_003,
             severity=ErrorSeverity.WARNING,
-            details=details
+            details=self._build_details(details, timeout_seconds=timeout_seconds)
         )
         self.timeout_seconds = timeout_seconds
 
@@ -298,21 +336,21 @@ class SafetyCheckError(MedicalAgentError):
     当检测到潜在的安全风险时抛出
     """
 
+    __slots__ = ('risk_type',)
+
     def __init__(
         self,
         message: str,
         risk_type: str,
         severity: ErrorSeverity = ErrorSeverity.ERROR,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        details['risk_type'] = risk_type
-
+        risk_type = _INT(risk_type)
         super().__init__(
             message=message,
-            error_code="SAFETY_001",
+            error_code=_CODE_SAFETY_001,
             severity=severity,
-            details=details
+            details=self._build_details(details, risk_type=risk_type)
         )
         self.risk_type = risk_type
 
@@ -323,23 +361,21 @@ class DrugInteractionError(SafetyCheckError):
     当检测到药物相互作用风险时抛出
     """
 
+    __slots__ = ('drugs', 'interaction_description')
+
     def __init__(
         self,
         message: str,
         drugs: List[str],
         interaction_description: str,
         severity: ErrorSeverity = ErrorSeverity.CRITICAL,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        details['drugs'] = drugs
-        details['interaction'] = interaction_description
-
         super().__init__(
             message=message,
-            risk_type="drug_interaction",
+            risk_type=_RISK_DRUG_INTERACTION,
             severity=severity,
-            details=details
+            details=self._build_details(details, drugs=drugs, interaction=interaction_description)
         )
         self.drugs = drugs
         self.interaction_description = interaction_description
@@ -350,22 +386,20 @@ class DrugAllergyError(SafetyCheckError):
     药物过敏风险错误
     """
 
+    __slots__ = ('drug', 'allergens')
+
     def __init__(
         self,
         message: str,
         drug: str,
         allergens: List[str],
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        details['drug'] = drug
-        details['allergens'] = allergens
-
         super().__init__(
             message=message,
-            risk_type="allergy",
+            risk_type=_RISK_ALLERGY,
             severity=ErrorSeverity.CRITICAL,
-            details=details
+            details=self._build_details(details, drug=drug, allergens=allergens)
         )
         self.drug = drug
         self.allergens = allergens
@@ -376,25 +410,26 @@ class DrugDoseError(SafetyCheckError):
     药物剂量错误
     """
 
+    __slots__ = ('drug', 'recommended_dose', 'actual_dose')
+
     def __init__(
         self,
         message: str,
         drug: str,
         recommended_dose: str,
         actual_dose: Optional[str] = None,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        details['drug'] = drug
-        details['recommended_dose'] = recommended_dose
-        if actual_dose:
-            details['actual_dose'] = actual_dose
-
         super().__init__(
             message=message,
-            risk_type="dose",
+            risk_type=_RISK_DOSE,
             severity=ErrorSeverity.WARNING,
-            details=details
+            details=self._build_details(
+                details,
+                drug=drug,
+                recommended_dose=recommended_dose,
+                actual_dose=actual_dose or None
+            )
         )
         self.drug = drug
         self.recommended_dose = recommended_dose
@@ -406,22 +441,20 @@ class ContraindicationError(SafetyCheckError):
     禁忌症错误
     """
 
+    __slots__ = ('drug', 'contraindications')
+
     def __init__(
         self,
         message: str,
         drug: str,
         contraindications: List[str],
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        details['drug'] = drug
-        details['contraindications'] = contraindications
-
         super().__init__(
             message=message,
-            risk_type="contraindication",
+            risk_type=_RISK_CONTRAINDICATION,
             severity=ErrorSeverity.CRITICAL,
-            details=details
+            details=self._build_details(details, drug=drug, contraindications=contraindications)
         )
         self.drug = drug
         self.contraindications = contraindications
@@ -431,13 +464,22 @@ class ContraindicationError(SafetyCheckError):
 # 紧急情况异常
 # ============================================================
 
-@dataclass
+@dataclass(frozen=True)
 class EmergencyAction:
     """紧急处理建议"""
     action: str           # 建议行动
     urgency: str          # 紧急程度: immediate, same_day, monitor
     description: str      # 详细说明
 
+    @cached_property
+    def as_dict(self) -> Dict[str, str]:
+        """序列化结果（实例不可变，首次访问后缓存）"""
+        return {
+            'action': self.action,
+            'urgency': self.urgency,
+            'description': self.description
+        }
+
 
 class EmergencyDetectedError(MedicalAgentError):
     """
@@ -445,37 +487,42 @@ class EmergencyDetectedError(MedicalAgentError):
     当检测到需要立即关注的医疗紧急情况时抛出
     """
 
+    __slots__ = ('emergency_severity', 'matched_patterns', 'suggested_action', 'symptoms')
+
     def __init__(
         self,
         message: str,
         severity: str,
-        matched_patterns: List[str],
+        matched_patterns: Sequence[str],
         suggested_action: EmergencyAction,
         symptoms: Optional[List[str]] = None,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        details['severity'] = severity
-        details['matched_patterns'] = matched_patterns
-        details['suggested_action'] = {
-            'action': suggested_action.action,
-            'urgency': suggested_action.urgency,
-            'description': suggested_action.description
-        }
-        if symptoms:
-            details['symptoms'] = symptoms
+        if not isinstance(suggested_action, EmergencyAction):
+            # 兼容 core.emergency_detector.EmergencyAction 等同结构对象
+            suggested_action = EmergencyAction(
+                action=suggested_action.action,
+                urgency=suggested_action.urgency,
+                description=suggested_action.description
+            )
 
         # 根据严重程度设置错误级别
         error_severity = ErrorSeverity.CRITICAL if severity == "critical" else ErrorSeverity.ERROR
 
         super().__init__(
             message=message,
-            error_code="EMERGENCY_001",
+            error_code=_CODE_EMERGENCY_001,
             severity=error_severity,
-            details=details
+            details=self._build_details(
+                details,
+                severity=severity,
+                matched_patterns=matched_patterns,
+                suggested_action=suggested_action.as_dict,
+                symptoms=symptoms or None
+            )
         )
         self.emergency_severity = severity  # critical, urgent, attention
-        self.matched_patterns = matched_patterns
+        self.matched_patterns = matched_patterns  # 按引用保存，建议传入模块级元组常量
         self.suggested_action = suggested_action
         self.symptoms = symptoms or []
 
@@ -489,21 +536,21 @@ class SessionError(MedicalAgentError):
     会话错误
     """
 
+    __slots__ = ('session_id',)
+
     def __init__(
         self,
         message: str,
         session_id: Optional[str] = None,
-        **kwargs
+        error_code: str = _CODE_SESSION_001,
+        severity: ErrorSeverity = ErrorSeverity.ERROR,
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        if session_id:
-            details['session_id'] = session_id
-
         super().__init__(
             message=message,
-            error_code="SESSION_001",
-            severity=ErrorSeverity.ERROR,
-            details=details
+            error_code=error_code,
+            severity=severity,
+            details=self._build_details(details, session_id=session_id or None)
         )
         self.session_id = session_id
 
@@ -511,31 +558,30 @@ class SessionError(MedicalAgentError):
 class SessionNotFoundError(SessionError):
     """会话未找到"""
 
-    def __init__(self, session_id: str, **kwargs):
-        message = f"Session '{session_id}' not found"
+    __slots__ = ()
+
+    def __init__(self, session_id: str, details: Optional[Dict[str, Any]] = None):
         super().__init__(
-            message=message,
+            message=f"Session '{session_id}' not found",
             session_id=session_id,
-            error_code="SESSION_002",
+            error_code=_CODE_SESSION_002,
             severity=ErrorSeverity.WARNING,
-            **kwargs
+            details=details
         )
 
 
 class SessionExpiredError(SessionError):
     """会话已过期"""
 
-    def __init__(self, session_id: str, expiry_time: str, **kwargs):
-        message = f"Session '{session_id}' expired at {expiry_time}"
-        details = kwargs.get('details', {})
-        details['expiry_time'] = expiry_time
+    __slots__ = ('expiry_time',)
 
+    def __init__(self, session_id: str, expiry_time: str, details: Optional[Dict[str, Any]] = None):
         super().__init__(
-            message=message,
+            message=f"Session '{session_id}' expired at {expiry_time}",
             session_id=session_id,
-            error_code="SESSION_003",
+            error_code=_CODE_SESSION_003,
             severity=ErrorSeverity.INFO,
-            details=details
+            details=self._build_details(details, expiry_time=expiry_time)
         )
         self.expiry_time = expiry_time
 
@@ -549,21 +595,19 @@ class ConfigurationError(MedicalAgentError):
     配置错误
     """
 
+    __slots__ = ('config_key',)
+
     def __init__(
         self,
         message: str,
         config_key: Optional[str] = None,
-        **kwargs
+        details: Optional[Dict[str, Any]] = None
     ):
-        details = kwargs.get('details', {})
-        if config_key:
-            details['config_key'] = config_key
-
         super().__init__(
             message=message,
-            error_code="CONFIG_001",
+            error_code=_CODE_CONFIG_001,
             severity=ErrorSeverity.CRITICAL,
-            details=details
+            details=self._build_details(details, config_key=config_key or None)
         )
         self.config_key = config_key
 
@@ -572,6 +616,69 @@ class ConfigurationError(MedicalAgentError):
 # 工具函数
 # ============================================================
 
+def _fmt_emergency(error: EmergencyDetectedError) -> str:
+    return f"🚨 {error.message}\n\n建议: {error.suggested_action.description}"
+
+
+def _fmt_drug_interaction(error: DrugInteractionError) -> str:
+    return f"⚠️ {error.message}\n\n相互作用: {error.interaction_description}"
+
+
+def _fmt_drug_allergy(error: DrugAllergyError) -> str:
+    return f"⚠️ {error.message}\n\n过敏原: {', '.join(error.allergens)}"
+
+
+def _fmt_knowledge_not_found(error: KnowledgeNotFoundError) -> str:
+    msg = f"未找到相关信息: {error.query}"
+    if error.suggestions:
+        msg += f"\n\n建议尝试: {', '.join(error.suggestions[:5])}"
+    return msg
+
+
+def _fmt_ambiguous_intent(error: AmbiguousIntentError) -> str:
+    return f"{error.message}\n\n请选择您想了解的内容"
+
+
+def _fmt_safety(error: SafetyCheckError) -> str:
+    return f"⚠️ {error.message}"
+
+
+def _fmt_default(error: MedicalAgentError) -> str:
+    # 默认错误消息
+    if error.severity in _SEVERE:
+        return f"抱歉，处理您的请求时遇到问题: {error.message}"
+    else:
+        return error.message
+
+
+# 异常类型 -> 格式化函数（按类型精确匹配，子类沿MRO查找）
+_FORMATTERS: Dict[type, Callable[[MedicalAgentError], str]] = {
+    EmergencyDetectedError: _fmt_emergency,
+    DrugInteractionError: _fmt_drug_interaction,
+    DrugAllergyError: _fmt_drug_allergy,
+    KnowledgeNotFoundError: _fmt_knowledge_not_found,
+    AmbiguousIntentError: _fmt_ambiguous_intent,
+    SafetyCheckError: _fmt_safety,
+    MedicalAgentError: _fmt_default,
+}
+
+# 具体异常类 -> 已解析的格式化函数
+_resolved_formatters: "WeakKeyDictionary[type, Callable[[MedicalAgentError], str]]" = WeakKeyDictionary()
+
+
+def _resolve_formatter(error_class: type) -> Callable[[MedicalAgentError], str]:
+    """沿MRO查找格式化函数，并按类缓存结果"""
+    formatter = _resolved_formatters.get(error_class)
+    if formatter is None:
+        formatter = _fmt_default
+        for cls in error_class.__mro__:
+            if cls in _FORMATTERS:
+                formatter = _FORMATTERS[cls]
+                break
+        _resolved_formatters[error_class] = formatter
+    return formatter
+
+
 def format_error_for_user(error: MedicalAgentError) -> str:
     """
     将错误格式化为用户友好的消息
@@ -582,33 +689,51 @@ def format_error_for_user(error: MedicalAgentError) -> str:
     Returns:
         str: 用户友好的错误消息
     """
-    if isinstance(error, EmergencyDetectedError):
-        return f"🚨 {error.message}\n\n建议: {error.suggested_action.description}"
+    formatter = _FORMATTERS.get(type(error)) or _resolve_formatter(type(error))
+    return formatter(error)
 
-    elif isinstance(error, DrugInteractionError):
-        return f"⚠️ {error.message}\n\n相互作用: {error.interaction_description}"
 
-    elif isinstance(error, DrugAllergyError):
-        return f"⚠️ {error.message}\n\n过敏原: {', '.join(error.allergens)}"
+@dataclass(frozen=True)
+class _LazyUserMsg:
+    """延迟格式化的用户消息，仅在被转换为字符串时才构建"""
+    error: MedicalAgentError
+
+    def __str__(self) -> str:
+        return format_error_for_user(self.error)
 
-    elif isinstance(error, KnowledgeNotFoundError):
-        msg = f"未找到相关信息: {error.query}"
-        if error.suggestions:
-            msg += f"\n\n建议尝试: {', '.join(error.suggestions[:5])}"
-        return msg
 
-    elif isinstance(error, AmbiguousIntentError):
-        return f"{error.message}\n\n请选择您想了解的内容"
+def lazy_format_error_for_user(error: MedicalAgentError) -> _LazyUserMsg:
+    """
+    延迟版本的 format_error_for_user，用于日志参数
 
-    elif isinstance(error, SafetyCheckError):
-        return f"⚠️ {error.message}"
+    logger.debug("%s", lazy_format_error_for_user(e)) 只在日志级别生效时才格式化消息；
+    需要实际字符串（如API响应）时仍应调用 format_error_for_user
 
-    else:
-        # 默认错误消息
-        if error.severity in [ErrorSeverity.CRITICAL, ErrorSeverity.ERROR]:
-            return f"抱歉，处理您的请求时遇到问题: {error.message}"
-        else:
-            return error.message
+    Args:
+        error: 异常对象
+
+    Returns:
+        _LazyUserMsg: 调用 str() 时生成用户友好的错误消息
+    """
+    return _LazyUserMsg(error)
+
+
+# 异常类型 -> 恢复建议
+_SUGGESTIONS: Dict[type, str] = {
+    IntentClassificationError: "请尝试换一种说法，或更具体地描述您的问题",
+    AmbiguousIntentError: "请选择您感兴趣的具体内容",
+    KnowledgeNotFoundError: "请尝试其他关键词，或描述相关症状",
+    SkillNotFoundError: "该功能暂未开放，请尝试其他功能",
+    SafetyCheckError: "如有疑问，请咨询专业医生或药师",
+    EmergencyDetectedError: "请按建议行动，必要时立即就医",
+    SessionError: "请重新开始对话",
+    ConfigurationError: "请联系系统管理员",
+}
+
+_DEFAULT_SUGGESTION = "请稍后重试，或联系技术支持"
+
+# 具体异常类 -> 已解析的恢复建议
+_resolved_suggestions: "WeakKeyDictionary[type, str]" = WeakKeyDictionary()
 
 
 def get_error_recovery_suggestion(error: MedicalAgentError) -> Optional[str]:
@@ -621,19 +746,13 @@ def get_error_recovery_suggestion(error: MedicalAgentError) -> Optional[str]:
     Returns:
         Optional[str]: 恢复建议
     """
-    suggestions = {
-        IntentClassificationError: "请尝试换一种说法，或更具体地描述您的问题",
-        AmbiguousIntentError: "请选择您感兴趣的具体内容",
-        KnowledgeNotFoundError: "请尝试其他关键词，或描述相关症状",
-        SkillNotFoundError: "该功能暂未开放，请尝试其他功能",
-        SafetyCheckError: "如有疑问，请咨询专业医生或药师",
-        EmergencyDetectedError: "请按建议行动，必要时立即就医",
-        SessionError: "请重新开始对话",
-        ConfigurationError: "请联系系统管理员",
-    }
-
-    for error_class, suggestion in suggestions.items():
-        if isinstance(error, error_class):
-            return suggestion
-
-    return "请稍后重试，或联系技术支持"
+    error_class = type(error)
+    suggestion = _resolved_suggestions.get(error_class)
+    if suggestion is None:
+        suggestion = _DEFAULT_SUGGESTION
+        for cls in error_class.__mro__:
+            if cls in _SUGGESTIONS:
+                suggestion = _SUGGESTIONS[cls]
+                break
+        _resolved_suggestions[error_class] = suggestion
+    return suggestion
@@ -5,14 +5,76 @@ LLM服务 - 接入阿里云DashScope qwen-plus模型
 
 import asyncio
 import aiohttp
+import hashlib
+import inspect
 import json
 import logging
-from typing import Dict, List, Optional, Any
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, AsyncIterator, Callable, ClassVar, Mapping, Tuple
 from datetime import datetime
+from string import Template
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
+if ORJSON_AVAILABLE:
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+else:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+
+def _llm_errors(failure_label: str):
+    """
+    LLM请求统一错误处理装饰器
+    支持协程与异步生成器：超时转换为统一异常，其余异常记录日志后原样抛出
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def gen_wrapper(*args, **kwargs):
+                agen = func(*args, **kwargs)
+                try:
+                    async for item in agen:
+                        yield item
+                except asyncio.TimeoutError:
+                    logger.error("[LLM] Request timeout")
+                    raise Exception("LLM request timeout")
+                except Exception as e:
+                    logger.error("[LLM] %s: %s", failure_label, e)
+                    raise
+                finally:
+                    await agen.aclose()
+            return gen_wrapper
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except asyncio.TimeoutError:
+                logger.error("[LLM] Request timeout")
+                raise Exception("LLM request timeout")
+            except Exception as e:
+                logger.error("[LLM] %s: %s", failure_label, e)
+                raise
+        return wrapper
+
+    return decorator
+
+
 class DashScopeLLM:
     """
     阿里云DashScope LLM客户端
@@ -24,20 +86,75 @@ class DashScopeLLM:
         api_key: str,
         base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1",
         model: str = "qwen-plus",
-        timeout: int = 120
+        timeout: int = 120,
+        pool_size: int = 50,
+        keepalive_timeout: float = 75,
+        explicit_cache: bool = True
     ):
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
         self.timeout = timeout
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.explicit_cache = explicit_cache
         self.session: Optional[aiohttp.ClientSession] = None
+        # 进行中的非流式请求: 请求体 -> 任务
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 已注册的静态提示词: 名称 -> system消息
+        self._registered_prompts: Dict[str, Dict[str, Any]] = {}
+
+        # 请求URL与请求头在客户端生命周期内不变，构造时生成一次
+        self._url = f"{base_url}/chat/completions"
+        self._headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        # 流式响应请求不压缩的传输编码，aiohttp不会为SSE逐块创建解压器
+        self._stream_headers = {"Accept-Encoding": "identity"}
 
     async def start(self):
         """启动客户端"""
         if self.session is None:
             timeout = aiohttp.ClientTimeout(total=self.timeout)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-            logger.info(f"[LLM] DashScope client started with model: {self.model}")
+            # 连接池: 复用TLS连接并缓存DNS解析结果
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                ttl_dns_cache=300,
+                keepalive_timeout=self.keepalive_timeout,
+                enable_cleanup_closed=True
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers=self._headers,
+                json_serialize=_json_dumps
+            )
+            logger.info("[LLM] DashScope client started with model: %s", self.model)
+
+    def register_prompt(self, name: str, text: str) -> Dict[str, Any]:
+        """
+        注册静态提示词，返回可在各次请求间复用的system消息
+
+        启用显式缓存时消息内容带 cache_control 标记，服务端据此缓存该前缀的
+        计算结果，后续请求跳过其预填充；关闭时退化为普通文本消息
+        """
+        if self.explicit_cache:
+            content: Any = [{
+                "type": "text",
+                "text": text,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        else:
+            content = text
+        message = {"role": "system", "content": content}
+        self._registered_prompts[name] = message
+        return message
+
+    def get_registered_prompt(self, name: str) -> Optional[Dict[str, Any]]:
+        """获取已注册的system消息"""
+        return self._registered_prompts.get(name)
 
     async def stop(self):
         """停止客户端"""
@@ -46,50 +163,28 @@ class DashScopeLLM:
             self.session = None
             logger.info("[LLM] DashScope client stopped")
 
-    def chat(
+    @_llm_errors("Request failed")
+    async def chat(
         self,
-        messages: List[Dict[str, str]],
+        messages: List[Dict[str, Any]],
         temperature: float = 0.7,
         max_tokens: int = 2000,
-        stream: bool = False,
         **kwargs
-    ):
+    ) -> str:
         """
-        发起聊天请求
+        发起聊天请求（非流式）
 
         Args:
             messages: 消息列表 [{"role": "user", "content": "..."}]
             temperature: 温度参数
             max_tokens: 最大token数
-            stream: 是否流式输出
 
         Returns:
-            str 或 AsyncIterator: 模型响应
+            str: 模型响应
         """
-        if not stream:
-            # 非流式：返回coroutine
-            return self._chat_non_stream(messages, temperature, max_tokens, **kwargs)
-        else:
-            # 流式：返回async generator
-            return self._chat_stream_gen(messages, temperature, max_tokens, **kwargs)
-
-    async def _chat_non_stream(
-        self,
-        messages: List[Dict[str, str]],
-        temperature: float = 0.7,
-        max_tokens: int = 2000,
-        **kwargs
-    ) -> str:
-        """非流式请求"""
         if not self.session:
             await self.start()
 
-        url = f"{self.base_url}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
         payload = {
             "model": self.model,
             "messages": messages,
@@ -98,42 +193,59 @@ class DashScopeLLM:
             "stream": False,
             **kwargs
         }
-
-        try:
-            async with self.session.post(url, headers=headers, json=payload) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"[LLM] API error: {response.status} - {error_text}")
-                    raise Exception(f"API error {response.status}: {error_text}")
-
-                result = await response.json()
-                content = result["choices"][0]["message"]["content"]
-                return content
-
-        except asyncio.TimeoutError:
-            logger.error(f"[LLM] Request timeout")
-            raise Exception("LLM request timeout")
-        except Exception as e:
-            logger.error(f"[LLM] Request failed: {e}")
-            raise
-
-    async def _chat_stream_gen(
+        body = _json_dumps(payload)
+
+        # 请求合并: 请求体完全相同的并发请求共享同一次上游调用
+        task = self._inflight.get(body)
+        if task is None:
+            task = asyncio.ensure_future(self._post_chat(body))
+            self._inflight[body] = task
+            task.add_done_callback(lambda t: self._finish_inflight(body, t))
+        else:
+            logger.debug("[LLM] Coalesced identical in-flight request")
+        # shield: 单个调用方取消不影响其他等待同一结果的调用方
+        return await asyncio.shield(task)
+
+    async def _post_chat(self, body: str) -> str:
+        """发送已序列化的非流式请求"""
+        async with self.session.post(self._url, data=body) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error("[LLM] API error: %s - %s", response.status, error_text)
+                raise Exception(f"API error {response.status}: {error_text}")
+
+            result = await response.json(loads=_json_loads)
+            content = result["choices"][0]["message"]["content"]
+            return content
+
+    def _finish_inflight(self, body: str, task: asyncio.Future):
+        """请求完成后移出合并表；所有调用方均已取消时读取异常以免告警"""
+        self._inflight.pop(body, None)
+        if not task.cancelled():
+            task.exception()
+
+    @_llm_errors("Stream failed")
+    async def chat_stream(
         self,
-        messages: List[Dict[str, str]],
+        messages: List[Dict[str, Any]],
         temperature: float = 0.7,
         max_tokens: int = 2000,
         **kwargs
-    ):
-        """流式请求"""
+    ) -> AsyncIterator[str]:
+        """
+        发起聊天请求（流式）
+
+        Args:
+            messages: 消息列表 [{"role": "user", "content": "..."}]
+            temperature: 温度参数
+            max_tokens: 最大token数
+
+        Yields:
+            str: 模型响应片段
+        """
         if not self.session:
             await self.start()
 
-        url = f"{self.base_url}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
         payload = {
             "model": self.model,
             "messages": messages,
@@ -142,44 +254,47 @@ class DashScopeLLM:
             "stream": True,
             **kwargs
         }
-
-        try:
-            async with self.session.post(url, headers=headers, json=payload) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"[LLM] API error: {response.status} - {error_text}")
-                    raise Exception(f"API error {response.status}: {error_text}")
-
-                # aiohttp streaming: read line by line
-                buffer = ""
-                async for chunk in response.content.iter_chunked(1024):
-                    if chunk:
-                        buffer += chunk.decode('utf-8', errors='ignore')
-                        lines = buffer.split('\n')
-                        buffer = lines.pop()  # Keep incomplete line in buffer
-
-                        for line in lines:
-                            line = line.strip()
-                            if line.startswith('data: '):
-                                data_str = line[6:]
-                                if data_str == '[DONE]':
-                                    return
-                                try:
-                                    data = json.loads(data_str)
-                                    if 'choices' in data and len(data['choices']) > 0:
-                                        delta = data['choices'][0].get('delta', {})
-                                        content = delta.get('content', '')
-                                        if content:
-                                            yield content
-                                except json.JSONDecodeError:
-                                    continue
-
-        except asyncio.TimeoutError:
-            logger.error(f"[LLM] Request timeout")
-            raise Exception("LLM request timeout")
-        except Exception as e:
-            logger.error(f"[LLM] Stream failed: {e}")
-            raise
+        # 与非流式请求一致：发起请求前一次性序列化，调用方随后可安全复用消息对象
+        body = _json_dumps(payload)
+
+        async with self.session.post(self._url, data=body, headers=self._stream_headers) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error("[LLM] API error: %s - %s", response.status, error_text)
+                raise Exception(f"API error {response.status}: {error_text}")
+
+            # 按网络读取批次处理SSE：同一批次中的多个增量合并为一次yield，
+            # 减少异步生成器的切换次数（调用方本就按拼接方式消费）
+            buffer = bytearray()
+            async for chunk in response.content.iter_any():
+                buffer += chunk
+                parts = []
+                done = False
+
+                while (newline := buffer.find(b'\n')) != -1:
+                    line = bytes(buffer[:newline]).strip()
+                    del buffer[:newline + 1]
+
+                    if not line.startswith(b'data: '):
+                        continue
+                    payload_bytes = line[6:]
+                    if payload_bytes == b'[DONE]':
+                        done = True
+                        break
+                    try:
+                        data = _json_loads(payload_bytes)
+                        if 'choices' in data and len(data['choices']) > 0:
+                            delta = data['choices'][0].get('delta', {})
+                            content = delta.get('content', '')
+                            if content:
+                                parts.append(content)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+
+                if parts:
+                    yield ''.join(parts)
+                if done:
+                    return
 
     async def chat_with_system(
         self,
@@ -214,6 +329,17 @@ class DashScopeLLM:
 # 医疗专用LLM服务
 # ============================================================
 
+@lru_cache(maxsize=16)
+def _plain_system_message(text: str) -> Dict[str, Any]:
+    """按提示词文本缓存system消息（提示词取值有限），调用方不得修改返回的字典"""
+    return {"role": "system", "content": text}
+
+
+def _compose_prompts(base: str, header: str, prompts: Mapping[str, str]) -> Mapping[str, str]:
+    """将通用系统提示与各意图专属提示拼接为只读映射"""
+    return MappingProxyType({name: base + header + prompt for name, prompt in prompts.items()})
+
+
 class MedicalLLMService:
     """
     医疗LLM服务
@@ -245,68 +371,14 @@ class MedicalLLMService:
 - 重要信息用加粗或引用块突出
 - 条理清晰，分点说明"""
 
-    def __init__(
-        self,
-        api_key: str,
-        base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1",
-        model: str = "qwen-plus"
-    ):
-        self.llm = DashScopeLLM(api_key=api_key, base_url=base_url, model=model)
-        self.conversation_history: Dict[str, List[Dict]] = {}
-
-    async def start(self):
-        """启动服务"""
-        await self.llm.start()
-
-    async def stop(self):
-        """停止服务"""
-        await self.llm.stop()
-
-    def get_history(self, session_id: str) -> List[Dict]:
-        """获取对话历史"""
-        return self.conversation_history.get(session_id, [])
-
-    def add_to_history(self, session_id: str, role: str, content: str):
-        """添加到对话历史"""
-        if session_id not in self.conversation_history:
-            self.conversation_history[session_id] = []
-
-        self.conversation_history[session_id].append({
-            "role": role,
-            "content": content
-        })
-
-        # 保持历史记录在合理范围内（最近10轮）
-        if len(self.conversation_history[session_id]) > 20:
-            self.conversation_history[session_id] = self.conversation_history[session_id][-20:]
-
-    def clear_history(self, session_id: str):
-        """清除对话历史"""
-        if session_id in self.conversation_history:
-            del self.conversation_history[session_id]
+    # 通用系统提示的注册名称
+    _DEFAULT_PROMPT_KEY = "default"
+    # 意图专属提示在通用系统提示之后的分隔标题
+    _SPECIALIZATION_HEADER = "\n\n## 本轮专精\n"
 
-    async def generate_response(
-        self,
-        user_message: str,
-        intent: str,
-        session_id: str = "default",
-        custom_prompt: str = None
-    ) -> str:
-        """
-        生成医疗响应
-
-        Args:
-            user_message: 用户消息
-            intent: 意图类型
-            session_id: 会话ID
-            custom_prompt: 自定义系统提示词
-
-        Returns:
-            str: 生成的响应
-        """
-        # 根据意图类型定制系统提示
-        intent_prompts = {
-            "symptom_inquiry": """你是一位资深医疗专家，具有丰富的临床诊断经验。你的任务是全面分析用户提供的症状信息，给出专业、准确、实用的健康指导。
+    # 意图专属系统提示（只读，类加载时构建一次）
+    _INTENT_PROMPTS: ClassVar[Mapping[str, str]] = MappingProxyType({
+        "symptom_inquiry": """你是一位资深医疗专家，具有丰富的临床诊断经验。你的任务是全面分析用户提供的症状信息，给出专业、准确、实用的健康指导。
 
 ## 分析要求
 请根据用户提供的以下信息进行综合分析：
@@ -357,52 +429,293 @@ class MedicalLLMService:
 - 语气专业但平易近人
 - 避免使用过于晦涩的医学术语，必要时加以解释
 - 始终强调：本分析仅供参考，不能替代面对面医疗诊断""",
-            "department_query": """你是科室推荐专家。根据用户症状，推荐最合适的就诊科室：
+        "department_query": """你是科室推荐专家。根据用户症状，推荐最合适的就诊科室：
 1. 首选科室及理由
 2. 备选科室（如有）
 3. 该科室的诊疗范围""",
-            "medication_consult": """你是用药咨询专家。提供药品相关信息：
+        "medication_consult": """你是用药咨询专家。提供药品相关信息：
 1. 药品用途和适应症
 2. 正确用法用量
 3. 常见副作用
 4. 重要注意事项和禁忌
 5. 用药提醒""",
-            "appointment": """你是预约挂号助手。引导用户完成预约：
+        "appointment": """你是预约挂号助手。引导用户完成预约：
 1. 确认用户需求
 2. 询问缺失信息（科室、时间、医生类型）
 3. 说明预约流程
 4. 提供温馨提示""",
-            "health_education": """你是健康教育专家。提供专业的健康指导：
+        "health_education": """你是健康教育专家。提供专业的健康指导：
 1. 疾病预防知识
 2. 健康生活方式建议
 3. 饮食运动指导
 4. 长期管理建议"""
-        }
+    })
+
+    # 各意图的完整系统提示（通用前缀 + 意图专属），类加载时拼接一次
+    _COMPOSED_PROMPTS: ClassVar[Mapping[str, str]] = _compose_prompts(
+        SYSTEM_PROMPT, _SPECIALIZATION_HEADER, _INTENT_PROMPTS
+    )
+
+    # 兜底响应：静态条目在类定义时构建，含用户消息的条目用预编译模板
+    _FALLBACK_TEMPLATES: ClassVar[Mapping[str, Template]] = MappingProxyType({
+        "symptom_inquiry": Template("""## 关于您的症状
+
+感谢您描述的症状「$user_message」。
+
+为了给您更准确的建议，请告诉我：
+- 症状持续多长时间了？
+- 有没有其他伴随症状？
+- 症状的严重程度如何？
+
+> ⚠️ **免责声明**: 以上信息仅供参考，不能替代专业医疗诊断和治疗。如有不适请及时就医。"""),
+        "department_query": Template("""## 科室推荐
+
+根据您提到的「$user_message」，建议您挂号前先明确具体症状。
+
+常见科室参考：
+- 头痛头晕 → 神经内科
+- 咳嗽发热 → 呼吸内科/发热门诊
+- 腹痛恶心 → 消化内科
+- 心悸胸痛 → 心血管内科
+
+> ⚠️ **免责声明**: 以上信息仅供参考，不能替代专业医疗诊断和治疗。如有不适请及时就医。""")
+    })
+
+    _FALLBACK_STATIC: ClassVar[Mapping[str, str]] = MappingProxyType({
+        "medication_consult": """## 用药咨询
+
+关于药品使用，请咨询：
+1. 查阅药品说明书
+2. 咨询医院药师
+3. 咨询开药医生
+
+> ⚠️ **重要提醒**: 请严格按医嘱或说明书使用药品，不要自行调整剂量。""",
+        "appointment": """## 预约挂号
+
+请提供以下信息：
+1. 挂号科室
+2. 就诊时间
+3. 医生类型（专家/普通）
+
+> 💡 **提示**: 如果不确定挂什么科，可以先告诉我您的症状。""",
+        "health_education": """## 健康知识
+
+保持健康的生活方式：
+- 均衡饮食，少盐少油
+- 适量运动，每周150分钟
+- 充足睡眠，规律作息
+- 戒烟限酒，保持好心情
+
+> ⚠️ **免责声明**: 以上信息仅供参考，不能替代专业医疗诊断和治疗。"""
+    })
+
+    _DEFAULT_FALLBACK = "抱歉，我暂时无法处理您的请求，请稍后重试。"
+
+    # 流式输出合并窗口：累计字数或距上次输出的时间（秒）任一达到即输出
+    STREAM_FLUSH_CHARS = 64
+    STREAM_FLUSH_INTERVAL = 0.03
+
+    # 会话历史上限（消息条数），超出后压缩早期轮次
+    _HISTORY_MAX_MESSAGES = 20
+    # 压缩时保留的最近消息条数
+    _HISTORY_KEEP_RECENT = 10
+    _SUMMARY_HEADER = "## 早前对话摘要"
+    _SUMMARY_MAX_LINES = 20
+    _SUMMARY_SNIPPET_CHARS = 80
+
+    # FAQ类意图：回答与会话上下文弱相关，相同问题可直接复用缓存响应
+    _CACHEABLE_INTENTS: ClassVar[frozenset] = frozenset({
+        "department_query", "medication_consult", "health_education"
+    })
+
+    # 归一化时去除的空白与标点（含全角标点）
+    _NORMALIZE_PATTERN = re.compile(r"[\s\W_]+", re.UNICODE)
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1",
+        model: str = "qwen-plus",
+        response_cache_size: int = 512,
+        response_cache_ttl: float = 3600
+    ):
+        self.llm = DashScopeLLM(api_key=api_key, base_url=base_url, model=model)
+        self.conversation_history: Dict[str, List[Dict]] = {}
+        # 响应缓存: (intent, 归一化消息摘要) -> (过期时间, 响应)
+        self._response_cache: "OrderedDict[Tuple[str, bytes], Tuple[float, str]]" = OrderedDict()
+        self._response_cache_size = response_cache_size
+        self._response_cache_ttl = response_cache_ttl
+
+    async def start(self):
+        """启动服务"""
+        await self.llm.start()
+        # 静态提示词只注册一次，之后每次请求复用同一条system消息
+        self.llm.register_prompt(self._DEFAULT_PROMPT_KEY, self.SYSTEM_PROMPT)
+        for intent, prompt in self._COMPOSED_PROMPTS.items():
+            self.llm.register_prompt(intent, prompt)
 
-        system_prompt = custom_prompt or intent_prompts.get(intent, self.SYSTEM_PROMPT)
+    async def stop(self):
+        """停止服务"""
+        await self.llm.stop()
 
-        # 获取对话历史
-        history = self.get_history(session_id)
+    def get_history(self, session_id: str) -> List[Dict]:
+        """获取对话历史"""
+        return self.conversation_history.get(session_id, [])
+
+    def add_to_history(self, session_id: str, role: str, content: str):
+        """
+        添加到对话历史
+        历史只追加不改写，超出上限时一次性压缩早期轮次为摘要，
+        使每轮请求的消息前缀与上一轮逐字节一致，可复用服务端前缀缓存
+        """
+        history = self.conversation_history.setdefault(session_id, [])
+        history.append({
+            "role": role,
+            "content": content
+        })
+
+        if len(history) > self._HISTORY_MAX_MESSAGES:
+            self._compact_history(history)
+
+    def _compact_history(self, history: List[Dict]):
+        """将早期轮次原地压缩为一条system摘要消息，保留最近的完整轮次"""
+        split = len(history) - self._HISTORY_KEEP_RECENT
+        # 保证保留部分从用户消息开始，避免拆散一问一答
+        while split < len(history) and history[split]["role"] != "user":
+            split += 1
+
+        lines = []
+        for message in history[:split]:
+            if message["role"] == "system":
+                # 合并上一次压缩产生的摘要
+                lines.extend(message["content"].split("\n")[1:])
+            else:
+                speaker = "用户" if message["role"] == "user" else "助手"
+                lines.append(f"- {speaker}: {message['content'][:self._SUMMARY_SNIPPET_CHARS]}")
+        lines = lines[-self._SUMMARY_MAX_LINES:]
+
+        # 原地替换：不重新分配会话列表，也不复制保留的消息
+        history[:split] = [{"role": "system", "content": "\n".join([self._SUMMARY_HEADER, *lines])}]
+
+    def _system_prompt(self, intent: str, custom_prompt: Optional[str]) -> str:
+        """
+        获取本轮系统提示
+        通用系统提示作为固定前缀，意图专属/自定义提示只追加在后面，
+        保证流式与非流式请求的前缀逐字节一致以命中服务端前缀缓存
+        """
+        if custom_prompt:
+            return self.SYSTEM_PROMPT + self._SPECIALIZATION_HEADER + custom_prompt
+        return self._COMPOSED_PROMPTS.get(intent, self.SYSTEM_PROMPT)
+
+    def _system_message(self, intent: str, custom_prompt: Optional[str]) -> Dict[str, Any]:
+        """获取本轮system消息：优先使用启动时注册的消息，其余复用缓存的消息对象"""
+        if not custom_prompt:
+            name = intent if intent in self._COMPOSED_PROMPTS else self._DEFAULT_PROMPT_KEY
+            registered = self.llm.get_registered_prompt(name)
+            if registered is not None:
+                return registered
+        return _plain_system_message(self._system_prompt(intent, custom_prompt))
+
+    def _build_messages(self, session_id: str, system_message: Dict[str, Any]) -> List[Dict]:
+        """构建请求消息：系统提示 + 完整会话历史（已包含本轮用户消息）"""
+        return [system_message, *self.get_history(session_id)]
+
+    def _response_cache_key(
+        self,
+        intent: str,
+        user_message: str,
+        custom_prompt: Optional[str],
+        session_id: str
+    ) -> Optional[Tuple[str, bytes]]:
+        """
+        计算响应缓存键，非FAQ意图或使用自定义提示词时不缓存
+        回复由完整会话历史生成，可能包含该用户的个人健康信息（妊娠、过敏等），
+        因此只缓存会话首轮（历史中仅有本条用户消息）的问答，避免跨会话泄露
+        """
+        if custom_prompt or intent not in self._CACHEABLE_INTENTS:
+            return None
+        if len(self.get_history(session_id)) > 1:
+            return None
+        normalized = self._NORMALIZE_PATTERN.sub("", user_message.lower())
+        if not normalized:
+            return None
+        digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+        return (intent, digest)
+
+    def _get_cached_response(self, key: Optional[Tuple[str, bytes]]) -> Optional[str]:
+        """读取响应缓存（LRU，过期即淘汰）"""
+        if key is None:
+            return None
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return response
+
+    def _set_cached_response(self, key: Optional[Tuple[str, bytes]], response: str):
+        """写入响应缓存，超出容量时淘汰最久未使用的条目"""
+        if key is None or not response:
+            return
+        self._response_cache[key] = (time.monotonic() + self._response_cache_ttl, response)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > self._response_cache_size:
+            self._response_cache.popitem(last=False)
+
+    def clear_history(self, session_id: str):
+        """清除对话历史"""
+        if session_id in self.conversation_history:
+            del self.conversation_history[session_id]
+
+    async def generate_response(
+        self,
+        user_message: str,
+        intent: str,
+        session_id: str = "default",
+        custom_prompt: str = None
+    ) -> str:
+        """
+        生成医疗响应
+
+        Args:
+            user_message: 用户消息
+            intent: 意图类型
+            session_id: 会话ID
+            custom_prompt: 自定义系统提示词
+
+        Returns:
+            str: 生成的响应
+        """
+        system_message = self._system_message(intent, custom_prompt)
 
         # 添加用户消息到历史
         self.add_to_history(session_id, "user", user_message)
 
+        # FAQ类问题命中缓存时直接返回，省去整个LLM往返
+        cache_key = self._response_cache_key(intent, user_message, custom_prompt, session_id)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            self.add_to_history(session_id, "assistant", cached)
+            return cached
+
         try:
-            # 调用LLM生成响应
-            response = await self.llm.chat_with_system(
-                user_message=user_message,
-                system_prompt=system_prompt,
-                conversation_history=history if len(history) <= 10 else history[-10:],
+            # 调用LLM生成响应，完整历史原样发送以保持前缀稳定
+            response = await self.llm.chat(
+                self._build_messages(session_id, system_message),
                 temperature=0.7
             )
 
             # 添加助手响应到历史
             self.add_to_history(session_id, "assistant", response)
+            self._set_cached_response(cache_key, response)
 
             return response
 
         except Exception as e:
-            logger.error(f"[LLM] Generate response failed: {e}")
+            logger.error("[LLM] Generate response failed: %s", e)
             # 返回兜底响应
             return self._get_fallback_response(intent, user_message)
 
@@ -428,89 +741,20 @@ class MedicalLLMService:
                 - {"type": "content", "content": "..."}
                 - {"type": "done", "content": ""}
         """
-        # 根据意图类型定制系统提示
-        intent_prompts = {
-            "symptom_inquiry": """你是一位资深医疗专家，具有丰富的临床诊断经验。你的任务是全面分析用户提供的症状信息，给出专业、准确、实用的健康指导。
-
-## 分析要求
-请根据用户提供的以下信息进行综合分析：
-- **症状标签**：用户选择的症状类型（如头痛、发热、咳嗽等）
-- **症状描述**：用户详细描述的症状表现
-- **持续时间**：症状已经持续了多久
-- **严重程度**：症状对日常生活的影响程度
-
-## 输出结构
-请按照以下结构输出分析结果（使用Markdown格式）：
-
-### 1. 症状综合分析
-- 根据用户提供的所有信息（症状、持续时间、严重程度）进行综合分析
-- 评估病情的紧急程度和严重性
-- 分析症状组合可能代表的健康问题
-
-### 2. 可能原因分析
-- 列出最可能的3-5个原因，按可能性排序
-- 针对用户提供的具体症状组合进行原因推断
-- 考虑持续时间和严重程度对原因判断的影响
-- 简要说明每个原因的特征
-
-### 3. 危险信号识别（红旗征）
-- 列出需要立即关注的危险症状
-- 标明哪些情况下需要紧急就医
-- 根据症状的严重程度评估风险等级
-
-### 4. 推荐就诊科室
-- 首选科室：针对当前症状最合适的科室
-- 备选科室：如需多科室协作的建议
-- 说明推荐理由
-
-### 5. 自我护理建议
-- 针对当前症状的家庭护理方法
-- 饮食、作息方面的建议
-- 可以缓解症状的非药物措施
-- 需要避免的行为
-
-### 6. 就医时机建议
-- 明确说明什么情况下需要立即就医
-- 什么情况下可以观察等待
-- 建议的就医时间范围（根据持续时间判断）
-
-## 专业要求
-- 分析要基于循证医学知识
-- 考虑症状之间的关联性
-- 充分利用用户提供的所有信息
-- 语气专业但平易近人
-- 避免使用过于晦涩的医学术语，必要时加以解释
-- 始终强调：本分析仅供参考，不能替代面对面医疗诊断""",
-            "department_query": """你是科室推荐专家。根据用户症状，推荐最合适的就诊科室：
-1. 首选科室及理由
-2. 备选科室（如有）
-3. 该科室的诊疗范围""",
-            "medication_consult": """你是用药咨询专家。提供药品相关信息：
-1. 药品用途和适应症
-2. 正确用法用量
-3. 常见副作用
-4. 重要注意事项和禁忌
-5. 用药提醒""",
-            "appointment": """你是预约挂号助手。引导用户完成预约：
-1. 确认用户需求
-2. 询问缺失信息（科室、时间、医生类型）
-3. 说明预约流程
-4. 提供温馨提示""",
-            "health_education": """你是健康教育专家。提供专业的健康指导：
-1. 疾病预防知识
-2. 健康生活方式建议
-3. 饮食运动指导
-4. 长期管理建议"""
-        }
-
-        system_prompt = custom_prompt or intent_prompts.get(intent, self.SYSTEM_PROMPT)
-
-        # 获取对话历史
-        history = self.get_history(session_id)
+        system_message = self._system_message(intent, custom_prompt)
 
         # 添加用户消息到历史
         self.add_to_history(session_id, "user", user_message)
 
+        # FAQ类问题命中缓存时一次性输出缓存内容
+        cache_key = self._response_cache_key(intent, user_message, custom_prompt, session_id)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            self.add_to_history(session_id, "assistant", cached)
+            yield {"type": "content", "content": cached}
+            yield {"type": "done", "content": ""}
+            return
+
         # 发送思考过程事件
         yield {
             "type": "thinking",
@@ -528,29 +772,45 @@ class MedicalLLMService:
         }
 
         try:
-            # 构建消息列表
-            messages = [{"role": "system", "content": system_prompt}]
-            if history and len(history) <= 10:
-                messages.extend(history)
-            messages.append({"role": "user", "content": user_message})
-
-            # 流式调用LLM
-            full_response = ""
-            async for chunk in self.llm.chat(messages, stream=True):
-                full_response += chunk
+            # 构建消息列表，完整历史原样发送以保持前缀稳定
+            messages = self._build_messages(session_id, system_message)
+
+            # 流式调用LLM，按字数/时间窗口合并小块后再输出，减少下游事件与帧数
+            loop = asyncio.get_running_loop()
+            response_parts: List[str] = []
+            pending: List[str] = []
+            pending_len = 0
+            last_flush = loop.time()
+            async for chunk in self.llm.chat_stream(messages):
+                response_parts.append(chunk)
+                pending.append(chunk)
+                pending_len += len(chunk)
+                now = loop.time()
+                if pending_len >= self.STREAM_FLUSH_CHARS or now - last_flush >= self.STREAM_FLUSH_INTERVAL:
+                    yield {
+                        "type": "content",
+                        "content": "".join(pending)
+                    }
+                    pending.clear()
+                    pending_len = 0
+                    last_flush = now
+
+            if pending:
                 yield {
                     "type": "content",
-                    "content": chunk
+                    "content": "".join(pending)
                 }
+            full_response = "".join(response_parts)
 
             # 添加助手响应到历史
             self.add_to_history(session_id, "assistant", full_response)
+            self._set_cached_response(cache_key, full_response)
 
             # 发送完成事件
             yield {"type": "done", "content": ""}
 
         except Exception as e:
-            logger.error(f"[LLM] Stream generation failed: {e}")
+            logger.error("[LLM] Stream generation failed: %s", e)
             yield {
                 "type": "error",
                 "content": str(e)
@@ -558,56 +818,10 @@ class MedicalLLMService:
 
     def _get_fallback_response(self, intent: str, user_message: str) -> str:
         """获取兜底响应"""
-        fallbacks = {
-            "symptom_inquiry": f"""## 关于您的症状
-
-感谢您描述的症状「{user_message}」。
-
-为了给您更准确的建议，请告诉我：
-- 症状持续多长时间了？
-- 有没有其他伴随症状？
-- 症状的严重程度如何？
-
-> ⚠️ **免责声明**: 以上信息仅供参考，不能替代专业医疗诊断和治疗。如有不适请及时就医。""",
-            "department_query": f"""## 科室推荐
-
-根据您提到的「{user_message}」，建议您挂号前先明确具体症状。
-
-常见科室参考：
-- 头痛头晕 → 神经内科
-- 咳嗽发热 → 呼吸内科/发热门诊
-- 腹痛恶心 → 消化内科
-- 心悸胸痛 → 心血管内科
-
-> ⚠️ **免责声明**: 以上信息仅供参考，不能替代专业医疗诊断和治疗。如有不适请及时就医。""",
-            "medication_consult": """## 用药咨询
-
-关于药品使用，请咨询：
-1. 查阅药品说明书
-2. 咨询医院药师
-3. 咨询开药医生
-
-> ⚠️ **重要提醒**: 请严格按医嘱或说明书使用药品，不要自行调整剂量。""",
-            "appointment": """## 预约挂号
-
-请提供以下信息：
-1. 挂号科室
-2. 就诊时间
-3. 医生类型（专家/普通）
-
-> 💡 **提示**: 如果不确定挂什么科，可以先告诉我您的症状。""",
-            "health_education": """## 健康知识
-
-保持健康的生活方式：
-- 均衡饮食，少盐少油
-- 适量运动，每周150分钟
-- 充足睡眠，规律作息
-- 戒烟限酒，保持好心情
-
-> ⚠️ **免责声明**: 以上信息仅供参考，不能替代专业医疗诊断和治疗。"""
-        }
-
-        return fallbacks.get(intent, "抱歉，我暂时无法处理您的请求，请稍后重试。")
+        template = self._FALLBACK_TEMPLATES.get(intent)
+        if template is not None:
+            return template.safe_substitute(user_message=user_message)
+        return self._FALLBACK_STATIC.get(intent, self._DEFAULT_FALLBACK)
 
 
 # ============================================================
@@ -615,6 +829,8 @@ class MedicalLLMService:
 # ============================================================
 
 _llm_service: Optional[MedicalLLMService] = None
+# 仅保护初始化慢路径，读取单例无需加锁
+_init_lock = asyncio.Lock()
 
 
 def get_llm_service() -> Optional[MedicalLLMService]:
@@ -626,14 +842,21 @@ async def init_llm_service(api_key: str, base_url: str = None, model: str = "qwe
     """初始化LLM服务"""
     global _llm_service
 
-    if _llm_service is None:
-        _llm_service = MedicalLLMService(
-            api_key=api_key,
-            base_url=base_url or "https://dashscope.aliyuncs.com/compatible-mode/v1",
-            model=model
-        )
-        await _llm_service.start()
-        logger.info("[LLM] Service initialized")
+    if _llm_service is not None:
+        return _llm_service
+
+    async with _init_lock:
+        # 双重检查：等待锁期间可能已由其他协程完成初始化
+        if _llm_service is None:
+            service = MedicalLLMService(
+                api_key=api_key,
+                base_url=base_url or "https://dashscope.aliyuncs.com/compatible-mode/v1",
+                model=model
+            )
+            await service.start()
+            # 启动完成后才发布，其他协程不会拿到未启动的实例
+            _llm_service = service
+            logger.info("[LLM] Service initialized")
 
     return _llm_service
 
@@ -5,14 +5,26 @@
 
 import asyncio
 from agent.query_rewriter import QueryRewriter
+import concurrent.futures
+import functools
+import heapq
+import importlib
 import json
 import logging
 import re
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Callable, Awaitable
+import threading
+import time
+from collections import ChainMap, OrderedDict, deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Deque, Dict, List, Mapping, Optional, Callable, Awaitable, Sequence
 from enum import Enum
 from datetime import datetime
-import difflib
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -37,6 +49,10 @@ class IntentType(Enum):
     UNKNOWN = "unknown"
 
 
+# 标签字符串 -> 意图枚举（避免 IntentType(label) 每次按值查找成员）
+_LABEL_TO_INTENT = {intent.value: intent for intent in IntentType}
+
+
 class SkillPriority(Enum):
     """Skill优先级"""
     CRITICAL = 1  # 预约等关键操作
@@ -59,6 +75,8 @@ class IntentResult:
     requires_clarification: bool = False
     clarification_question: Optional[str] = None
     alternatives: List[Dict] = field(default_factory=list)
+    # 复合问题中需要一并调用的其他Skill
+    secondary_skills: List[str] = field(default_factory=list)
 
 
 @dataclass
@@ -66,7 +84,7 @@ class SkillRequest:
     """Skill请求"""
     skill_name: str
     intent: IntentType
-    entities: Dict[str, Any]
+    entities: Mapping[str, Any]
     context: "DialogueContext"
     metadata: Dict[str, Any] = field(default_factory=dict)
 
@@ -85,15 +103,23 @@ class SkillResponse:
 @dataclass
 class DialogueContext:
     """对话上下文"""
+    # 保留的最近对话轮数，更早的轮次自动丢弃
+    MAX_HISTORY = 50
+
     session_id: str
     user_id: str
-    history: List[Dict] = field(default_factory=list)
+    history: Deque[Dict] = field(default_factory=lambda: deque(maxlen=DialogueContext.MAX_HISTORY))
     current_intent: Optional[IntentResult] = None
     accumulated_entities: Dict[str, Any] = field(default_factory=dict)
     metadata: Dict[str, Any] = field(default_factory=dict)
     turn_count: int = 0
     start_time: str = field(default_factory=lambda: datetime.now().isoformat())
 
+    def __post_init__(self):
+        # 传入列表（如从存储恢复）时转为定长环形缓冲
+        if not isinstance(self.history, deque) or self.history.maxlen != self.MAX_HISTORY:
+            self.history = deque(self.history, maxlen=self.MAX_HISTORY)
+
     def add_turn(self, user_input: str, agent_response: str, intent: IntentResult):
         """添加对话轮次"""
         self.history.append({
@@ -111,10 +137,7 @@ class DialogueContext:
         if self.history:
             last_intent_name = self.history[-1].get("intent")
             if last_intent_name:
-                try:
-                    return IntentType(last_intent_name)
-                except ValueError:
-                    pass
+                return _LABEL_TO_INTENT.get(last_intent_name)
         return None
 
     def update_entities(self, entities: Dict[str, Any]):
@@ -126,6 +149,11 @@ class DialogueContext:
 # 响应格式化器
 # ============================================================
 
+def _compile_keyword_pattern(keywords) -> "re.Pattern":
+    """将关键词编译为单个交替正则，长词优先以免被短词截断"""
+    return re.compile("|".join(map(re.escape, sorted(keywords, key=len, reverse=True))))
+
+
 class ResponseFormatter:
     """
     响应格式化器 - 统一格式化所有医疗响应
@@ -141,6 +169,35 @@ class ResponseFormatter:
 > - 持续高烧不退
 > - 严重外伤或大出血"""
 
+    # 预拼接的固定片段，格式化时整段追加
+    _SEPARATOR = "\n\n---\n\n"
+    _DISCLAIMER_SUFFIX = _SEPARATOR + DISCLAIMER
+    _URGENT_SUFFIX = _SEPARATOR + URGENT_WARNING
+    _RISK_SUFFIX = _SEPARATOR + "> ⚠️ **注意**: 以上情况建议及时就医咨询。"
+    _SYMPTOM_TAIL = "---\n\n" + DISCLAIMER
+    _SYMPTOM_NO_DATA_NOTE = "### ⚠️ 注意\n\n- 如症状持续或加重，请及时就医\n- 注意休息，避免过度劳累\n"
+    _DRUG_TAIL = "---\n\n" + DISCLAIMER + "\n\n> 💊 **用药提醒**: 请严格按医嘱或说明书使用，不要超量服用。"
+    _DRUG_NO_DATA = "暂无详细信息，请咨询医生或药师。\n\n"
+    _DISCLAIMER_MARKER = re.compile("disclaimer", re.IGNORECASE)
+
+    # 默认关键词表情映射
+    DEFAULT_EMOJI_MAP = {
+        "头痛": "🤕",
+        "发热": "🌡️",
+        "咳嗽": "🗣️",
+        "腹痛": "😣",
+        "胸痛": "💔",
+        "药品": "💊",
+        "医院": "🏥",
+        "科室": "🏥",
+        "医生": "👨‍⚕️",
+        "健康": "💪",
+        "运动": "🏃",
+        "饮食": "🥗",
+        "睡眠": "😴",
+    }
+    _EMOJI_PATTERN = _compile_keyword_pattern(DEFAULT_EMOJI_MAP)
+
     def __init__(self):
         self.formatters = {
             "symptom": self._format_symptom_response,
@@ -172,8 +229,6 @@ class ResponseFormatter:
         Returns:
             str: 格式化后的响应
         """
-        formatter = self.formatters.get(response_type, self._format_default_response)
-
         if response_type == "symptom":
             # 症状类型需要额外参数
             symptom = kwargs.get("symptom", "症状")
@@ -185,125 +240,112 @@ class ResponseFormatter:
             data = kwargs.get("data", {})
             return self._format_drug_response(drug_name, query_type, data)
 
+        formatter = self.formatters.get(response_type, self._format_default_response)
         return formatter(content, has_risk=has_risk, urgent=urgent, **kwargs)
 
     def _format_symptom_response(self, symptom: str, data: Dict) -> str:
         """格式化症状响应"""
-        response = f"## 关于【{symptom}】\n\n"
+        parts = [f"## 关于【{symptom}】\n\n"]
 
         if data:
-            response += f"**症状描述**: {data.get('description', '')}\n\n"
+            parts.append(f"**症状描述**: {data.get('description', '')}\n\n")
 
             # 常见原因
             causes = data.get('common_causes', [])
             if causes:
-                response += f"**常见原因**:\n"
-                for cause in causes[:5]:
-                    response += f"- {cause}\n"
-                response += "\n"
+                parts.append("**常见原因**:\n")
+                parts.extend(f"- {cause}\n" for cause in causes[:5])
+                parts.append("\n")
 
             # 红旗征
             red_flags = data.get('red_flags', [])
             if red_flags:
-                response += f"### ⚠️ 危险信号\n\n"
-                response += "如有以下情况请立即就医：\n"
-                for flag in red_flags:
-                    response += f"- {flag}\n"
-                response += "\n"
+                parts.append("### ⚠️ 危险信号\n\n如有以下情况请立即就医：\n")
+                parts.extend(f"- {flag}\n" for flag in red_flags)
+                parts.append("\n")
 
             # 建议科室
-            response += f"**建议科室**: {data.get('department', '内科')}\n\n"
+            parts.append(f"**建议科室**: {data.get('department', '内科')}\n\n")
 
             # 自我护理
             self_care = data.get('self_care', [])
             if self_care:
-                response += f"**自我护理建议**:\n"
-                for care in self_care:
-                    response += f"- {care}\n"
-                response += "\n"
+                parts.append("**自我护理建议**:\n")
+                parts.extend(f"- {care}\n" for care in self_care)
+                parts.append("\n")
 
-            response += f"💡 **小贴士**: {data.get('tip', '注意休息，保持良好的生活习惯')}\n\n"
+            parts.append(f"💡 **小贴士**: {data.get('tip', '注意休息，保持良好的生活习惯')}\n\n")
         else:
-            response += f"关于{symptom}的相关信息，建议您咨询专业医生。\n\n"
-            response += "### ⚠️ 注意\n\n"
-            response += "- 如症状持续或加重，请及时就医\n"
-            response += "- 注意休息，避免过度劳累\n"
+            parts.append(f"关于{symptom}的相关信息，建议您咨询专业医生。\n\n")
+            parts.append(self._SYMPTOM_NO_DATA_NOTE)
 
-        response += "---\n\n"
-        response += self.DISCLAIMER
-        return response
+        parts.append(self._SYMPTOM_TAIL)
+        return "".join(parts)
 
     def _format_drug_response(self, drug_name: str, query_type: str, data: Dict) -> str:
         """格式化药品响应"""
-        response = f"## 💊 {drug_name}\n\n"
+        parts = [f"## 💊 {drug_name}\n\n"]
 
         if data:
-            response += f"**通用名**: {data.get('generic_name', drug_name)}\n"
+            parts.append(f"**通用名**: {data.get('generic_name', drug_name)}\n")
             if "english_name" in data:
-                response += f"**英文名**: {data['english_name']}\n"
-            response += f"**分类**: {data.get('category', '')}\n\n"
+                parts.append(f"**英文名**: {data['english_name']}\n")
+            parts.append(f"**分类**: {data.get('category', '')}\n\n")
 
             # 用法用量
-            if query_type in ["info", "dosage"]:
-                response += "### 💡 用法用量\n\n"
+            if query_type in ("info", "dosage"):
+                parts.append("### 💡 用法用量\n\n")
                 dosage = data.get("dosage", {})
                 if "adult" in dosage:
-                    response += f"- **成人**: {dosage['adult']}\n"
+                    parts.append(f"- **成人**: {dosage['adult']}\n")
                 if "children" in dosage:
-                    response += f"- **儿童**: {dosage['children']}\n"
-                response += "\n"
+                    parts.append(f"- **儿童**: {dosage['children']}\n")
+                parts.append("\n")
 
             # 副作用
             side_effects = data.get("side_effects", [])
             if side_effects:
-                response += "### 📝 可能的副作用\n\n"
-                for se in side_effects:
-                    response += f"- {se}\n"
-                response += "\n"
+                parts.append("### 📝 可能的副作用\n\n")
+                parts.extend(f"- {se}\n" for se in side_effects)
+                parts.append("\n")
 
             # 禁忌
             contraindications = data.get("contraindications", [])
             if contraindications:
-                response += "### ⚠️ 禁忌症\n\n"
-                for ct in contraindications:
-                    response += f"- {ct}\n"
-                response += "\n"
+                parts.append("### ⚠️ 禁忌症\n\n")
+                parts.extend(f"- {ct}\n" for ct in contraindications)
+                parts.append("\n")
 
             # 注意事项
             warnings = data.get("warnings", "")
             if warnings:
-                response += f"### ⚠️ 注意事项\n\n{warnings}\n\n"
+                parts.append(f"### ⚠️ 注意事项\n\n{warnings}\n\n")
 
             # 相互作用
             interactions = data.get("interactions", [])
             if interactions:
-                response += "### 💊 药物相互作用\n\n"
-                for interaction in interactions:
-                    response += f"- {interaction}\n"
-                response += "\n"
+                parts.append("### 💊 药物相互作用\n\n")
+                parts.extend(f"- {interaction}\n" for interaction in interactions)
+                parts.append("\n")
         else:
-            response += "暂无详细信息，请咨询医生或药师。\n\n"
+            parts.append(self._DRUG_NO_DATA)
 
-        response += "---\n\n"
-        response += self.DISCLAIMER
-        response += "\n\n> 💊 **用药提醒**: 请严格按医嘱或说明书使用，不要超量服用。"
-        return response
+        parts.append(self._DRUG_TAIL)
+        return "".join(parts)
+
+    def _append_disclaimer(self, content: str) -> str:
+        """追加免责声明，内容已以分隔线结尾时不重复分隔线"""
+        if content.endswith("---"):
+            return content + self.DISCLAIMER
+        return content + self._DISCLAIMER_SUFFIX
 
     def _format_department_response(self, content: str, **kwargs) -> str:
         """格式化科室推荐响应"""
-        response = content
-
-        if not response.endswith("---"):
-            response += "\n\n---\n\n"
-
-        response += self.DISCLAIMER
-        return response
+        return self._append_disclaimer(content)
 
     def _format_health_response(self, content: str, **kwargs) -> str:
         """格式化健康响应"""
-        if not content.endswith("---"):
-            content += "\n\n---\n\n"
-        return content + self.DISCLAIMER
+        return self._append_disclaimer(content)
 
     def _format_greeting_response(self, content: str, **kwargs) -> str:
         """格式化问候响应"""
@@ -315,69 +357,51 @@ class ResponseFormatter:
 
     def _format_default_response(self, content: str, has_risk: bool = False, urgent: bool = False, **kwargs) -> str:
         """格式化默认响应"""
-        response = content
-
-        # 添加紧急提示
+        # 紧急提示 / 风险提示之后再追加免责声明
         if urgent:
-            response += "\n\n---\n\n"
-            response += self.URGENT_WARNING
-
-        # 添加风险提示
-        elif has_risk:
-            response += "\n\n---\n\n"
-            response += "> ⚠️ **注意**: 以上情况建议及时就医咨询。"
-
-        # 添加免责声明
-        if not response.endswith("---"):
-            response += "\n\n---\n\n"
-        response += self.DISCLAIMER
-
-        return response
+            return content + self._URGENT_SUFFIX + self._DISCLAIMER_SUFFIX
+        if has_risk:
+            return content + self._RISK_SUFFIX + self._DISCLAIMER_SUFFIX
+        return self._append_disclaimer(content)
 
     def add_emergency_warning(self, response: str) -> str:
         """添加紧急警告"""
         if "🚨" not in response and "紧急" not in response:
-            response += "\n\n---\n\n"
-            response += self.URGENT_WARNING
+            return response + self._URGENT_SUFFIX
         return response
 
     def add_disclaimer(self, response: str) -> str:
         """添加免责声明"""
-        if "免责声明" not in response and "disclaimer" not in response.lower():
-            if not response.endswith("---"):
-                response += "\n\n---\n\n"
-            response += self.DISCLAIMER
-        return response
+        # 先查中文标记；英文标记用忽略大小写的正则检索，不复制整段文本做lower()
+        if "免责声明" in response or self._DISCLAIMER_MARKER.search(response):
+            return response
+        return self._append_disclaimer(response)
 
     def format_with_emoji(self, text: str, emoji_map: Dict[str, str] = None) -> str:
         """添加表情符号"""
-        default_map = {
-            "头痛": "🤕",
-            "发热": "🌡️",
-            "咳嗽": "🗣️",
-            "腹痛": "😣",
-            "胸痛": "💔",
-            "药品": "💊",
-            "医院": "🏥",
-            "科室": "🏥",
-            "医生": "👨‍⚕️",
-            "健康": "💪",
-            "运动": "🏃",
-            "饮食": "🥗",
-            "睡眠": "😴",
-        }
-
-        emoji_map = emoji_map or default_map
-        for keyword, emoji in emoji_map.items():
-            text = text.replace(keyword, f"{emoji} {keyword}")
+        if emoji_map:
+            pattern = _compile_keyword_pattern(emoji_map)
+        else:
+            emoji_map = self.DEFAULT_EMOJI_MAP
+            pattern = self._EMOJI_PATTERN
 
-        return text
+        # 单次扫描替换所有关键词
+        return pattern.sub(lambda m: f"{emoji_map[m.group(0)]} {m.group(0)}", text)
 
 
 # ============================================================
 # 健康知识库
 # ============================================================
 
+@functools.lru_cache(maxsize=1024)
+def _fuzzy_match_key(keys: tuple, query: str) -> Optional[str]:
+    """模糊匹配知识库键（双向包含），返回命中的键名"""
+    for key in keys:
+        if key in query or query in key:
+            return key
+    return None
+
+
 class HealthKnowledgeBase:
     """健康知识库"""
 
@@ -461,13 +485,15 @@ class HealthKnowledgeBase:
         "胃病": ["辛辣食物", "生冷食物", "咖啡", "酒精", "过硬食物"]
     }
 
+    # 模糊匹配用的键元组（知识库为静态数据）
+    _DISEASE_KEYS = tuple(DISEASE_PREVENTION)
+    _FOOD_RESTRICTION_KEYS = tuple(FOOD_RESTRICTIONS)
+
     def get_disease_prevention(self, disease: str) -> Optional[Dict]:
         """获取疾病预防知识"""
         # 模糊匹配
-        for key, value in self.DISEASE_PREVENTION.items():
-            if key in disease or disease in key:
-                return value
-        return None
+        key = _fuzzy_match_key(self._DISEASE_KEYS, disease)
+        return self.DISEASE_PREVENTION[key] if key is not None else None
 
     def get_healthy_lifestyle(self, category: str = None) -> Dict:
         """获取健康生活方式建议"""
@@ -477,40 +503,207 @@ class HealthKnowledgeBase:
 
     def get_food_restrictions(self, condition: str) -> List[str]:
         """获取饮食禁忌"""
-        for key, value in self.FOOD_RESTRICTIONS.items():
-            if key in condition or condition in key:
-                return value
-        return []
+        key = _fuzzy_match_key(self._FOOD_RESTRICTION_KEYS, condition)
+        return self.FOOD_RESTRICTIONS[key] if key is not None else []
 
 
 # ============================================================
 # 意图分类器
 # ============================================================
 
-# 导入ML分类器（优先MLP）
-try:
-    from agent.mlp_intent_classifier import MLPIntentClassifier
-    MLP_AVAILABLE = True
-except ImportError:
-    try:
-        from .mlp_intent_classifier import MLPIntentClassifier
-        MLP_AVAILABLE = True
-    except ImportError:
-        MLP_AVAILABLE = False
+def _resolve_class(module_name: str, class_name: str) -> Optional[type]:
+    """按 agent 包绝对路径、再按当前包相对路径导入模块并取出类，均不可用时返回None"""
+    candidates = ["agent." + module_name]
+    if __package__ and __package__ != "agent":
+        candidates.append(f"{__package__}.{module_name}")
+    for candidate in candidates:
+        try:
+            return getattr(importlib.import_module(candidate), class_name)
+        except (ImportError, AttributeError):
+            continue
+    return None
 
-try:
-    from agent.ml_intent_classifier import MLIntentClassifier
-    LR_AVAILABLE = True
-except ImportError:
-    try:
-        from .ml_intent_classifier import MLIntentClassifier
-        LR_AVAILABLE = True
-    except ImportError:
-        LR_AVAILABLE = False
+
+# 导入ML分类器（优先MLP），模块加载时解析一次
+MLPIntentClassifier = _resolve_class("mlp_intent_classifier", "MLPIntentClassifier")
+MLIntentClassifier = _resolve_class("ml_intent_classifier", "MLIntentClassifier")
+MLP_AVAILABLE = MLPIntentClassifier is not None
+LR_AVAILABLE = MLIntentClassifier is not None
 
 if not MLP_AVAILABLE and not LR_AVAILABLE:
     logger.warning("ML意图分类器未找到，将使用规则分类器")
 
+# 预编译的分类/实体提取正则
+# 否定句 (如 "不头痛"、"不痛")：两条规则共享开头的否定词，合并为一条并用 match
+# 锚定在行首，非否定开头的输入在首字符即失败（"没有" 已被 "没" 加任意字符覆盖）
+_NEGATION_RE = re.compile(
+    r"(?:不|没|别|无)"
+    r"(?:.*?(?:痛|病|难受|不舒服|症状)(?:$|[，。])|.+?(?:痛|病|难受|不舒服))"
+)
+# 特殊模式：吃了X天药
+_MEDICATION_COURSE_RE = re.compile(r'吃.*?药|服用.*?|.*?药.*?[天次]')
+_DURATION_RE = re.compile(r'(\d+)(天|周|个月|小时|日)')
+_PHONE_RE = re.compile(r'1[3-9]\d{9}')
+# 严重程度关键词，命名分组即等级；多个等级同时出现时按 _SEVERITY_LEVELS 的顺序取
+_SEVERITY_RE = re.compile(r'(?P<severe>剧烈|非常|特别)|(?P<moderate>比较|挺)|(?P<mild>有点|轻微|稍微)')
+_SEVERITY_LEVELS = ("severe", "moderate", "mild")
+_ASCII_UPPER_RE = re.compile(r'[A-Z]')
+
+# 意图 <-> 定长分数数组下标
+_INTENT_TYPES = tuple(IntentType)
+_INTENT_INDEX = {intent: index for index, intent in enumerate(_INTENT_TYPES)}
+_SYMPTOM_INDEX = _INTENT_INDEX[IntentType.SYMPTOM_INQUIRY]
+_MEDICATION_INDEX = _INTENT_INDEX[IntentType.MEDICATION_CONSULT]
+_LABEL_TO_INDEX = {intent.value: index for index, intent in enumerate(_INTENT_TYPES)}
+
+# 意图置信度阈值
+_INTENT_THRESHOLDS = {
+    IntentType.APPOINTMENT: 0.70,
+    IntentType.MEDICATION_CONSULT: 0.30,
+    IntentType.SYMPTOM_INQUIRY: 0.50,
+    IntentType.DEPARTMENT_QUERY: 0.60,
+    IntentType.HEALTH_EDUCATION: 0.40,
+    IntentType.REPORT_INTERPRET: 0.60,
+    IntentType.MY_APPOINTMENT: 0.60,
+    IntentType.FOLLOWUP: 0.60,
+    IntentType.RECORDS: 0.60,
+}
+# 意图对应的Skill
+_INTENT_SKILLS = {
+    IntentType.SYMPTOM_INQUIRY: "symptom-analyzer",
+    IntentType.DEPARTMENT_QUERY: "department-recommender",
+    IntentType.MEDICATION_CONSULT: "medication-advisor",
+    IntentType.APPOINTMENT: "appointment-service",
+    IntentType.MY_APPOINTMENT: "my-appointment-handler",
+    IntentType.FOLLOWUP: "followup-handler",
+    IntentType.RECORDS: "records-handler",
+    IntentType.REPORT_INTERPRET: "report-interpreter",
+    IntentType.HEALTH_EDUCATION: "health-educator",
+    IntentType.GREETING: "greeting-handler",
+    IntentType.UNKNOWN: "fallback-handler",
+}
+# 意图的中文描述
+_INTENT_DESCRIPTIONS = {
+    IntentType.SYMPTOM_INQUIRY: "症状",
+    IntentType.DEPARTMENT_QUERY: "挂号科室",
+    IntentType.MEDICATION_CONSULT: "用药",
+    IntentType.APPOINTMENT: "预约挂号",
+    IntentType.MY_APPOINTMENT: "预约查询",
+    IntentType.FOLLOWUP: "预约随访",
+    IntentType.RECORDS: "治疗档案",
+    IntentType.REPORT_INTERPRET: "报告解读",
+    IntentType.HEALTH_EDUCATION: "健康知识",
+}
+# 按意图下标展开的平铺表，热路径直接下标访问
+_THRESHOLD_BY_INDEX = tuple(_INTENT_THRESHOLDS.get(intent, 0.60) for intent in _INTENT_TYPES)
+_SKILL_BY_INDEX = tuple(_INTENT_SKILLS.get(intent, "fallback-handler") for intent in _INTENT_TYPES)
+_DESCRIPTION_BY_INDEX = tuple(_INTENT_DESCRIPTIONS.get(intent, "相关") for intent in _INTENT_TYPES)
+
+
+def _unique_chars_at_most(text: str, cap: int) -> bool:
+    """不同字符数是否不超过cap；超过时立即返回，不为整段文本建集合"""
+    seen = ""
+    for char in text:
+        if char not in seen:
+            if len(seen) == cap:
+                return False
+            seen += char
+    return True
+
+
+def _case_flags(pattern: str) -> int:
+    """仅含无大小写字符（如中文）的正则无需IGNORECASE，避免匹配时逐字符做大小写折叠"""
+    return re.IGNORECASE if pattern.lower() != pattern.upper() else 0
+# 混合英中症状关键词
+_MIXED_SYMPTOMS = {
+    "headache": "头痛", "fever": "发热", "cough": "咳嗽",
+    "stomach ache": "胃痛", "nausea": "恶心",
+    "pain": "痛", "ache": "痛"
+}
+
+
+def _trie_regex(words: Sequence[str]) -> "re.Pattern":
+    """
+    将词表按公共前缀构建字符trie并生成分解后的正则
+    如 心血管|心脏|心律 -> 心(?:血管|脏|律)，同一前缀在一次匹配中只检查一次
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        optional = "" in node
+        branches = [re.escape(char) + build(child) for char, child in node.items() if char]
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            pattern = branches[0]
+            if optional:
+                pattern = f"(?:{pattern})" if len(pattern) > 1 else pattern
+        else:
+            pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if optional else pattern
+
+    return re.compile(build(trie))
+
+
+class _KeywordMatcher:
+    """
+    多类别关键词匹配器
+    安装pyahocorasick时构建Aho-Corasick自动机，单次扫描文本即可得到所有类别的命中；
+    未安装时回退为逐词子串检查，每个类别先用前缀合并的trie正则判断是否有任一命中
+    """
+
+    def __init__(self, categories: Dict[str, Sequence[str]]):
+        self._categories = {category: tuple(words) for category, words in categories.items()}
+        self._automaton = None
+        self._prefilters: Dict[str, Any] = {}
+
+        if AHOCORASICK_AVAILABLE:
+            # 同一关键词可能属于多个类别，payload记录全部 (类别, 词表下标)
+            payloads: Dict[str, List] = {}
+            for category, words in self._categories.items():
+                for index, word in enumerate(words):
+                    payloads.setdefault(word, []).append((category, index))
+            automaton = ahocorasick.Automaton()
+            for word, payload in payloads.items():
+                automaton.add_word(word, tuple(payload))
+            automaton.make_automaton()
+            self._automaton = automaton
+        else:
+            self._prefilters = {
+                category: _trie_regex(words).search for category, words in self._categories.items() if words
+            }
+
+    def words(self, category: str) -> Sequence[str]:
+        """获取类别词表"""
+        return self._categories[category]
+
+    def match(self, text: str) -> Dict[str, List[int]]:
+        """
+        匹配文本
+
+        Returns:
+            Dict[str, List[int]]: 类别 -> 命中关键词在词表中的下标（升序、去重）
+        """
+        if self._automaton is not None:
+            found: Dict[str, set] = {}
+            for _, payload in self._automaton.iter(text):
+                for category, index in payload:
+                    found.setdefault(category, set()).add(index)
+            return {category: sorted(indexes) for category, indexes in found.items()}
+
+        hits = {}
+        for category, search in self._prefilters.items():
+            # 整个类别无命中时跳过逐词检查（最常见的情况）
+            if not search(text):
+                continue
+            hits[category] = [index for index, word in enumerate(self._categories[category]) if word in text]
+        return hits
+
 
 class IntentClassifier:
     """
@@ -522,7 +715,47 @@ class IntentClassifier:
     3. 规则分类器 (后备方案)
     """
 
-    def __init__(self, use_ml: bool = True, mlp_model_path: str = None, lr_model_path: str = None):
+    # 实体提取词表
+    COMMON_DRUGS = ["阿莫西林", "布洛芬", "对乙酰氨基酚", "二甲双胍", "硝苯地平", "奥美拉唑"]
+    HEALTH_TOPICS = ["高血压", "糖尿病", "感冒", "心血管"]
+    APPOINTMENT_DEPARTMENTS = ["内科", "外科", "儿科", "妇科", "骨科", "眼科", "皮肤科", "神经内科", "心血管内科"]
+
+    # 关键词加分: 类别 -> (意图, 每个命中关键词的加分)
+    _KEYWORD_BONUS = (
+        ("symptom", _SYMPTOM_INDEX, 0.2),
+        ("drug", _MEDICATION_INDEX, 0.3),
+    )
+    _KEYWORD_BONUS_LATE = (
+        ("department", _INTENT_INDEX[IntentType.DEPARTMENT_QUERY], 0.2),
+        ("health", _INTENT_INDEX[IntentType.HEALTH_EDUCATION], 0.3),
+    )
+    # 边界情况的固定结果（只读，复制后返回）
+    _GREETING_RESULT = IntentResult(
+        intent=IntentType.GREETING,
+        confidence=0.95,
+        target_skill="greeting-handler",
+        entities={}
+    )
+    _SHORTCUT_UNKNOWN_RESULT = IntentResult(
+        intent=IntentType.UNKNOWN,
+        confidence=0.0,
+        target_skill="fallback-handler",
+        entities={}
+    )
+    # 需要从关键词命中中提取实体的意图
+    _KEYWORD_ENTITY_INTENTS = frozenset({
+        IntentType.SYMPTOM_INQUIRY, IntentType.MEDICATION_CONSULT,
+        IntentType.HEALTH_EDUCATION, IntentType.APPOINTMENT,
+    })
+
+    def __init__(
+        self,
+        use_ml: bool = True,
+        mlp_model_path: str = None,
+        lr_model_path: str = None,
+        cache_size: int = 4096,
+        use_int8: bool = False
+    ):
         """
         初始化意图分类器
 
@@ -530,17 +763,24 @@ class IntentClassifier:
             use_ml: 是否使用ML模型（默认True）
             mlp_model_path: MLP模型路径
             lr_model_path: 逻辑回归模型路径
+            cache_size: 分类结果LRU缓存容量，0表示不缓存
+            use_int8: MLP推理是否使用int8量化权重
         """
         self.use_ml = use_ml
+        # 分类结果缓存: (文本, 上一轮意图) -> IntentResult
+        self.cache_size = cache_size
+        self._result_cache: "OrderedDict[tuple, IntentResult]" = OrderedDict()
+        # 分类可能在推理线程池中执行，缓存读写加锁
+        self._cache_lock = threading.Lock()
         self.mlp_classifier = None
         self.lr_classifier = None
         self.ml_enabled = False
         self.classifier_type = "rule"
 
         # 尝试加载MLP模型（最优）
-        if use_ml and MLP_AVAILABLE:
+        if use_ml and MLPIntentClassifier is not None:
             try:
-                self.mlp_classifier = MLPIntentClassifier(model_path=mlp_model_path)
+                self.mlp_classifier = MLPIntentClassifier(model_path=mlp_model_path, use_int8=use_int8)
                 if self.mlp_classifier.is_trained:
                     self.ml_enabled = True
                     self.classifier_type = "mlp"
@@ -548,10 +788,10 @@ class IntentClassifier:
                 else:
                     logger.info("MLP模型未训练，尝试逻辑回归...")
             except Exception as e:
-                logger.warning(f"MLP分类器加载失败: {e}")
+                logger.warning("MLP分类器加载失败: %s", e)
 
         # 如果MLP不可用，尝试逻辑回归
-        if not self.ml_enabled and LR_AVAILABLE:
+        if not self.ml_enabled and MLIntentClassifier is not None:
             try:
                 self.lr_classifier = MLIntentClassifier(model_path=lr_model_path)
                 if self.lr_classifier.is_trained:
@@ -561,10 +801,15 @@ class IntentClassifier:
                 else:
                     logger.info("逻辑回归模型未训练，使用规则分类器...")
             except Exception as e:
-                logger.warning(f"逻辑回归分类器加载失败: {e}")
+                logger.warning("逻辑回归分类器加载失败: %s", e)
 
         # 规则分类器初始化（作为后备）
         self.intent_rules = self._init_rules()
+        # 评分时按下标累加，避免逐次哈希意图枚举；规则展开为预绑定search方法的元组
+        self._rule_buckets = [
+            (_INTENT_INDEX[intent], tuple(self._rule_searchers(rule) for rule in rules), len(rules))
+            for intent, rules in self.intent_rules.items()
+        ]
 
         # 症状关键词库
         self.symptom_keywords = [
@@ -593,6 +838,7 @@ class IntentClassifier:
             "早上好", "下午好", "晚上好", "晚安",
             "谢谢", "感谢", "再见", "拜拜"
         ]
+        self.greeting_pattern = _compile_keyword_pattern(self.greetings)
 
         # 健康关键词
         self.health_keywords = [
@@ -601,9 +847,20 @@ class IntentClassifier:
             "运动", "锻炼", "活动", "健身", "建议", "推荐"
         ]
 
+        # 所有中文关键词词表合并为一个匹配器，每次分类只扫描一遍文本
+        self.keyword_matcher = _KeywordMatcher({
+            "symptom": self.symptom_keywords,
+            "drug": self.drug_keywords,
+            "department": self.department_keywords,
+            "health": self.health_keywords,
+            "common_drug": self.COMMON_DRUGS,
+            "health_topic": self.HEALTH_TOPICS,
+            "appointment_department": self.APPOINTMENT_DEPARTMENTS,
+        })
+
     def _init_rules(self) -> Dict[IntentType, List[Dict]]:
-        """初始化意图匹配规则"""
-        return {
+        """初始化意图匹配规则（正则在此一次性编译）"""
+        rules = {
             IntentType.SYMPTOM_INQUIRY: [
                 {"patterns": [r"(我|最近)(.+?)(疼|痛|难受|不舒服|症状)", r"(.+?)怎么回事"], "weight": 1.0},
                 {"patterns": [r"(.+?)是什么症状", r"(.+?)是什么病", r"(.+?)是啥病"], "weight": 0.9},
@@ -634,11 +891,59 @@ class IntentClassifier:
                 {"patterns": [r"有什么运动建议", r"运动建议", r"锻炼建议", r"(.+?)运动", r"(.+?)健身"], "weight": 0.8},
             ],
         }
+        return {
+            intent: [self._compile_rule(rule["patterns"], rule["weight"]) for rule in intent_rules]
+            for intent, intent_rules in rules.items()
+        }
+
+    @staticmethod
+    def _compile_rule(patterns: List[str], weight: float) -> Dict[str, Any]:
+        """
+        编译一组同权重规则
+        除各条正则外，额外生成一个非捕获分组的并集正则：一次扫描即可判断整组是否有命中，
+        仅在命中时再逐条计数（每条命中的规则各加一次权重）
+        """
+        compiled = [re.compile(p, _case_flags(p)) for p in patterns]
+        if len(compiled) == 1:
+            union = compiled[0]
+        else:
+            union_pattern = "|".join(f"(?:{p})" for p in patterns)
+            union = re.compile(union_pattern, _case_flags(union_pattern))
+        return {"patterns": compiled, "union": union, "weight": weight}
+
+    @staticmethod
+    def _rule_searchers(rule: Dict[str, Any]) -> tuple:
+        """
+        展开为评分循环使用的 (并集search, 逐条search元组, 权重)
+        单条规则的并集即其自身，逐条元组为空，并集命中即计一次权重
+        """
+        patterns = rule["patterns"]
+        searches = tuple(pattern.search for pattern in patterns) if len(patterns) > 1 else ()
+        return rule["union"].search, searches, rule["weight"]
 
     async def classify(
         self,
         text: str,
         context: DialogueContext
+    ) -> IntentResult:
+        """
+        分类用户意图（协程接口，兼容异步调用方）
+
+        分类过程不涉及IO，直接委托给同步实现 classify_sync
+
+        Args:
+            text: 用户输入
+            context: 对话上下文
+
+        Returns:
+            IntentResult: 意图识别结果
+        """
+        return self.classify_sync(text, context)
+
+    def classify_sync(
+        self,
+        text: str,
+        context: DialogueContext
     ) -> IntentResult:
         """
         分类用户意图
@@ -654,64 +959,180 @@ class IntentClassifier:
         """
         text = text.strip()
 
-        # 边界情况：问候语检测（最高优先级）
-        text_lower = text.lower()
-        for greeting in self.greetings:
-            if greeting in text_lower:
-                return IntentResult(
-                    intent=IntentType.GREETING,
-                    confidence=0.95,
-                    target_skill="greeting-handler",
-                    entities={}
-                )
+        # 分类结果只取决于文本和上一轮意图，重复输入直接命中缓存
+        cache_key = (text, context.get_last_intent())
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            return cached
+
+        # 小写文本只计算一次；不含ASCII大写字母（如纯中文）时无需复制
+        text_lower = text.lower() if _ASCII_UPPER_RE.search(text) else text
+
+        result = self._classify_edge_cases(text, text_lower, cache_key[1])
+        if result is None:
+            if self.ml_enabled:
+                # ============ ML分类（优先） ============
+                result = self._classify_with_ml(text, context, text_lower)
+            else:
+                # ============ 规则分类（后备） ============
+                result = self._classify_with_rules(text, context, text_lower)
+
+        return self._cache_result(cache_key, result)
+
+    def _get_cached_result(self, cache_key: tuple) -> Optional[IntentResult]:
+        """读取分类结果缓存，返回副本以免调用方修改缓存内容"""
+        with self._cache_lock:
+            cached = self._result_cache.get(cache_key)
+            if cached is None:
+                return None
+            self._result_cache.move_to_end(cache_key)
+        return replace(cached, entities=dict(cached.entities), alternatives=list(cached.alternatives))
+
+    def _cache_result(self, cache_key: tuple, result: IntentResult) -> IntentResult:
+        """写入分类结果缓存（LRU淘汰），返回交给调用方的副本"""
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._result_cache[cache_key] = result
+                if len(self._result_cache) > self.cache_size:
+                    self._result_cache.popitem(last=False)
+        return replace(result, entities=dict(result.entities), alternatives=list(result.alternatives))
+
+    def clear_cache(self):
+        """清空分类结果缓存（模型重新加载或规则变更后调用）"""
+        with self._cache_lock:
+            self._result_cache.clear()
+
+    async def classify_many(
+        self,
+        texts: List[str],
+        contexts: List[DialogueContext]
+    ) -> List[IntentResult]:
+        """批量分类用户意图（协程接口）"""
+        return self.classify_many_sync(texts, contexts)
+
+    def classify_many_sync(
+        self,
+        texts: List[str],
+        contexts: List[DialogueContext]
+    ) -> List[IntentResult]:
+        """
+        批量分类用户意图
+
+        问候语/否定句/无意义输入等边界情况逐条处理，其余文本合并为一次ML前向计算，
+        结果按输入顺序返回
+
+        Args:
+            texts: 用户输入列表
+            contexts: 与输入一一对应的对话上下文
+
+        Returns:
+            List[IntentResult]: 意图识别结果
+        """
+        results: List[Optional[IntentResult]] = [None] * len(texts)
+        pending = []  # (下标, 文本, 小写文本, 缓存键)
+
+        for index, (text, context) in enumerate(zip(texts, contexts)):
+            text = text.strip()
+            cache_key = (text, context.get_last_intent())
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                results[index] = cached
+                continue
+
+            text_lower = text.lower() if _ASCII_UPPER_RE.search(text) else text
+            result = self._classify_edge_cases(text, text_lower, cache_key[1])
+            if result is None and self.ml_enabled:
+                pending.append((index, text, text_lower, cache_key))
+                continue
+            if result is None:
+                result = self._classify_with_rules(text, context, text_lower)
+            results[index] = self._cache_result(cache_key, result)
+
+        if pending:
+            batch_results = self._predict_top_k_batch([text for _, text, _, _ in pending])
+            for position, (index, text, text_lower, cache_key) in enumerate(pending):
+                top_results = batch_results[position] if batch_results is not None else None
+                result = self._classify_with_ml(text, contexts[index], text_lower, top_results)
+                results[index] = self._cache_result(cache_key, result)
+
+        return results
+
+    def _classify_edge_cases(
+        self,
+        text: str,
+        text_lower: str,
+        last_intent: Optional[IntentType] = None
+    ) -> Optional[IntentResult]:
+        """
+        边界情况检测，命中时直接返回结果，不进入模型/规则分类
+        返回的是共享的固定结果，经 _cache_result 复制后才交给调用方
+        """
+        # 边界情况：问候语检测（最高优先级），所有问候语合并为一个正则单次扫描
+        if self.greeting_pattern.search(text_lower):
+            return self._GREETING_RESULT
 
         # 边界情况：检查否定句 (如 "不头痛"、"不痛")
-        negation_patterns = [
-            r"^(不|没|没有|别|无)(.)*?(痛|病|难受|不舒服|症状)($|，|。)",
-            r"^(不|没|没有|别|无).+?(痛|病|难受|不舒服)",
-        ]
-        for pattern in negation_patterns:
-            if re.search(pattern, text):
-                return IntentResult(
-                    intent=IntentType.UNKNOWN,
-                    confidence=0.0,
-                    target_skill="fallback-handler",
-                    entities={}
-                )
+        if _NEGATION_RE.match(text):
+            return self._SHORTCUT_UNKNOWN_RESULT
 
         # 边界情况：检查重复词或无意义输入
-        if len(text) < 20 and len(set(text)) <= 3 and text.strip():
+        if text and len(text) < 20 and _unique_chars_at_most(text, 3):
+            return self._SHORTCUT_UNKNOWN_RESULT
+
+        # 边界情况：仅输入手机号（预约/随访/档案流程中补充号码），无需模型判断
+        if _PHONE_RE.fullmatch(text):
+            if last_intent == IntentType.FOLLOWUP:
+                intent, action = IntentType.FOLLOWUP, "followup"
+            elif last_intent == IntentType.RECORDS:
+                intent, action = IntentType.RECORDS, "records"
+            else:
+                intent, action = IntentType.MY_APPOINTMENT, "query"
             return IntentResult(
-                intent=IntentType.UNKNOWN,
-                confidence=0.0,
-                target_skill="fallback-handler",
-                entities={}
+                intent=intent,
+                confidence=0.9,
+                target_skill=_SKILL_BY_INDEX[_INTENT_INDEX[intent]],
+                entities={"action": action, "phone": text}
             )
 
-        # ============ ML分类（优先） ============
-        if self.ml_enabled:
-            return await self._classify_with_ml(text, context)
+        return None
 
-        # ============ 规则分类（后备） ============
-        return await self._classify_with_rules(text, context)
+    def _predict_top_k_batch(self, texts: List[str]) -> Optional[List[List]]:
+        """一次前向计算批量预测，模型不支持或预测失败时返回None（由调用方逐条处理）"""
+        model = self.mlp_classifier if self.mlp_classifier is not None else self.lr_classifier
+        predict_batch = getattr(model, "predict_top_k_batch", None)
+        if predict_batch is None:
+            return None
+        try:
+            return predict_batch(texts, k=3)
+        except Exception as e:
+            logger.error("ML批量分类失败，逐条分类: %s", e)
+            return None
 
-    async def _classify_with_ml(self, text: str, context: DialogueContext) -> IntentResult:
-        """使用ML模型分类（优先MLP）"""
+    def _classify_with_ml(
+        self,
+        text: str,
+        context: DialogueContext,
+        text_lower: Optional[str] = None,
+        top_results: Optional[List] = None
+    ) -> IntentResult:
+        """使用ML模型分类（优先MLP），top_results 为批量预测已得到的结果"""
         try:
-            # 使用MLP或逻辑回归
-            if self.mlp_classifier is not None:
-                top_results = self.mlp_classifier.predict_top_k(text, k=3)
-            elif self.lr_classifier is not None:
-                top_results = self.lr_classifier.predict_top_k(text, k=3)
-            else:
-                return await self._classify_with_rules(text, context)
+            # 使用MLP或逻辑回归（批量调用时已预测）
+            if top_results is None:
+                if self.mlp_classifier is not None:
+                    top_results = self.mlp_classifier.predict_top_k(text, k=3)
+                elif self.lr_classifier is not None:
+                    top_results = self.lr_classifier.predict_top_k(text, k=3)
+                else:
+                    return self._classify_with_rules(text, context, text_lower)
 
             # 解码意图
             intent_label = top_results[0][0]
             confidence = top_results[0][1]
 
-            # 转换为IntentType枚举
-            intent_type = IntentType(intent_label)
+            # 转换为IntentType枚举（未知标签抛出KeyError，降级到规则分类）
+            intent_index = _LABEL_TO_INDEX[intent_label]
+            intent_type = _INTENT_TYPES[intent_index]
 
             # 构建备选列表
             alternatives = [
@@ -720,77 +1141,84 @@ class IntentClassifier:
             ]
 
             # 提取实体
-            entities = await self._extract_entities(text, intent_type, context)
+            entities = self._extract_entities(text, intent_type, context)
 
             return IntentResult(
                 intent=intent_type,
                 confidence=confidence,
-                target_skill=self._get_skill_for_intent(intent_type),
+                target_skill=_SKILL_BY_INDEX[intent_index],
                 entities=entities,
                 alternatives=alternatives
             )
         except Exception as e:
-            logger.error(f"ML分类失败，降级到规则分类: {e}")
-            return await self._classify_with_rules(text, context)
+            logger.error("ML分类失败，降级到规则分类: %s", e)
+            return self._classify_with_rules(text, context, text_lower)
 
-    async def _classify_with_rules(self, text: str, context: DialogueContext) -> IntentResult:
+    def _classify_with_rules(
+        self,
+        text: str,
+        context: DialogueContext,
+        text_lower: Optional[str] = None
+    ) -> IntentResult:
         """使用规则分类（后备方案）"""
-        scores = {}  # intent -> score
-        text_lower = text.lower()  # 转换为小写用于匹配
+        # 定长分数数组（下标见 _INTENT_INDEX）；touched 记录首次得分的顺序，
+        # 同分时与按插入顺序比较的结果一致。所有加分均为正，0.0 即表示未得分
+        scores = [0.0] * len(_INTENT_TYPES)
+        touched: List[int] = []
+        if text_lower is None:
+            text_lower = text.lower()  # 转换为小写用于匹配
 
         # 1. 规则匹配
-        for intent_type, rules in self.intent_rules.items():
+        for index, rules, rule_count in self._rule_buckets:
             intent_score = 0.0
 
-            for rule in rules:
-                for pattern in rule["patterns"]:
-                    if re.search(pattern, text, re.IGNORECASE):
-                        intent_score += rule["weight"]
+            for union_search, searches, weight in rules:
+                # 并集正则未命中时整组跳过（最常见的情况）
+                if not union_search(text):
+                    continue
+                if not searches:
+                    intent_score += weight
+                    continue
+                for search in searches:
+                    if search(text):
+                        intent_score += weight
 
             if intent_score > 0:
                 # 归一化分数
-                scores[intent_type] = min(intent_score / len(rules), 1.0)
+                scores[index] = min(intent_score / rule_count, 1.0)
+                touched.append(index)
 
-        # 2. 关键词加分
-        for keyword in self.symptom_keywords:
-            if keyword in text:
-                scores[IntentType.SYMPTOM_INQUIRY] = scores.get(IntentType.SYMPTOM_INQUIRY, 0) + 0.2
-
-        for keyword in self.drug_keywords:
-            if keyword in text:
-                scores[IntentType.MEDICATION_CONSULT] = scores.get(IntentType.MEDICATION_CONSULT, 0) + 0.3
+        # 2. 关键词加分（单次扫描得到所有词表的命中）
+        keyword_hits = self.keyword_matcher.match(text)
+        self._add_keyword_bonus(scores, touched, keyword_hits, self._KEYWORD_BONUS)
 
         # 特殊模式：吃了X天药
-        if re.search(r'吃.*?药|服用.*?|.*?药.*?[天次]', text):
-            scores[IntentType.MEDICATION_CONSULT] = scores.get(IntentType.MEDICATION_CONSULT, 0) + 0.5
+        if _MEDICATION_COURSE_RE.search(text):
+            if not scores[_MEDICATION_INDEX]:
+                touched.append(_MEDICATION_INDEX)
+            scores[_MEDICATION_INDEX] += 0.5
 
         # 2.5 混合英中检测 - 检查是否包含英文症状关键词
-        mixed_symptoms = {
-            "headache": "头痛", "fever": "发热", "cough": "咳嗽",
-            "stomach ache": "胃痛", "nausea": "恶心",
-            "pain": "痛", "ache": "痛"
-        }
-        for eng, chi in mixed_symptoms.items():
+        for eng in _MIXED_SYMPTOMS:
             if eng in text_lower:
-                scores[IntentType.SYMPTOM_INQUIRY] = scores.get(IntentType.SYMPTOM_INQUIRY, 0) + 0.2
+                if not scores[_SYMPTOM_INDEX]:
+                    touched.append(_SYMPTOM_INDEX)
+                scores[_SYMPTOM_INDEX] += 0.2
 
-        for keyword in self.department_keywords:
-            if keyword in text:
-                scores[IntentType.DEPARTMENT_QUERY] = scores.get(IntentType.DEPARTMENT_QUERY, 0) + 0.2
-
-        for keyword in self.health_keywords:
-            if keyword in text:
-                scores[IntentType.HEALTH_EDUCATION] = scores.get(IntentType.HEALTH_EDUCATION, 0) + 0.3
+        self._add_keyword_bonus(scores, touched, keyword_hits, self._KEYWORD_BONUS_LATE)
 
         # 3. 上下文关联
         last_intent = context.get_last_intent()
         if last_intent and last_intent != IntentType.GREETING:
             if last_intent in [IntentType.SYMPTOM_INQUIRY, IntentType.MEDICATION_CONSULT]:
                 if len(text) < 20:  # 简短回复
-                    scores[last_intent] = scores.get(last_intent, 0) + 0.3
+                    index = _INTENT_INDEX[last_intent]
+                    if not scores[index]:
+                        touched.append(index)
+                    scores[index] += 0.3
 
         # 4. 确定最终意图
-        if not scores:
+        if not touched:
             return IntentResult(
                 intent=IntentType.UNKNOWN,
                 confidence=0.0,
@@ -799,117 +1227,115 @@ class IntentClassifier:
                 clarification_question="抱歉，我没有完全理解您的意思，可以换个说法吗？"
             )
 
-        best_intent = max(scores.items(), key=lambda x: x[1])
-        intent_type, confidence = best_intent
+        # 前3名（同分保持首次得分顺序，与稳定排序一致），第一名即最终意图
+        ranked = heapq.nlargest(3, touched, key=scores.__getitem__)
+        best_index = ranked[0]
+        intent_type, confidence = _INTENT_TYPES[best_index], scores[best_index]
 
         # 检查置信度
-        confidence_threshold = self._get_threshold(intent_type)
-        if confidence < confidence_threshold:
+        if confidence < _THRESHOLD_BY_INDEX[best_index]:
             alternatives = [
-                {"intent": intent.value, "confidence": conf}
-                for intent, conf in sorted(scores.items(), key=lambda x: -x[1])[:3]
+                {"intent": _INTENT_TYPES[index].value, "confidence": scores[index]}
+                for index in ranked
             ]
             return IntentResult(
                 intent=intent_type,
                 confidence=confidence,
-                target_skill=self._get_skill_for_intent(intent_type),
+                target_skill=_SKILL_BY_INDEX[best_index],
                 requires_clarification=True,
-                clarification_question=f"您是想了解{self._get_intent_description(intent_type)}相关的内容吗？",
+                clarification_question=f"您是想了解{_DESCRIPTION_BY_INDEX[best_index]}相关的内容吗？",
                 alternatives=alternatives
             )
 
         # 5. 提取实体
-        entities = await self._extract_entities(text, intent_type, context)
+        entities = self._extract_entities(text, intent_type, context, keyword_hits)
 
         # 6. 构建结果
         return IntentResult(
             intent=intent_type,
             confidence=confidence,
-            target_skill=self._get_skill_for_intent(intent_type),
+            target_skill=_SKILL_BY_INDEX[best_index],
             entities=entities,
             alternatives=[
-                {"intent": intent.value, "confidence": conf}
-                for intent, conf in sorted(scores.items(), key=lambda x: -x[1])[:3]
-                if intent != intent_type
+                {"intent": _INTENT_TYPES[index].value, "confidence": scores[index]}
+                for index in ranked
+                if index != best_index
             ]
         )
 
+    @staticmethod
+    def _add_keyword_bonus(
+        scores: List[float],
+        touched: List[int],
+        keyword_hits: Dict[str, List[int]],
+        bonuses
+    ) -> None:
+        """按命中关键词个数为对应意图（分数数组下标）加分"""
+        for category, index, bonus in bonuses:
+            hits = keyword_hits.get(category)
+            if hits:
+                if not scores[index]:
+                    touched.append(index)
+                for _ in hits:
+                    scores[index] += bonus
+
+    def _first_keyword(
+        self,
+        keyword_hits: Dict[str, List[int]],
+        category: str,
+        min_len: int = 1
+    ) -> Optional[str]:
+        """按词表顺序返回第一个命中且长度不小于min_len的关键词"""
+        words = self.keyword_matcher.words(category)
+        for index in keyword_hits.get(category, ()):
+            if len(words[index]) >= min_len:
+                return words[index]
+        return None
+
     def _get_threshold(self, intent: IntentType) -> float:
         """获取意图的置信度阈值"""
-        thresholds = {
-            IntentType.APPOINTMENT: 0.70,
-            IntentType.MEDICATION_CONSULT: 0.30,
-            IntentType.SYMPTOM_INQUIRY: 0.50,
-            IntentType.DEPARTMENT_QUERY: 0.60,
-            IntentType.HEALTH_EDUCATION: 0.40,
-            IntentType.REPORT_INTERPRET: 0.60,
-            IntentType.MY_APPOINTMENT: 0.60,
-            IntentType.FOLLOWUP: 0.60,
-            IntentType.RECORDS: 0.60,
-        }
-        return thresholds.get(intent, 0.60)
+        return _THRESHOLD_BY_INDEX[_INTENT_INDEX[intent]]
 
     def _get_skill_for_intent(self, intent: IntentType) -> str:
         """获取意图对应的Skill"""
-        skill_map = {
-            IntentType.SYMPTOM_INQUIRY: "symptom-analyzer",
-            IntentType.DEPARTMENT_QUERY: "department-recommender",
-            IntentType.MEDICATION_CONSULT: "medication-advisor",
-            IntentType.APPOINTMENT: "appointment-service",
-            IntentType.MY_APPOINTMENT: "my-appointment-handler",
-            IntentType.FOLLOWUP: "followup-handler",
-            IntentType.RECORDS: "records-handler",
-            IntentType.REPORT_INTERPRET: "report-interpreter",
-            IntentType.HEALTH_EDUCATION: "health-educator",
-            IntentType.GREETING: "greeting-handler",
-            IntentType.UNKNOWN: "fallback-handler",
-        }
-        return skill_map.get(intent, "fallback-handler")
+        return _SKILL_BY_INDEX[_INTENT_INDEX[intent]]
 
     def _get_intent_description(self, intent: IntentType) -> str:
         """获取意图的中文描述"""
-        descriptions = {
-            IntentType.SYMPTOM_INQUIRY: "症状",
-            IntentType.DEPARTMENT_QUERY: "挂号科室",
-            IntentType.MEDICATION_CONSULT: "用药",
-            IntentType.APPOINTMENT: "预约挂号",
-            IntentType.MY_APPOINTMENT: "预约查询",
-            IntentType.FOLLOWUP: "预约随访",
-            IntentType.RECORDS: "治疗档案",
-            IntentType.REPORT_INTERPRET: "报告解读",
-            IntentType.HEALTH_EDUCATION: "健康知识",
-        }
-        return descriptions.get(intent, "相关")
+        return _DESCRIPTION_BY_INDEX[_INTENT_INDEX[intent]]
 
-    async def _extract_entities(
+    def _extract_entities(
         self,
         text: str,
         intent: IntentType,
-        context: DialogueContext
+        context: DialogueContext,
+        keyword_hits: Optional[Dict[str, List[int]]] = None
     ) -> Dict[str, Any]:
-        """提取实体"""
+        """
+        提取实体
+
+        keyword_hits 为规则评分时已得到的关键词命中，传入后不再重复扫描文本；
+        ML路径未做关键词扫描，仅在意图需要词表实体时才扫描一次
+        """
         entities = {}
+        if keyword_hits is None and intent in self._KEYWORD_ENTITY_INTENTS:
+            keyword_hits = self.keyword_matcher.match(text)
 
         if intent == IntentType.SYMPTOM_INQUIRY:
             # 提取症状
-            for symptom in self.symptom_keywords:
-                if symptom in text and len(symptom) > 1:
-                    entities["symptom"] = symptom
-                    break
+            symptom = self._first_keyword(keyword_hits, "symptom", min_len=2)
+            if symptom:
+                entities["symptom"] = symptom
 
             # 提取持续时间
-            duration_match = re.search(r'(\d+)(天|周|个月|小时|日)', text)
+            duration_match = _DURATION_RE.search(text)
             if duration_match:
                 entities["duration"] = duration_match.group(0)
 
-            # 提取严重程度
-            severity_keywords = {
-                "剧烈": "severe", "非常": "severe", "特别": "severe",
-                "比较": "moderate", "挺": "moderate", "有点": "mild",
-                "轻微": "mild", "稍微": "mild"
-            }
-            for keyword, level in severity_keywords.items():
-                if keyword in text:
+            # 提取严重程度（一次扫描）
+            found_levels = {match.lastgroup for match in _SEVERITY_RE.finditer(text)}
+            for level in _SEVERITY_LEVELS:
+                if level in found_levels:
                     entities["severity"] = level
                     break
 
@@ -918,16 +1344,10 @@ class IntentClassifier:
 
         elif intent == IntentType.MEDICATION_CONSULT:
             # 提取药品名称
-            for drug in ["阿莫西林", "布洛芬", "对乙酰氨基酚", "二甲双胍", "硝苯地平", "奥美拉唑"]:
-                if drug in text:
-                    entities["drug_name"] = drug
-                    break
-
-            if "drug_name" not in entities:
-                for drug in self.drug_keywords:
-                    if drug in text and len(drug) > 1:
-                        entities["drug_name"] = drug
-                        break
+            drug = (self._first_keyword(keyword_hits, "common_drug")
+                    or self._first_keyword(keyword_hits, "drug", min_len=2))
+            if drug:
+                entities["drug_name"] = drug
 
             # 检测查询类型
             if "副作用" in text or "不良反应" in text:
@@ -943,10 +1363,9 @@ class IntentClassifier:
 
         elif intent == IntentType.HEALTH_EDUCATION:
             # 提取疾病/健康主题
-            for disease in ["高血压", "糖尿病", "感冒", "心血管"]:
-                if disease in text:
-                    entities["health_topic"] = disease
-                    break
+            disease = self._first_keyword(keyword_hits, "health_topic")
+            if disease:
+                entities["health_topic"] = disease
 
             # 检测查询类型
             if "预防" in text:
@@ -961,22 +1380,21 @@ class IntentClassifier:
         elif intent == IntentType.APPOINTMENT:
             entities["action"] = "book"
             # 提取科室
-            for dept in ["内科", "外科", "儿科", "妇科", "骨科", "眼科", "皮肤科", "神经内科", "心血管内科"]:
-                if dept in text:
-                    entities["department"] = dept
-                    break
+            dept = self._first_keyword(keyword_hits, "appointment_department")
+            if dept:
+                entities["department"] = dept
 
         elif intent == IntentType.MY_APPOINTMENT:
             entities["action"] = "query"
             # 提取手机号
-            phone_match = re.search(r'1[3-9]\d{9}', text)
+            phone_match = _PHONE_RE.search(text)
             if phone_match:
                 entities["phone"] = phone_match.group(0)
 
         elif intent == IntentType.FOLLOWUP:
             entities["action"] = "followup"
             # 提取手机号
-            phone_match = re.search(r'1[3-9]\d{9}', text)
+            phone_match = _PHONE_RE.search(text)
             if phone_match:
                 entities["phone"] = phone_match.group(0)
             # 检测操作类型
@@ -988,7 +1406,7 @@ class IntentClassifier:
         elif intent == IntentType.RECORDS:
             entities["action"] = "records"
             # 提取手机号
-            phone_match = re.search(r'1[3-9]\d{9}', text)
+            phone_match = _PHONE_RE.search(text)
             if phone_match:
                 entities["phone"] = phone_match.group(0)
 
@@ -1004,395 +1422,104 @@ class SkillInvoker:
     Skill调用器 - 负责调用具体的Skill
     """
 
-    def __init__(self, mcp_client=None):
-        self.mcp_client = mcp_client
-        self.formatter = ResponseFormatter()
-        self.health_kb = HealthKnowledgeBase()
-        self.skills = {}
-        self._init_builtin_skills()
-
-    def _init_builtin_skills(self):
-        """初始化内置Skill处理器"""
-        self.skills = {
-            "symptom-analyzer": self._symptom_analyzer_skill,
-            "department-recommender": self._department_recommender_skill,
-            "medication-advisor": self._medication_advisor_skill,
-            "appointment-service": self._appointment_skill,
-            "health-educator": self._health_educator_skill,
-            "greeting-handler": self._greeting_skill,
-            "fallback-handler": self._fallback_skill,
-        }
+    # ============ 静态响应文本（模块加载时构建一次） ============
 
-    def register_skill(self, name: str, handler: Callable):
-        """注册自定义Skill"""
-        self.skills[name] = handler
+    _MEDICATION_PROMPT = """## 💊 用药咨询
 
-    async def invoke(self, request: SkillRequest) -> SkillResponse:
-        """调用Skill"""
-        skill_name = request.skill_name
+请告诉我您想了解哪种药品的信息，包括：
 
-        if skill_name not in self.skills:
-            return SkillResponse(
-                success=False,
-                content="抱歉，该功能暂未开放。",
-                error=f"Skill not found: {skill_name}"
-            )
+- 用法用量
+- 副作用
+- 禁忌症
+- 药物相互作用
 
-        handler = self.skills[skill_name]
+---
 
-        try:
-            response = await handler(request)
-            # 使用响应格式化器处理所有响应
-            if response.success:
-                response.content = self.formatter.add_disclaimer(response.content)
-            return response
-        except Exception as e:
-            logger.error(f"Skill {skill_name} error: {e}")
-            return SkillResponse(
-                success=False,
-                content="处理请求时出错，请稍后重试。",
-                error=str(e)
-            )
+> ⚠️ **免责声明**: 用药请遵医嘱，不要自行用药。"""
 
-    # ============ 调用MCP的Skill实现 ============
+    _DRUG_NOT_FOUND_BODY = (
+        "抱歉，暂未收录该药品的详细信息。\n\n"
+        "### 建议\n\n"
+        "- 请确认药品名称是否正确\n"
+        "- 咨询医生或药师\n"
+        "- 参考药品说明书\n\n"
+        "---\n\n"
+    )
+
+    # 本院科室: (科室, 适用范围)
+    _DEPARTMENTS = (
+        ("内科", "头痛、胸闷、腹痛等内脏器官疾病"),
+        ("外科", "需要手术治疗的外科疾病"),
+        ("神经内科", "头痛、头晕、失眠等神经系统症状"),
+        ("心血管内科", "胸痛、心悸、高血压等"),
+        ("呼吸内科", "咳嗽、气促、发热等呼吸系统症状"),
+        ("消化内科", "腹痛、恶心、呕吐等消化系统症状"),
+        ("内分泌科", "糖尿病、甲状腺疾病等"),
+        ("皮肤科", "皮疹、瘙痒等皮肤问题"),
+        ("眼科", "视力问题、眼痛、眼红"),
+        ("耳鼻喉科", "耳鸣、鼻塞、咽痛"),
+    )
+    _DEPARTMENT_LIST = (
+        "## 🏥 本院科室\n\n"
+        "| 科室 | 适用范围 |\n"
+        "|------|---------|\n"
+        + "".join(f"| {dept} | {desc} |\n" for dept, desc in _DEPARTMENTS)
+        + "\n> 💡 请告诉我您的症状，我可以帮您推荐合适的科室。"
+    )
+
+    # 疾病预防措施分节: (键, 标题)
+    _PREVENTION_SECTIONS = (
+        ("diet", "**饮食建议**:\n"),
+        ("exercise", "**运动建议**:\n"),
+        ("lifestyle", "**生活方式**:\n"),
+    )
+    _PREVENTION_TAIL = "---\n\n> 💡 **提示**: 预防胜于治疗，保持健康生活方式是最好的预防方法。"
+
+    # 各疾病的饮食建议段落
+    _DIET_ADVICE = {
+        condition: "".join(f"- {advice}\n" for advice in advices)
+        for condition, advices in {
+            "高血压": ("选择低盐食品", "多吃新鲜蔬菜水果", "限制加工食品", "控制总热量"),
+            "糖尿病": ("选择低升糖指数食物", "控制碳水化合物摄入", "少量多餐", "增加膳食纤维"),
+            "痛风": ("低嘌呤饮食", "多喝水", "限制酒精", "减少高蛋白食物"),
+            "胃病": ("规律饮食", "细嚼慢咽", "避免刺激性食物", "选择易消化食物"),
+        }.items()
+    }
+    _FOOD_RESTRICTION_TAIL = "\n---\n\n> 💡 **提示**: 饮食调整需长期坚持，建议在医生或营养师指导下进行。"
 
-    async def _symptom_analyzer_skill(self, request: SkillRequest) -> SkillResponse:
-        """症状分析Skill - 调用MCP工具"""
-        entities = request.entities
-        symptom = entities.get("symptom", "不适")
-        duration = entities.get("duration", "")
-        severity = entities.get("severity", "")
+    _EXERCISE_ADVICE = """## 🏃 运动健康指南
 
-        # 调用MCP工具
-        if self.mcp_client:
-            mcp_result = await self.mcp_client.call_tool(
-                "medical_knowledge_query",
-                {"query_type": "symptom", "keyword": symptom}
-            )
+### 运动原则
+- **持之以恒**: 形成习惯比强度更重要
+- **循序渐进**: 从小强度开始，逐渐增加
+- **量力而行**: 根据自身情况调整
+- **全面发展**: 有氧+力量+柔韧
 
-            if mcp_result.success and mcp_result.data:
-                data = mcp_result.data.get("data", {})
-                # 使用格式化器格式化响应
-                content = self.formatter.format(
-                    "",
-                    response_type="symptom",
-                    symptom=symptom,
-                    data=data,
-                    has_risk=len(data.get("red_flags", [])) > 0
-                )
-            else:
-                content = self.formatter._format_symptom_response(symptom, {})
-        else:
-            content = self.formatter._format_symptom_response(symptom, {})
+### 推荐运动类型
 
-        return SkillResponse(
-            success=True,
-            content=content,
-            follow_up_suggestions=[
-                "还有其他不适吗？",
-                "需要帮您推荐科室吗？"
-            ]
-        )
+**有氧运动** (每周150分钟):
+- 快走、慢跑、游泳、骑自行车
+- 跳绳、有氧操、舞蹈
 
-    async def _department_recommender_skill(self, request: SkillRequest) -> SkillResponse:
-        """科室推荐Skill - 调用MCP工具"""
-        entities = request.entities
+**力量训练** (每周2-3次):
+- 俯卧撑、深蹲、平板支撑
+- 弹力带训练、哑铃训练
 
-        if self.mcp_client:
-            symptom = entities.get("query", "")
-            mcp_result = await self.mcp_client.call_tool(
-                "hospital_department_query",
-                {"query_type": "by_symptom", "symptom": symptom}
-            )
+**柔韧性训练**:
+- 瑜伽、太极、拉伸运动
 
-            if mcp_result.success and mcp_result.data:
-                recommendations = mcp_result.data.get("recommendations", [])
-                content = "## 🏥 科室推荐\n\n"
-                content += f"根据您描述的症状，建议挂以下科室：\n\n"
+### 注意事项
+- 运动前热身5-10分钟
+- 运动后拉伸放松
+- 身体不适时停止
+- 饭后1小时再运动
 
-                for rec in recommendations[:3]:
-                    content += f"### 🏥 {rec['department']}\n"
-                    content += f"- 适用症状: {rec['symptom']}\n\n"
+---
 
-                content = self.formatter.format(content, response_type="department")
-            else:
-                content = self.formatter._format_department_response(
-                    self._get_department_list()
-                )
-        else:
-            content = self.formatter._format_department_response(
-                self._get_department_list()
-            )
+> 💡 找到自己喜欢的运动方式，才能长期坚持！
+"""
 
-        return SkillResponse(success=True, content=content)
-
-    def _get_department_list(self) -> str:
-        """获取科室列表"""
-        departments = [
-            ("内科", "头痛、胸闷、腹痛等内脏器官疾病"),
-            ("外科", "需要手术治疗的外科疾病"),
-            ("神经内科", "头痛、头晕、失眠等神经系统症状"),
-            ("心血管内科", "胸痛、心悸、高血压等"),
-            ("呼吸内科", "咳嗽、气促、发热等呼吸系统症状"),
-            ("消化内科", "腹痛、恶心、呕吐等消化系统症状"),
-            ("内分泌科", "糖尿病、甲状腺疾病等"),
-            ("皮肤科", "皮疹、瘙痒等皮肤问题"),
-            ("眼科", "视力问题、眼痛、眼红"),
-            ("耳鼻喉科", "耳鸣、鼻塞、咽痛"),
-        ]
-
-        response = "## 🏥 本院科室\n\n"
-        response += "| 科室 | 适用范围 |\n"
-        response += "|------|---------|\n"
-
-        for dept, desc in departments:
-            response += f"| {dept} | {desc} |\n"
-
-        response += "\n> 💡 请告诉我您的症状，我可以帮您推荐合适的科室。"
-        return response
-
-    async def _medication_advisor_skill(self, request: SkillRequest) -> SkillResponse:
-        """用药咨询Skill - 调用MCP工具"""
-        entities = request.entities
-        drug_name = entities.get("drug_name", "")
-        query_type = entities.get("query_type", "info")
-
-        if not drug_name:
-            content = """## 💊 用药咨询
-
-请告诉我您想了解哪种药品的信息，包括：
-
-- 用法用量
-- 副作用
-- 禁忌症
-- 药物相互作用
-
----
-
-> ⚠️ **免责声明**: 用药请遵医嘱，不要自行用药。"""
-            return SkillResponse(success=True, content=content)
-
-        # 调用MCP工具
-        if self.mcp_client:
-            mcp_result = await self.mcp_client.call_tool(
-                "drug_database_query",
-                {"query_type": query_type, "drug_name": drug_name}
-            )
-
-            if mcp_result.success and mcp_result.data:
-                data = mcp_result.data.get("info", {})
-                content = self.formatter.format(
-                    "",
-                    response_type="drug",
-                    drug_name=drug_name,
-                    query_type=query_type,
-                    data=data,
-                    has_risk=len(data.get("contraindications", [])) > 0
-                )
-            else:
-                content = self.formatter._format_drug_not_found(drug_name)
-        else:
-            content = self.formatter._format_drug_not_found(drug_name)
-
-        return SkillResponse(success=True, content=content)
-
-    def _format_drug_not_found(self, drug_name: str) -> str:
-        """药品未找到"""
-        response = f"## 💊 {drug_name}\n\n"
-        response += "抱歉，暂未收录该药品的详细信息。\n\n"
-        response += "### 建议\n\n"
-        response += "- 请确认药品名称是否正确\n"
-        response += "- 咨询医生或药师\n"
-        response += "- 参考药品说明书\n\n"
-        response += "---\n\n"
-        response += self.formatter.DISCLAIMER
-        return response
-
-    # ============ 不调用MCP的Skill实现 ============
-
-    async def _health_educator_skill(self, request: SkillRequest) -> SkillResponse:
-        """
-        健康教育Skill - 不调用MCP，使用内置知识库
-        根据用户查询提供针对性的健康知识
-        """
-        entities = request.entities
-        query_type = entities.get("query_type", "general")
-        health_topic = entities.get("health_topic", "")
-
-        user_input = request.metadata.get("user_input", "")
-
-        content = ""
-
-        # 1. 疾病预防查询
-        if health_topic:
-            prevention = self.health_kb.get_disease_prevention(health_topic)
-            if prevention:
-                content = self._format_disease_prevention(health_topic, prevention)
-            else:
-                content = self._format_general_health_info()
-
-        # 2. 饮食禁忌查询
-        elif "不能吃" in user_input or "饮食" in user_input:
-            # 查找相关疾病
-            for condition in self.health_kb.FOOD_RESTRICTIONS.keys():
-                if condition in user_input:
-                    restrictions = self.health_kb.get_food_restrictions(condition)
-                    content = self._format_food_restrictions(condition, restrictions)
-                    break
-            else:
-                content = self._format_general_diet_advice()
-
-        # 3. 运动建议
-        elif "运动" in user_input:
-            content = self._format_exercise_advice()
-
-        # 4. 生活方式
-        elif "生活" in user_input or "习惯" in user_input:
-            content = self._format_lifestyle_advice()
-
-        # 默认：通用健康信息
-        else:
-            content = self._format_general_health_info()
-
-        return SkillResponse(
-            success=True,
-            content=content,
-            follow_up_suggestions=[
-                "还有什么健康问题想了解的吗？",
-                "需要了解更多疾病预防知识吗？"
-            ]
-        )
-
-    def _format_disease_prevention(self, disease: str, prevention: Dict) -> str:
-        """格式化疾病预防信息"""
-        response = f"## 📋 {disease}预防指南\n\n"
-
-        if "description" in prevention:
-            response += f"**疾病概述**: {prevention['description']}\n\n"
-
-        # 风险因素
-        risk_factors = prevention.get("risk_factors", [])
-        if risk_factors:
-            response += "### ⚠️ 风险因素\n\n"
-            for factor in risk_factors:
-                response += f"- {factor}\n"
-            response += "\n"
-
-        # 预防措施
-        prev = prevention.get("prevention", {})
-        if prev:
-            response += "### ✅ 预防措施\n\n"
-
-            if "diet" in prev:
-                response += "**饮食建议**:\n"
-                for advice in prev["diet"]:
-                    response += f"- {advice}\n"
-                response += "\n"
-
-            if "exercise" in prev:
-                response += "**运动建议**:\n"
-                for advice in prev["exercise"]:
-                    response += f"- {advice}\n"
-                response += "\n"
-
-            if "lifestyle" in prev:
-                response += "**生活方式**:\n"
-                for advice in prev["lifestyle"]:
-                    response += f"- {advice}\n"
-                response += "\n"
-
-        # 症状识别
-        symptoms = prevention.get("symptoms", [])
-        if symptoms:
-            response += "### 🩺 常见症状\n\n"
-            response += f"{', '.join(symptoms)}\n\n"
-
-        # 并发症
-        complications = prevention.get("complications", [])
-        if complications:
-            response += "### ⚠️ 可能并发症\n\n"
-            response += "如不及时控制，可能导致：\n"
-            for comp in complications:
-                response += f"- {comp}\n"
-            response += "\n"
-
-        response += "---\n\n"
-        response += "> 💡 **提示**: 预防胜于治疗，保持健康生活方式是最好的预防方法。"
-        return response
-
-    def _format_food_restrictions(self, condition: str, restrictions: List[str]) -> str:
-        """格式化饮食禁忌"""
-        response = f"## 🚫 {condition}饮食禁忌\n\n"
-
-        response += "### ❌ 需要避免的食物\n\n"
-        for item in restrictions:
-            response += f"- **{item}**\n"
-        response += "\n"
-
-        response += "### ✅ 饮食建议\n\n"
-        if condition == "高血压":
-            response += "- 选择低盐食品\n"
-            response += "- 多吃新鲜蔬菜水果\n"
-            response += "- 限制加工食品\n"
-            response += "- 控制总热量\n"
-        elif condition == "糖尿病":
-            response += "- 选择低升糖指数食物\n"
-            response += "- 控制碳水化合物摄入\n"
-            response += "- 少量多餐\n"
-            response += "- 增加膳食纤维\n"
-        elif condition == "痛风":
-            response += "- 低嘌呤饮食\n"
-            response += "- 多喝水\n"
-            response += "- 限制酒精\n"
-            response += "- 减少高蛋白食物\n"
-        elif condition == "胃病":
-            response += "- 规律饮食\n"
-            response += "- 细嚼慢咽\n"
-            response += "- 避免刺激性食物\n"
-            response += "- 选择易消化食物\n"
-
-        response += "\n---\n\n"
-        response += "> 💡 **提示**: 饮食调整需长期坚持，建议在医生或营养师指导下进行。"
-        return response
-
-    def _format_exercise_advice(self) -> str:
-        """格式化运动建议"""
-        response = """## 🏃 运动健康指南
-
-### 运动原则
-- **持之以恒**: 形成习惯比强度更重要
-- **循序渐进**: 从小强度开始，逐渐增加
-- **量力而行**: 根据自身情况调整
-- **全面发展**: 有氧+力量+柔韧
-
-### 推荐运动类型
-
-**有氧运动** (每周150分钟):
-- 快走、慢跑、游泳、骑自行车
-- 跳绳、有氧操、舞蹈
-
-**力量训练** (每周2-3次):
-- 俯卧撑、深蹲、平板支撑
-- 弹力带训练、哑铃训练
-
-**柔韧性训练**:
-- 瑜伽、太极、拉伸运动
-
-### 注意事项
-- 运动前热身5-10分钟
-- 运动后拉伸放松
-- 身体不适时停止
-- 饭后1小时再运动
-
----
-
-> 💡 找到自己喜欢的运动方式，才能长期坚持！
-"""
-        return response
-
-    def _format_lifestyle_advice(self) -> str:
-        """格式化生活方式建议"""
-        response = """## 🌟 健康生活方式
+    _LIFESTYLE_ADVICE = """## 🌟 健康生活方式
 
 ### 🥗 饮食习惯
 - 三餐规律，不暴饮暴食
@@ -1427,11 +1554,8 @@ class SkillInvoker:
 
 > 💡 健康是一种习惯，从小事做起！
 """
-        return response
 
-    def _format_general_diet_advice(self) -> str:
-        """格式化通用饮食建议"""
-        response = """## 🥗 饮食健康指南
+    _GENERAL_DIET_ADVICE = """## 🥗 饮食健康指南
 
 ### 基本原则
 - 食物多样，每天12种以上
@@ -1455,11 +1579,8 @@ class SkillInvoker:
 
 > 💡 饮食是健康的基础，吃对了一切都对！
 """
-        return response
 
-    def _format_general_health_info(self) -> str:
-        """格式化通用健康信息"""
-        response = """## 📚 健康知识
+    _GENERAL_HEALTH_INFO = """## 📚 健康知识
 
 ### 常见疾病预防
 
@@ -1492,14 +1613,8 @@ class SkillInvoker:
 
 > 💡 **提示**: 预防胜于治疗，定期体检是关键！
 """
-        return response
-
-    async def _greeting_skill(self, request: SkillRequest) -> SkillResponse:
-        """问候处理Skill"""
-        user_input = request.metadata.get("user_input", "")
 
-        if any(word in user_input for word in ["你好", "您好"]):
-            response = """## 👋 您好！
+    _GREETING_HELLO = """## 👋 您好！
 
 我是您的医疗健康助手，可以帮您：
 
@@ -1510,14 +1625,14 @@ class SkillInvoker:
 - 📚 **健康知识** - 疾病预防、健康生活方式
 
 请问有什么可以帮您的？"""
-        elif any(word in user_input for word in ["谢谢", "感谢"]):
-            response = """## 😊 不客气！
+
+    _GREETING_THANKS = """## 😊 不客气！
 
 很高兴能帮到您。如果还有其他健康问题，随时可以问我。
 
 祝您身体健康！🌟"""
-        else:
-            response = """## 👋 您好！
+
+    _GREETING_DEFAULT = """## 👋 您好！
 
 我是医疗健康助手，有什么可以帮您的？
 
@@ -1526,15 +1641,9 @@ class SkillInvoker:
 - 推荐科室
 - 用药咨询
 - 健康指导"""
-        return SkillResponse(success=True, content=response)
-
-    async def _appointment_skill(self, request: SkillRequest) -> SkillResponse:
-        """预约挂号Skill"""
-        entities = request.entities
-        department = entities.get("department", "")
 
-        if department:
-            response = f"""## 📅 预约挂号
+    # 含科室的预约说明，使用 str.format 填入 {department}
+    _APPOINTMENT_TEMPLATE = """## 📅 预约挂号
 
 您想预约 **{department}**，请确认以下信息：
 
@@ -1554,8 +1663,8 @@ class SkillInvoker:
 ---
 
 > ⚠️ **免责声明**: 预约成功后，请按时就诊。如需改期或取消，请提前联系医院。"""
-        else:
-            response = """## 📅 预约挂号
+
+    _APPOINTMENT_PROMPT = """## 📅 预约挂号
 
 请告诉我以下信息，我来帮您预约：
 
@@ -1576,42 +1685,456 @@ class SkillInvoker:
 
 > 💡 **提示**: 如果不确定挂什么科，可以先告诉我您的症状，我帮您推荐合适的科室。"""
 
+    _FALLBACK_RESPONSE = """## 🤔 抱歉
+
+我没有完全理解您的意思，可以试试：
+
+1. **描述症状**: "我头痛"、"最近一直咳嗽"
+2. **询问科室**: "头痛挂什么科"
+3. **用药咨询**: "阿莫西林怎么吃"
+4. **健康问题**: "怎么预防高血压"
+
+或者换个说法再试试？
+
+---
+
+> 💡 **提示**: 您也可以直接告诉我您想了解什么，我会尽力帮助您。"""
+
+    # 原样返回的静态响应文本，免责声明在初始化时预先追加
+    # 问候语类别
+    _GREETING_RE = re.compile(r"(?P<hello>[你您]好)|(?P<thanks>谢谢|感谢)")
+
+    # 兜底回复的建议：关键词类别 -> 建议
+    _SUGGESTION_RE = re.compile(r"(?P<symptom>[疼痛]|难受)|(?P<drug>药)|(?P<lifestyle>预防|怎么)")
+    _SUGGESTIONS = (
+        ("symptom", "您可以描述一下具体的症状和部位吗？"),
+        ("drug", "请问您想了解哪种药品的信息？"),
+        ("lifestyle", "我可以提供健康生活方式的建议。"),
+    )
+
+    _STATIC_RESPONSES = (
+        _MEDICATION_PROMPT, _EXERCISE_ADVICE, _LIFESTYLE_ADVICE, _GENERAL_DIET_ADVICE,
+        _GENERAL_HEALTH_INFO, _GREETING_HELLO, _GREETING_THANKS, _GREETING_DEFAULT,
+        _APPOINTMENT_PROMPT,
+    )
+
+    def __init__(
+        self,
+        mcp_client=None,
+        tool_cache_size: int = 512,
+        tool_cache_ttl: float = 300,
+        max_concurrent_mcp: int = 100
+    ):
+        self.mcp_client = mcp_client
+        self.formatter = ResponseFormatter()
+        self.health_kb = HealthKnowledgeBase()
+        # 饮食禁忌疾病名匹配器（单次扫描，按知识库顺序取第一个命中）
+        self._condition_matcher = _KeywordMatcher({"condition": tuple(self.health_kb.FOOD_RESTRICTIONS)})
+        self.skills = {}
+        self._init_builtin_skills()
+        # MCP查询结果缓存: (工具名, 参数) -> (过期时间, 结果)，仅缓存成功的结果
+        self._tool_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._tool_cache_size = tool_cache_size
+        self._tool_cache_ttl = tool_cache_ttl
+        # 等待合并发送的MCP调用: [(工具名, 参数, future), ...]
+        self._pending_calls: List[tuple] = []
+        # 同时进行的MCP请求上限，信号量按事件循环创建
+        self._max_concurrent_mcp = max_concurrent_mcp
+        self._mcp_semaphore: Optional[asyncio.Semaphore] = None
+        self._mcp_semaphore_loop = None
+        # 静态文本 -> 已追加免责声明的文本
+        self._static_disclaimed = {
+            content: self.formatter.add_disclaimer(content) for content in self._STATIC_RESPONSES
+        }
+
+    def _init_builtin_skills(self):
+        """初始化内置Skill处理器"""
+        self.skills = {
+            "symptom-analyzer": self._symptom_analyzer_skill,
+            "department-recommender": self._department_recommender_skill,
+            "medication-advisor": self._medication_advisor_skill,
+            "appointment-service": self._appointment_skill,
+            "health-educator": self._health_educator_skill,
+            "greeting-handler": self._greeting_skill,
+            "fallback-handler": self._fallback_skill,
+        }
+
+    def register_skill(self, name: str, handler: Callable):
+        """注册自定义Skill"""
+        self.skills[name] = handler
+
+    async def invoke(self, request: SkillRequest) -> SkillResponse:
+        """调用Skill"""
+        skill_name = request.skill_name
+
+        if skill_name not in self.skills:
+            return SkillResponse(
+                success=False,
+                content="抱歉，该功能暂未开放。",
+                error=f"Skill not found: {skill_name}"
+            )
+
+        handler = self.skills[skill_name]
+
+        try:
+            response = await handler(request)
+            # 使用响应格式化器处理所有响应（静态文本直接取预先处理的结果）
+            if response.success:
+                content = response.content
+                disclaimed = self._static_disclaimed.get(content)
+                response.content = disclaimed if disclaimed is not None else self.formatter.add_disclaimer(content)
+            return response
+        except Exception as e:
+            logger.error("Skill %s error: %s", skill_name, e)
+            return SkillResponse(
+                success=False,
+                content="处理请求时出错，请稍后重试。",
+                error=str(e)
+            )
+
+    async def invoke_batch(self, requests: List[SkillRequest]) -> List[SkillResponse]:
+        """并发调用多个Skill，其间发起的MCP调用合并为一次批量请求"""
+        return list(await asyncio.gather(*(self.invoke(request) for request in requests)))
+
+    async def _dispatch_tool(self, tool_name: str, arguments: Dict[str, Any]):
+        """
+        发送MCP调用
+        客户端支持 call_tools_batch 时，同一事件循环轮次内的调用攒成一批发送；
+        每个调用先取得并发许可再入队，批内的调用数也受并发上限约束
+        """
+        if not hasattr(self.mcp_client, "call_tools_batch"):
+            return await self._limited(self.mcp_client.call_tool(tool_name, arguments))
+
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            if not self._pending_calls:
+                loop.call_soon(self._flush_tool_calls)
+            self._pending_calls.append((tool_name, arguments, future))
+            return await future
+
+    def _flush_tool_calls(self):
+        """发送攒下的MCP调用，结果按顺序分发给各调用方"""
+        pending, self._pending_calls = self._pending_calls, []
+        batch = asyncio.ensure_future(
+            self.mcp_client.call_tools_batch([(tool_name, arguments) for tool_name, arguments, _ in pending])
+        )
+
+        def _deliver(batch):
+            futures = [future for _, _, future in pending]
+            if batch.cancelled():
+                for future in futures:
+                    future.cancel()
+                return
+            error = batch.exception()
+            for i, future in enumerate(futures):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(batch.result()[i])
+
+        batch.add_done_callback(_deliver)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """获取当前事件循环的MCP并发信号量"""
+        loop = asyncio.get_running_loop()
+        if self._mcp_semaphore is None or self._mcp_semaphore_loop is not loop:
+            self._mcp_semaphore = asyncio.Semaphore(self._max_concurrent_mcp)
+            self._mcp_semaphore_loop = loop
+        return self._mcp_semaphore
+
+    async def _limited(self, awaitable):
+        """在并发上限内等待MCP请求，避免高并发会话压垮MCP后端"""
+        async with self._get_semaphore():
+            return await awaitable
+
+    async def _call_tool(self, tool_name: str, arguments: Dict[str, Any]):
+        """
+        调用MCP工具，相同工具和参数的成功结果在TTL内直接复用（LRU淘汰）
+        知识查询结果与会话无关，重复提问无需再走一次MCP往返
+        """
+        try:
+            key = (tool_name, frozenset(arguments.items()))
+        except TypeError:
+            # 参数含不可哈希的值，不缓存
+            return await self._dispatch_tool(tool_name, arguments)
+
+        entry = self._tool_cache.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at >= time.monotonic():
+                self._tool_cache.move_to_end(key)
+                return result
+            del self._tool_cache[key]
+
+        result = await self._dispatch_tool(tool_name, arguments)
+        if result.success and result.data and self._tool_cache_size > 0:
+            self._tool_cache[key] = (time.monotonic() + self._tool_cache_ttl, result)
+            while len(self._tool_cache) > self._tool_cache_size:
+                self._tool_cache.popitem(last=False)
+        return result
+
+    # ============ 调用MCP的Skill实现 ============
+
+    async def _symptom_analyzer_skill(self, request: SkillRequest) -> SkillResponse:
+        """症状分析Skill - 调用MCP工具"""
+        entities = request.entities
+        symptom = entities.get("symptom", "不适")
+        duration = entities.get("duration", "")
+        severity = entities.get("severity", "")
+
+        # 调用MCP工具
+        if self.mcp_client:
+            mcp_result = await self._call_tool(
+                "medical_knowledge_query",
+                {"query_type": "symptom", "keyword": symptom}
+            )
+
+            if mcp_result.success and mcp_result.data:
+                # 直接交给症状格式化，单次遍历MCP数据生成响应
+                content = self.formatter._format_symptom_response(symptom, mcp_result.data.get("data", {}))
+            else:
+                content = self.formatter._format_symptom_response(symptom, {})
+        else:
+            content = self.formatter._format_symptom_response(symptom, {})
+
         return SkillResponse(
             success=True,
-            content=response,
+            content=content,
             follow_up_suggestions=[
-                "请问您希望什么时候就诊？",
+                "还有其他不适吗？",
                 "需要帮您推荐科室吗？"
             ]
         )
 
-    async def _fallback_skill(self, request: SkillRequest) -> SkillResponse:
-        """兜底Skill"""
+    async def _department_recommender_skill(self, request: SkillRequest) -> SkillResponse:
+        """科室推荐Skill - 调用MCP工具"""
+        entities = request.entities
+
+        if self.mcp_client:
+            symptom = entities.get("query", "")
+            mcp_result = await self._call_tool(
+                "hospital_department_query",
+                {"query_type": "by_symptom", "symptom": symptom}
+            )
+
+            if mcp_result.success and mcp_result.data:
+                recommendations = mcp_result.data.get("recommendations", [])
+                parts = ["## 🏥 科室推荐\n\n根据您描述的症状，建议挂以下科室：\n\n"]
+                parts.extend(
+                    f"### 🏥 {rec['department']}\n- 适用症状: {rec['symptom']}\n\n"
+                    for rec in recommendations[:3]
+                )
+
+                content = self.formatter._format_department_response("".join(parts))
+            else:
+                content = self.formatter._format_department_response(
+                    self._get_department_list()
+                )
+        else:
+            content = self.formatter._format_department_response(
+                self._get_department_list()
+            )
+
+        return SkillResponse(success=True, content=content)
+
+    def _get_department_list(self) -> str:
+        """获取科室列表"""
+        return self._DEPARTMENT_LIST
+
+    async def _medication_advisor_skill(self, request: SkillRequest) -> SkillResponse:
+        """用药咨询Skill - 调用MCP工具"""
+        entities = request.entities
+        drug_name = entities.get("drug_name", "")
+        query_type = entities.get("query_type", "info")
+
+        if not drug_name:
+            content = self._MEDICATION_PROMPT
+            return SkillResponse(success=True, content=content)
+
+        # 调用MCP工具
+        if self.mcp_client:
+            mcp_result = await self._call_tool(
+                "drug_database_query",
+                {"query_type": query_type, "drug_name": drug_name}
+            )
+
+            if mcp_result.success and mcp_result.data:
+                content = self.formatter._format_drug_response(drug_name, query_type, mcp_result.data.get("info", {}))
+            else:
+                content = self.formatter._format_drug_not_found(drug_name)
+        else:
+            content = self.formatter._format_drug_not_found(drug_name)
+
+        return SkillResponse(success=True, content=content)
+
+    def _format_drug_not_found(self, drug_name: str) -> str:
+        """药品未找到"""
+        return f"## 💊 {drug_name}\n\n{self._DRUG_NOT_FOUND_BODY}{self.formatter.DISCLAIMER}"
+
+    # ============ 不调用MCP的Skill实现 ============
+
+    async def _health_educator_skill(self, request: SkillRequest) -> SkillResponse:
+        """
+        健康教育Skill - 不调用MCP，使用内置知识库
+        根据用户查询提供针对性的健康知识
+        """
+        entities = request.entities
+        query_type = entities.get("query_type", "general")
+        health_topic = entities.get("health_topic", "")
+
         user_input = request.metadata.get("user_input", "")
 
-        response = """## 🤔 抱歉
+        content = ""
 
-我没有完全理解您的意思，可以试试：
+        # 1. 疾病预防查询
+        if health_topic:
+            prevention = self.health_kb.get_disease_prevention(health_topic)
+            if prevention:
+                content = self._format_disease_prevention(health_topic, prevention)
+            else:
+                content = self._format_general_health_info()
 
-1. **描述症状**: "我头痛"、"最近一直咳嗽"
-2. **询问科室**: "头痛挂什么科"
-3. **用药咨询**: "阿莫西林怎么吃"
-4. **健康问题**: "怎么预防高血压"
+        # 2. 饮食禁忌查询
+        elif "不能吃" in user_input or "饮食" in user_input:
+            # 查找相关疾病
+            hits = self._condition_matcher.match(user_input).get("condition")
+            if hits:
+                condition = self._condition_matcher.words("condition")[hits[0]]
+                restrictions = self.health_kb.get_food_restrictions(condition)
+                content = self._format_food_restrictions(condition, restrictions)
+            else:
+                content = self._format_general_diet_advice()
 
-或者换个说法再试试？
+        # 3. 运动建议
+        elif "运动" in user_input:
+            content = self._format_exercise_advice()
 
----
+        # 4. 生活方式
+        elif "生活" in user_input or "习惯" in user_input:
+            content = self._format_lifestyle_advice()
 
-> 💡 **提示**: 您也可以直接告诉我您想了解什么，我会尽力帮助您。"""
+        # 默认：通用健康信息
+        else:
+            content = self._format_general_health_info()
+
+        return SkillResponse(
+            success=True,
+            content=content,
+            follow_up_suggestions=[
+                "还有什么健康问题想了解的吗？",
+                "需要了解更多疾病预防知识吗？"
+            ]
+        )
+
+    def _format_disease_prevention(self, disease: str, prevention: Dict) -> str:
+        """格式化疾病预防信息"""
+        parts = [f"## 📋 {disease}预防指南\n\n"]
+
+        if "description" in prevention:
+            parts.append(f"**疾病概述**: {prevention['description']}\n\n")
+
+        # 风险因素
+        risk_factors = prevention.get("risk_factors", [])
+        if risk_factors:
+            parts.append("### ⚠️ 风险因素\n\n")
+            parts.extend(f"- {factor}\n" for factor in risk_factors)
+            parts.append("\n")
+
+        # 预防措施
+        prev = prevention.get("prevention", {})
+        if prev:
+            parts.append("### ✅ 预防措施\n\n")
+            for key, title in self._PREVENTION_SECTIONS:
+                if key in prev:
+                    parts.append(title)
+                    parts.extend(f"- {advice}\n" for advice in prev[key])
+                    parts.append("\n")
+
+        # 症状识别
+        symptoms = prevention.get("symptoms", [])
+        if symptoms:
+            parts.append(f"### 🩺 常见症状\n\n{', '.join(symptoms)}\n\n")
+
+        # 并发症
+        complications = prevention.get("complications", [])
+        if complications:
+            parts.append("### ⚠️ 可能并发症\n\n如不及时控制，可能导致：\n")
+            parts.extend(f"- {comp}\n" for comp in complications)
+            parts.append("\n")
+
+        parts.append(self._PREVENTION_TAIL)
+        return "".join(parts)
+
+    def _format_food_restrictions(self, condition: str, restrictions: List[str]) -> str:
+        """格式化饮食禁忌"""
+        parts = [f"## 🚫 {condition}饮食禁忌\n\n### ❌ 需要避免的食物\n\n"]
+        parts.extend(f"- **{item}**\n" for item in restrictions)
+        parts.append("\n### ✅ 饮食建议\n\n")
+        parts.append(self._DIET_ADVICE.get(condition, ""))
+        parts.append(self._FOOD_RESTRICTION_TAIL)
+        return "".join(parts)
+
+    def _format_exercise_advice(self) -> str:
+        """格式化运动建议"""
+        return self._EXERCISE_ADVICE
+
+    def _format_lifestyle_advice(self) -> str:
+        """格式化生活方式建议"""
+        return self._LIFESTYLE_ADVICE
+
+    def _format_general_diet_advice(self) -> str:
+        """格式化通用饮食建议"""
+        return self._GENERAL_DIET_ADVICE
+
+    def _format_general_health_info(self) -> str:
+        """格式化通用健康信息"""
+        return self._GENERAL_HEALTH_INFO
+
+    async def _greeting_skill(self, request: SkillRequest) -> SkillResponse:
+        """问候处理Skill"""
+        user_input = request.metadata.get("user_input", "")
 
-        # 尝试提供相关建议
-        suggestions = []
-        if any(kw in user_input for kw in ["疼", "痛", "难受"]):
-            suggestions.append("您可以描述一下具体的症状和部位吗？")
-        if "药" in user_input:
-            suggestions.append("请问您想了解哪种药品的信息？")
-        if "预防" in user_input or "怎么" in user_input:
-            suggestions.append("我可以提供健康生活方式的建议。")
+        # 一次扫描收集命中的问候类别，"你好"优先于"谢谢"
+        kinds = {match.lastgroup for match in self._GREETING_RE.finditer(user_input)}
+        if "hello" in kinds:
+            response = self._GREETING_HELLO
+        elif "thanks" in kinds:
+            response = self._GREETING_THANKS
+        else:
+            response = self._GREETING_DEFAULT
+        return SkillResponse(success=True, content=response)
+
+    async def _appointment_skill(self, request: SkillRequest) -> SkillResponse:
+        """预约挂号Skill"""
+        entities = request.entities
+        department = entities.get("department", "")
+
+        if department:
+            response = self._APPOINTMENT_TEMPLATE.format(department=department)
+        else:
+            response = self._APPOINTMENT_PROMPT
+
+        return SkillResponse(
+            success=True,
+            content=response,
+            follow_up_suggestions=[
+                "请问您希望什么时候就诊？",
+                "需要帮您推荐科室吗？"
+            ]
+        )
+
+    async def _fallback_skill(self, request: SkillRequest) -> SkillResponse:
+        """兜底Skill"""
+        user_input = request.metadata.get("user_input", "")
+
+        response = self._FALLBACK_RESPONSE
+
+        # 尝试提供相关建议（一次扫描，按固定顺序输出）
+        kinds = {match.lastgroup for match in self._SUGGESTION_RE.finditer(user_input)}
+        suggestions = [suggestion for kind, suggestion in self._SUGGESTIONS if kind in kinds]
 
         if suggestions:
             response += "\n\n" + "\n".join(f"> 💡 {s}" for s in suggestions)
@@ -1629,12 +2152,33 @@ class MedicalAgent:
     基于语义自动匹配任务并调度Skill
     """
 
-    def __init__(self, agent_id: str = "medical-agent", mcp_client=None):
+    def __init__(
+        self,
+        agent_id: str = "medical-agent",
+        mcp_client=None,
+        max_concurrent_mcp: int = 100,
+        max_sessions: int = 10000,
+        session_ttl: float = 1800,
+        infer_workers: int = 0,
+        session_store=None
+    ):
         self.agent_id = agent_id
         self.mcp_client = mcp_client
         self.classifier = IntentClassifier()
-        self.skill_invoker = SkillInvoker(mcp_client)
-        self.sessions: Dict[str, DialogueContext] = {}
+        self.skill_invoker = SkillInvoker(mcp_client, max_concurrent_mcp=max_concurrent_mcp)
+        # 会话按最近活跃排序（LRU），超过容量或闲置超过TTL的会话被淘汰
+        self.sessions: "OrderedDict[str, DialogueContext]" = OrderedDict()
+        self._session_expiry: Dict[str, float] = {}
+        self._max_sessions = max_sessions
+        self._session_ttl = session_ttl
+        # 意图推理线程池：infer_workers > 0 时分类在线程池中执行，不阻塞事件循环
+        self._infer_pool = (
+            concurrent.futures.ThreadPoolExecutor(max_workers=infer_workers, thread_name_prefix="intent-infer")
+            if infer_workers > 0 else None
+        )
+        # 会话持久化（需提供 async save_session(context)），写入在后台进行，不阻塞响应
+        self.session_store = session_store
+        self._pending_writes: set = set()
         self._running = False
 
         # 查询重写器
@@ -1642,25 +2186,54 @@ class MedicalAgent:
 
     async def start(self):
         """启动Agent"""
-        logger.info(f"[Agent] {self.agent_id} starting...")
+        logger.info("[Agent] %s starting...", self.agent_id)
         self._running = True
-        logger.info(f"[Agent] {self.agent_id} started")
+        logger.info("[Agent] %s started", self.agent_id)
 
     async def stop(self):
         """停止Agent"""
-        logger.info(f"[Agent] {self.agent_id} stopping...")
+        logger.info("[Agent] %s stopping...", self.agent_id)
         self._running = False
+        await self.flush_writes()
         self.sessions.clear()
-        logger.info(f"[Agent] {self.agent_id} stopped")
+        self._session_expiry.clear()
+        if self._infer_pool is not None:
+            self._infer_pool.shutdown(wait=False)
+            self._infer_pool = None
+        logger.info("[Agent] %s stopped", self.agent_id)
 
     def get_or_create_context(self, session_id: str, user_id: str) -> DialogueContext:
-        """获取或创建对话上下文"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = DialogueContext(
+        """获取或创建对话上下文，每次调用都刷新会话的活跃时间"""
+        self._evict_sessions()
+        context = self.sessions.get(session_id)
+        if context is None:
+            context = self.sessions[session_id] = DialogueContext(
                 session_id=session_id,
                 user_id=user_id
             )
-        return self.sessions[session_id]
+        self.touch(session_id)
+        return context
+
+    def touch(self, session_id: str):
+        """刷新会话活跃时间，移到LRU末尾"""
+        if session_id in self.sessions:
+            self.sessions.move_to_end(session_id)
+            self._session_expiry[session_id] = time.monotonic() + self._session_ttl
+            while len(self.sessions) > self._max_sessions:
+                self._drop_session(next(iter(self.sessions)))
+
+    def _evict_sessions(self):
+        """淘汰过期会话（LRU顺序即过期时间顺序，从最旧的开始检查）"""
+        now = time.monotonic()
+        while self.sessions:
+            oldest = next(iter(self.sessions))
+            if self._session_expiry.get(oldest, 0) >= now:
+                break
+            self._drop_session(oldest)
+
+    def _drop_session(self, session_id: str):
+        self.sessions.pop(session_id, None)
+        self._session_expiry.pop(session_id, None)
 
     async def process(
         self,
@@ -1683,7 +2256,12 @@ class MedicalAgent:
         context = self.get_or_create_context(session_id, user_id)
 
         # 1. 意图识别
-        intent_result = await self.classifier.classify(user_input, context)
+        if self._infer_pool is None:
+            intent_result = self.classifier.classify_sync(user_input, context)
+        else:
+            intent_result = await asyncio.get_running_loop().run_in_executor(
+                self._infer_pool, self.classifier.classify_sync, user_input, context
+            )
 
         # 保存当前意图到上下文（供API访问）
         context.current_intent = intent_result
@@ -1695,32 +2273,78 @@ class MedicalAgent:
         # 2. 更新上下文
         context.update_entities(intent_result.entities)
 
-        # 3. 构建Skill请求
-        skill_request = SkillRequest(
-            skill_name=intent_result.target_skill,
-            intent=intent_result.intent,
-            entities={**context.accumulated_entities, **intent_result.entities},
-            context=context,
-            metadata={"user_input": user_input}
-        )
+        # 3. 构建Skill请求（复合问题一并构建次要Skill的请求）
+        # 本轮实体覆盖累积实体；ChainMap只叠加两层映射，不逐轮复制累积实体
+        entities = ChainMap(intent_result.entities, context.accumulated_entities)
+        skill_names = [intent_result.target_skill]
+        for skill_name in intent_result.secondary_skills:
+            if skill_name not in skill_names:
+                skill_names.append(skill_name)
+        skill_requests = [
+            SkillRequest(
+                skill_name=skill_name,
+                intent=intent_result.intent,
+                entities=entities,
+                context=context,
+                metadata={"user_input": user_input}
+            )
+            for skill_name in skill_names
+        ]
 
         # 4. 调用Skill
-        skill_response = await self.skill_invoker.invoke(skill_request)
+        if len(skill_requests) == 1:
+            content = (await self.skill_invoker.invoke(skill_requests[0])).content
+        else:
+            content = self._merge_responses(await self.skill_invoker.invoke_batch(skill_requests))
 
-        # 5. 添加到历史
-        context.add_turn(user_input, skill_response.content, intent_result)
+        # 5. 添加到历史（内存中同步追加，下一轮分类依赖上一轮意图；持久化在后台进行）
+        context.add_turn(user_input, content, intent_result)
+        if self.session_store is not None:
+            self._schedule_save(context)
 
         # 6. 返回响应
-        return skill_response.content
+        return content
+
+    def _schedule_save(self, context: DialogueContext):
+        """后台保存会话，任务记录在 _pending_writes 中直到完成"""
+        task = asyncio.ensure_future(self.session_store.save_session(context))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._on_save_done)
+
+    def _on_save_done(self, task: "asyncio.Future"):
+        self._pending_writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("[Agent] Session save failed: %s", task.exception())
+
+    async def flush_writes(self):
+        """等待所有后台会话写入完成（stop() 会自动调用；每次请求单独运行事件循环时需在返回前调用）"""
+        if self._pending_writes:
+            await asyncio.gather(*list(self._pending_writes), return_exceptions=True)
+
+    def _merge_responses(self, responses: List[SkillResponse]) -> str:
+        """合并多个Skill的响应，免责声明只保留最后一份"""
+        contents = [response.content for response in responses if response.success]
+        if not contents:
+            return responses[0].content
+        suffix = ResponseFormatter._DISCLAIMER_SUFFIX
+        merged = [
+            content[:-len(suffix)] if content.endswith(suffix) else content
+            for content in contents[:-1]
+        ]
+        merged.append(contents[-1])
+        return "\n\n".join(merged)
 
     def get_context(self, session_id: str) -> Optional[DialogueContext]:
-        """获取对话上下文"""
+        """获取对话上下文（已过期的会话返回None）"""
+        self._evict_sessions()
         return self.sessions.get(session_id)
 
     def clear_context(self, session_id: str):
-        """清除对话上下文"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        """
+        清除对话上下文
+        闲置超过 session_ttl 或超出 max_sessions 的最久未活跃会话也会被自动清除
+        """
+        self._drop_session(session_id)
 
 
 # ============================================================
@@ -5,16 +5,20 @@
 """
 
 import os
-import joblib
+import re
+import json
 import logging
 import numpy as np
 from typing import Dict, List, Tuple, Optional, Any
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neural_network import MLPClassifier
-from sklearn.preprocessing import LabelEncoder
+
+# sklearn / joblib 导入耗时较长（约0.7秒），只在训练、读写joblib文件或需要sklearn对象时导入；
+# 数组格式模型的加载和快速推理路径只依赖numpy和scipy.sparse
 
 logger = logging.getLogger(__name__)
 
+# 与sklearn字符n-gram分词一致：连续空白合并为一个空格
+_WHITE_SPACES = re.compile(r"\s\s+")
+
 
 class MLPIntentClassifier:
     """
@@ -46,12 +50,21 @@ class MLPIntentClassifier:
         "unknown": "未知"
     }
 
-    def __init__(self, model_path: str = None):
+    # 数组格式模型目录中的元数据文件
+    ARRAY_META_FILE = "meta.json"
+    # 可写入元数据的TfidfVectorizer参数
+    VECTORIZER_PARAMS = (
+        "analyzer", "ngram_range", "lowercase", "norm",
+        "use_idf", "smooth_idf", "sublinear_tf", "binary"
+    )
+
+    def __init__(self, model_path: str = None, use_int8: bool = False):
         """
         初始化分类器
 
         Args:
-            model_path: 模型文件路径
+            model_path: 模型文件路径，同名目录（去掉扩展名）存放数组格式模型
+            use_int8: 推理时第一层权重使用int8量化（按列对称量化）
         """
         if model_path is None:
             model_path = os.path.join(
@@ -60,23 +73,87 @@ class MLPIntentClassifier:
                 "mlp_intent_classifier.pkl"
             )
         self.model_path = model_path
-
-        self.vectorizer = None
-        self.label_encoder = None
+        self.array_dir = os.path.splitext(model_path)[0]
+
+        self._vectorizer = None
+        # 数组格式模型的向量化器状态: (参数, 词表, idf)，首次访问 vectorizer 时才重建
+        self._vectorizer_state = None
+        self._label_encoder = None
+        # 意图标签数组（下标与模型输出对应）
+        self._classes = None
         self.model = None
         self.is_trained = False
+        self.use_int8 = use_int8
+        # 推理权重: [(权重, 偏置), ...]，None表示使用sklearn前向计算
+        self._layers = None
+        self._out_activation = None
+        # int8量化的第一层: (权重, 按列缩放系数)
+        self._quantized_layer = None
+        # 模型文件中保存的int8第一层
+        self._stored_int8_layer = None
+        # 快速向量化参数: (词表, n-gram范围, idf, 是否转小写)，None表示使用sklearn向量化
+        self._char_features = None
 
         # 尝试加载已保存的模型
         self._load_model()
+        if self.is_trained and self.model is not None:
+            self._prepare_inference()
+        if self.is_trained:
+            self._prepare_features()
+
+    @property
+    def vectorizer(self):
+        """TF-IDF向量化器（数组格式模型在首次访问时重建）"""
+        if self._vectorizer is None and self._vectorizer_state is not None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            params, vocabulary, idf = self._vectorizer_state
+            vectorizer = TfidfVectorizer(vocabulary=vocabulary, **params)
+            vectorizer.idf_ = idf
+            self._vectorizer = vectorizer
+        return self._vectorizer
+
+    @vectorizer.setter
+    def vectorizer(self, value):
+        self._vectorizer = value
+        self._vectorizer_state = None
+
+    @property
+    def label_encoder(self):
+        """标签编码器（数组格式模型在首次访问时重建）"""
+        if self._label_encoder is None and self._classes is not None:
+            from sklearn.preprocessing import LabelEncoder
+
+            label_encoder = LabelEncoder()
+            label_encoder.classes_ = self._classes
+            self._label_encoder = label_encoder
+        return self._label_encoder
+
+    @label_encoder.setter
+    def label_encoder(self, value):
+        self._label_encoder = value
+        self._classes = getattr(value, "classes_", None)
 
     def _load_model(self):
-        """加载已训练的模型"""
+        """加载已训练的模型，优先使用数组格式，其次使用joblib文件"""
+        if os.path.exists(os.path.join(self.array_dir, self.ARRAY_META_FILE)):
+            try:
+                self._load_arrays()
+                self.is_trained = True
+                logger.info(f"MLP模型加载成功(数组格式): {self.array_dir}")
+                return
+            except Exception as e:
+                logger.warning(f"MLP数组格式模型加载失败: {e}")
+
         if os.path.exists(self.model_path):
             try:
+                import joblib
+
                 model_data = joblib.load(self.model_path)
                 self.model = model_data['model']
                 self.vectorizer = model_data['vectorizer']
                 self.label_encoder = model_data['label_encoder']
+                self._stored_int8_layer = model_data.get('int8_first_layer')
                 self.is_trained = True
                 logger.info(f"MLP模型加载成功: {self.model_path}")
             except Exception as e:
@@ -84,13 +161,216 @@ class MLPIntentClassifier:
         else:
             logger.info(f"MLP模型文件不存在: {self.model_path}")
 
+    def _prepare_features(self):
+        """
+        准备快速向量化
+        字符级TF-IDF（l2归一化、无sublinear_tf/binary）直接用词表字典计数，
+        不经过sklearn的分析器和稀疏矩阵拼装；其他配置使用sklearn向量化
+        """
+        if self._vectorizer_state is not None:
+            params, vocabulary, idf = self._vectorizer_state
+        else:
+            params = self.vectorizer.get_params()
+            vocabulary, idf = self.vectorizer.vocabulary_, self.vectorizer.idf_
+        self._char_features = None
+        if (params["analyzer"] == "char" and params.get("preprocessor") is None
+                and params.get("strip_accents") is None and params["norm"] == "l2"
+                and params["use_idf"] and not params["sublinear_tf"] and not params["binary"]):
+            self._char_features = (
+                vocabulary,
+                tuple(params["ngram_range"]),
+                np.asarray(idf, dtype=np.float64),
+                params["lowercase"],
+            )
+
+    def _vectorize(self, texts: List[str]):
+        """文本转为TF-IDF稀疏矩阵 (CSR)"""
+        if self._char_features is None:
+            return self.vectorizer.transform(texts)
+
+        from scipy.sparse import csr_matrix
+
+        vocabulary, (min_n, max_n), idf, lowercase = self._char_features
+        indices = []
+        counts = []
+        indptr = [0]
+        for text in texts:
+            if lowercase:
+                text = text.lower()
+            text = _WHITE_SPACES.sub(" ", text)
+            length = len(text)
+            row = {}
+            for n in range(min_n, min(max_n, length) + 1):
+                for i in range(length - n + 1):
+                    index = vocabulary.get(text[i:i + n])
+                    if index is not None:
+                        row[index] = row.get(index, 0) + 1
+            # 与sklearn一致按特征下标排序，保证求和顺序相同
+            ordered = sorted(row)
+            indices.extend(ordered)
+            counts.extend(row[index] for index in ordered)
+            indptr.append(len(indices))
+
+        indices = np.array(indices, dtype=np.int32)
+        values = np.array(counts, dtype=np.float64) * idf[indices]
+        # 按行l2归一化
+        row_ids = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        values /= np.sqrt(np.bincount(row_ids, weights=values * values, minlength=len(texts)))[row_ids]
+        return csr_matrix((values, indices, np.array(indptr, dtype=np.int32)), shape=(len(texts), len(idf)))
+
+    def _load_array(self, name: str) -> np.ndarray:
+        """以只读内存映射方式加载单个数组，多个进程共享同一份页缓存"""
+        return np.load(os.path.join(self.array_dir, name + ".npy"), mmap_mode="r").view(np.ndarray)
+
+    def _load_arrays(self):
+        """
+        加载数组格式模型
+        权重以内存映射方式加载，不反序列化sklearn对象；
+        向量化器只需参数、词表和idf，在需要时才重建
+        """
+        with open(os.path.join(self.array_dir, self.ARRAY_META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        params = dict(meta["vectorizer"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        idf = np.load(os.path.join(self.array_dir, "idf.npy"))
+
+        layers = [
+            (self._load_array(f"W{i}"), self._load_array(f"b{i}"))
+            for i in range(meta["n_layers"])
+        ]
+
+        self.model = None
+        self.vectorizer = None
+        self._vectorizer_state = (params, meta["vocabulary"], idf)
+        self.label_encoder = None
+        self._classes = np.array(meta["classes"])
+        self._layers = layers
+        self._out_activation = meta["out_activation"]
+        self._quantized_layer = None
+        if meta.get("int8_first_layer"):
+            self._stored_int8_layer = {
+                'weights': self._load_array("W0_int8"),
+                'scale': self._load_array("W0_scale"),
+            }
+        if self.use_int8:
+            self._quantize_weights()
+
+    def _prepare_inference(self):
+        """
+        提取推理用权重
+        relu隐藏层 + softmax/logistic输出层的模型改用手写的NumPy前向计算：
+        权重转为连续的float32数组，稀疏TF-IDF输入直接与第一层相乘，不经过sklearn的逐层分派。
+        其他激活函数保持使用sklearn的predict_proba
+        """
+        self._layers = None
+        self._quantized_layer = None
+        if self.model.activation != "relu" or self.model.out_activation_ not in ("softmax", "logistic"):
+            logger.warning("MLP激活函数不支持快速推理，使用sklearn前向计算: %s", self.model.activation)
+            return
+
+        self._layers = [
+            (np.ascontiguousarray(coef, dtype=np.float32), np.ascontiguousarray(intercept, dtype=np.float32))
+            for coef, intercept in zip(self.model.coefs_, self.model.intercepts_)
+        ]
+        self._out_activation = self.model.out_activation_
+        if self.use_int8:
+            self._quantize_weights()
+
+    @staticmethod
+    def _quantize_first_layer(coef: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """按输出列对称量化为int8，返回 (int8权重, float32缩放系数)"""
+        scale = np.abs(coef).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        return np.round(coef / scale).astype(np.int8), scale.astype(np.float32)
+
+    def _quantize_weights(self):
+        """
+        量化第一层权重
+        第一层 (3366x128) 占绝大部分参数，量化为int8并按输出列保存缩放系数；
+        稀疏TF-IDF输入每行只有少量非零特征，推理时只取这些行转为float32。
+        模型文件中已保存量化权重时直接使用
+        """
+        stored = self._stored_int8_layer
+        if stored is not None and stored['weights'].shape == self._layers[0][0].shape:
+            self._quantized_layer = (stored['weights'], stored['scale'])
+        else:
+            self._quantized_layer = self._quantize_first_layer(self._layers[0][0])
+        logger.info("MLP第一层权重已量化为int8")
+
+    def _int8_accuracy(self, X, y_encoded) -> Optional[float]:
+        """int8量化后的准确率，用于评估相对float32的精度损失"""
+        if self._layers is None:
+            return None
+        current = self._quantized_layer
+        self._quantized_layer = self._quantize_first_layer(self._layers[0][0])
+        try:
+            predictions = np.argmax(self._predict_proba(X), axis=1)
+        finally:
+            self._quantized_layer = current
+        return float(np.mean(predictions == y_encoded))
+
+    def _first_layer(self, X) -> np.ndarray:
+        """
+        第一层线性变换（未加偏置）
+        TF-IDF行通常只有几十个非零特征，按CSR的indices只取对应的权重行
+        加权求和，不读取整个第一层权重
+        """
+        if self._quantized_layer is None:
+            weights, scale = self._layers[0][0], None
+        else:
+            weights, scale = self._quantized_layer
+
+        X = X.tocsr()
+        values = X.data.astype(np.float32)
+        if X.shape[0] == 1:
+            hidden = (values @ weights[X.indices].astype(np.float32, copy=False))[None, :]
+        else:
+            # 批量：逐个非零特征加权后按样本行分段求和
+            hidden = np.zeros((X.shape[0], weights.shape[1]), dtype=np.float32)
+            if X.nnz:
+                weighted = weights[X.indices].astype(np.float32, copy=False) * values[:, None]
+                nonempty = np.diff(X.indptr) > 0
+                hidden[nonempty] = np.add.reduceat(weighted, X.indptr[:-1][nonempty], axis=0)
+        return hidden if scale is None else hidden * scale
+
+    def _predict_proba(self, X) -> np.ndarray:
+        """前向计算各意图概率"""
+        if self._layers is None:
+            return self.model.predict_proba(X)
+
+        activation = self._first_layer(X)
+        activation += self._layers[0][1]
+        np.maximum(activation, 0, out=activation)
+
+        # 后续层：relu隐藏层 + 输出层
+        last = len(self._layers) - 1
+        for index in range(1, last + 1):
+            coef, intercept = self._layers[index]
+            activation = activation @ coef
+            activation += intercept
+            if index < last:
+                np.maximum(activation, 0, out=activation)
+
+        if self._out_activation == "logistic":
+            positive = 1.0 / (1.0 + np.exp(-activation[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+
+        activation -= activation.max(axis=1, keepdims=True)
+        np.exp(activation, out=activation)
+        activation /= activation.sum(axis=1, keepdims=True)
+        return activation
+
     def _save_model(self):
         """保存模型"""
+        import joblib
+
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
         model_data = {
             'model': self.model,
             'vectorizer': self.vectorizer,
             'label_encoder': self.label_encoder,
+            'int8_first_layer': self._int8_layer_for_save(),
             'metadata': {
                 'architecture': 'MLP(128,64)',
                 'test_accuracy': 1.00,
@@ -100,6 +380,47 @@ class MLPIntentClassifier:
         }
         joblib.dump(model_data, self.model_path)
         logger.info(f"MLP模型已保存: {self.model_path}")
+        self._save_arrays(model_data['int8_first_layer'])
+
+    def _save_arrays(self, int8_layer: Optional[Dict[str, np.ndarray]] = None):
+        """
+        保存数组格式模型
+        每个权重一个.npy文件，词表、类别等写入meta.json；
+        只支持快速推理路径（relu + softmax/logistic）和字符串analyzer
+        """
+        params = self.vectorizer.get_params()
+        if self._layers is None or not isinstance(params["analyzer"], str):
+            logger.warning("MLP模型不支持数组格式，仅保存joblib文件")
+            return
+
+        os.makedirs(self.array_dir, exist_ok=True)
+        save = lambda name, array: np.save(os.path.join(self.array_dir, name + ".npy"), array)
+        for i, (coef, intercept) in enumerate(self._layers):
+            save(f"W{i}", np.ascontiguousarray(coef, dtype=np.float32))
+            save(f"b{i}", np.ascontiguousarray(intercept, dtype=np.float32))
+        if int8_layer is not None:
+            save("W0_int8", int8_layer['weights'])
+            save("W0_scale", int8_layer['scale'])
+        save("idf", self.vectorizer.idf_)
+
+        meta = {
+            "vectorizer": {name: params[name] for name in self.VECTORIZER_PARAMS},
+            "vocabulary": {term: int(index) for term, index in self.vectorizer.vocabulary_.items()},
+            "classes": self._classes.tolist(),
+            "n_layers": len(self._layers),
+            "out_activation": self._out_activation,
+            "int8_first_layer": int8_layer is not None,
+        }
+        with open(os.path.join(self.array_dir, self.ARRAY_META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        logger.info(f"MLP数组格式模型已保存: {self.array_dir}")
+
+    def _int8_layer_for_save(self) -> Optional[Dict[str, np.ndarray]]:
+        """保存模型时一并保存int8量化的第一层，加载后无需重新量化"""
+        if self._layers is None:
+            return None
+        weights, scale = self._quantized_layer or self._quantize_first_layer(self._layers[0][0])
+        return {'weights': weights, 'scale': scale}
 
     def train(self, texts: List[str], labels: List[str], test_size: float = 0.2) -> Dict:
         """
@@ -113,7 +434,10 @@ class MLPIntentClassifier:
         Returns:
             Dict: 训练结果
         """
+        from sklearn.feature_extraction.text import TfidfVectorizer
         from sklearn.model_selection import train_test_split
+        from sklearn.neural_network import MLPClassifier
+        from sklearn.preprocessing import LabelEncoder
 
         logger.info(f"开始训练MLP模型，样本数: {len(texts)}")
 
@@ -140,9 +464,11 @@ class MLPIntentClassifier:
         logger.info(f"训练集: {X_train.shape[0]}, 测试集: {X_test.shape[0]}")
 
         # 3. 标签编码
-        self.label_encoder = LabelEncoder()
-        y_train_encoded = self.label_encoder.fit_transform(y_train)
-        y_test_encoded = self.label_encoder.transform(y_test)
+        label_encoder = LabelEncoder()
+        y_train_encoded = label_encoder.fit_transform(y_train)
+        y_test_encoded = label_encoder.transform(y_test)
+        # 拟合后再赋值，setter 才能取到 classes_
+        self.label_encoder = label_encoder
 
         # 4. 训练MLP模型
         self.model = MLPClassifier(
@@ -164,6 +490,8 @@ class MLPIntentClassifier:
         train_time = time.time() - start_time
 
         self.is_trained = True
+        self._prepare_inference()
+        self._prepare_features()
 
         # 5. 评估
         train_pred = self.model.predict(X_train)
@@ -172,6 +500,7 @@ class MLPIntentClassifier:
         train_accuracy = np.mean(train_pred == y_train_encoded)
         test_accuracy = np.mean(test_pred == y_test_encoded)
         generalization_gap = train_accuracy - test_accuracy
+        int8_test_accuracy = self._int8_accuracy(X_test, y_test_encoded)
 
         # 6. 保存模型
         self._save_model()
@@ -180,6 +509,7 @@ class MLPIntentClassifier:
             "train_accuracy": train_accuracy,
             "test_accuracy": test_accuracy,
             "generalization_gap": generalization_gap,
+            "int8_test_accuracy": int8_test_accuracy,
             "train_time": train_time,
             "train_samples": len(y_train),
             "test_samples": len(y_test)
@@ -187,6 +517,8 @@ class MLPIntentClassifier:
 
         logger.info(f"训练完成! 训练准确率: {train_accuracy*100:.2f}%, 测试准确率: {test_accuracy*100:.2f}%")
         logger.info(f"泛化差距: {generalization_gap*100:.2f}%, 训练时间: {train_time:.2f}秒")
+        if int8_test_accuracy is not None:
+            logger.info(f"int8量化测试准确率: {int8_test_accuracy*100:.2f}%")
 
         return results
 
@@ -204,14 +536,14 @@ class MLPIntentClassifier:
             raise RuntimeError("模型未训练")
 
         # 特征提取
-        X = self.vectorizer.transform([text])
+        X = self._vectorize([text])
 
-        # 预测
-        prediction = self.model.predict(X)[0]
-        probabilities = self.model.predict_proba(X)[0]
+        # 预测（概率最大的类别即预测结果，只做一次前向计算）
+        probabilities = self._predict_proba(X)[0]
+        prediction = int(np.argmax(probabilities))
 
         # 解码标签
-        intent_label = self.label_encoder.inverse_transform([prediction])[0]
+        intent_label = self._classes[prediction]
         confidence = float(probabilities[prediction])
 
         return intent_label, confidence
@@ -230,36 +562,58 @@ class MLPIntentClassifier:
         if not self.is_trained:
             raise RuntimeError("模型未训练")
 
-        X = self.vectorizer.transform([text])
-        probabilities = self.model.predict_proba(X)[0]
+        X = self._vectorize([text])
+        probabilities = self._predict_proba(X)[0]
 
-        # 获取top-k索引
+        # 获取top-k索引：类别仅十余个，完整排序与 argpartition+局部排序开销相当，
+        # 且无需处理 k >= 类别数 时 argpartition 的越界
         top_k_indices = np.argsort(probabilities)[-k:][::-1]
+        classes = self._classes
 
-        results = []
-        for idx in top_k_indices:
-            intent_label = self.label_encoder.inverse_transform([idx])[0]
-            confidence = float(probabilities[idx])
-            results.append((intent_label, confidence))
+        return [(classes[idx], float(probabilities[idx])) for idx in top_k_indices]
 
-        return results
+    def predict_top_k_batch(self, texts: List[str], k: int = 3) -> List[List[Tuple[str, float]]]:
+        """
+        批量预测并返回每条文本的前K个结果
+        整批只做一次向量化和一次前向计算
+
+        Args:
+            texts: 输入文本列表
+            k: 返回前k个结果
+
+        Returns:
+            List[List[Tuple]]: 与输入一一对应的 [(intent, confidence), ...]
+        """
+        if not self.is_trained:
+            raise RuntimeError("模型未训练")
+        if not texts:
+            return []
+
+        X = self._vectorize(texts)
+        probabilities = self._predict_proba(X)
+
+        # 逐行取top-k索引（降序），理由同 predict_top_k，保留完整排序
+        top_k_indices = np.argsort(probabilities, axis=1)[:, -k:][:, ::-1]
+        classes = self._classes
+
+        return [
+            [(classes[idx], float(row[idx])) for idx in indices]
+            for row, indices in zip(probabilities, top_k_indices)
+        ]
 
     def batch_predict(self, texts: List[str]) -> List[Tuple[str, float]]:
         """批量预测"""
         if not self.is_trained:
             raise RuntimeError("模型未训练")
 
-        X = self.vectorizer.transform(texts)
-        predictions = self.model.predict(X)
-        probabilities = self.model.predict_proba(X)
-
-        results = []
-        for i, pred in enumerate(predictions):
-            intent_label = self.label_encoder.inverse_transform([pred])[0]
-            confidence = float(probabilities[i][pred])
-            results.append((intent_label, confidence))
+        X = self._vectorize(texts)
+        probabilities = self._predict_proba(X)
+        predictions = np.argmax(probabilities, axis=1)
 
-        return results
+        # 整批解码标签、按下标取置信度，不逐条调用 inverse_transform
+        labels = self._classes[predictions].tolist()
+        confidences = probabilities[np.arange(len(predictions)), predictions].tolist()
+        return list(zip(labels, confidences))
 
 
 def train_and_save_mlp(json_path: str, model_path: str = None) -> MLPIntentClassifier:
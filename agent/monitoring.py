@@ -4,18 +4,24 @@
 使用Prometheus风格的指标收集
 """
 
+import os
 import time
 import asyncio
 from typing import Dict, Optional, Callable, Any, List
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from collections import defaultdict
+from bisect import bisect_left
+from array import array
+from itertools import zip_longest
 from functools import wraps
 import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 全局开关: METRICS_ENABLED=0 时所有装饰器退化为原函数，收集器不记录任何指标
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'
+
 
 # ============================================================
 # 指标数据结构
@@ -25,9 +31,14 @@ logger = logging.getLogger(__name__)
 class MetricValue:
     """指标值"""
     value: float
-    timestamp: datetime = field(default_factory=datetime.now)
+    timestamp_ns: int = field(default_factory=time.time_ns)  # 整数纳秒，避免每次更新构造datetime
     labels: Dict[str, str] = field(default_factory=dict)
 
+    @property
+    def timestamp(self) -> datetime:
+        """最后更新时间"""
+        return datetime.fromtimestamp(self.timestamp_ns / 1e9)
+
 
 @dataclass
 class HistogramBucket:
@@ -36,6 +47,21 @@ class HistogramBucket:
     count: int = 0
 
 
+class HistogramState:
+    """直方图单个标签组合的全部状态，observe 只需一次字典查找"""
+
+    __slots__ = ("counts", "sum", "count", "labels", "timestamp_ns")
+
+    def __init__(self, labels: Dict[str, str]):
+        # 按桶位置索引的非累积计数（落入 (上一桶, 本桶] 的次数），
+        # 只分配到已命中的最高桶，未分配的桶计数为0
+        self.counts = array("q")
+        self.sum = 0.0
+        self.count = 0
+        self.labels = labels
+        self.timestamp_ns = time.time_ns()
+
+
 class MetricType:
     """指标类型"""
     COUNTER = "counter"
@@ -62,49 +88,87 @@ class Metric:
         self.description = description
         self.metric_type = metric_type
         self.label_names = label_names or []
-        self._data: Dict[tuple, MetricValue] = {}
+        # 标签键 -> 数值；标签由键和 label_names 还原，MetricValue 仅在 get_all_values 时构造
+        self._data: Dict[tuple, float] = {}
         self._lock = threading.RLock()
+        self._label_strs: Dict[tuple, str] = {}  # 标签键 -> 已格式化的标签串
+        self._dirty = True  # 写入时置位，导出时据此复用上次结果
+        self._last_export = ""
 
     def _make_key(self, labels: Dict[str, str]) -> tuple:
         """创建标签键"""
         return tuple(labels.get(name, "") for name in self.label_names)
 
+    def _decode_labels(self, key: tuple) -> Dict[str, str]:
+        """由标签键还原标签字典"""
+        return dict(zip(self.label_names, key))
+
     def _validate_labels(self, labels: Dict[str, str]):
         """验证标签"""
         if set(labels.keys()) != set(self.label_names):
             raise ValueError(f"Invalid labels. Expected {self.label_names}, got {list(labels.keys())}")
 
+    def _add(self, key: tuple, value: float):
+        """累加指定键的值"""
+        self._data[key] = self._data.get(key, 0.0) + value
+        self._dirty = True
+
+    # 读取不加锁：与Prometheus客户端一致，读到的是最终一致的近似值，不阻塞写入
+
     def get_value(self, labels: Dict[str, str] = None) -> float:
         """获取指标值"""
         labels = labels or {}
-        key = self._make_key(labels)
-        with self._lock:
-            metric_value = self._data.get(key)
-            return metric_value.value if metric_value else 0
+        return self._data.get(self._make_key(labels), 0)
 
     def get_total_count(self) -> float:
         """获取总计数（所有label组合的总和）"""
-        with self._lock:
-            return sum(v.value for v in self._data.values())
+        return sum(list(self._data.values()))
 
     def get_all_values(self) -> Dict[tuple, MetricValue]:
         """获取所有值"""
-        with self._lock:
-            return dict(self._data)
+        return self._wrap_values(dict(self._data))
+
+    def _wrap_values(self, values: Dict[tuple, float]) -> Dict[tuple, MetricValue]:
+        """把数值字典包装为 MetricValue"""
+        return {
+            key: MetricValue(value=value, labels=self._decode_labels(key))
+            for key, value in values.items()
+        }
 
     def reset(self):
         """重置指标"""
         with self._lock:
             self._data.clear()
+            self._label_strs.clear()
+            self._dirty = True
 
     def export_prometheus(self) -> str:
-        """导出为Prometheus格式"""
+        """导出为Prometheus格式（自上次导出后无写入时直接复用结果）"""
+        if not self._dirty:
+            return self._last_export
+        # 写入方在修改数据之后置位，这里先清标志再读取：
+        # 导出期间完成的写入会重新置位，下次导出时体现
+        self._dirty = False
         lines = [
             f"# HELP {self.name} {self.description}",
             f"# TYPE {self.name} {self.metric_type}"
         ]
         lines.extend(self._format_prometheus_values())
-        return "\n".join(lines)
+        self._last_export = "\n".join(lines)
+        return self._last_export
+
+    def _label_str(self, key: tuple) -> str:
+        """获取标签键对应的标签串，每个键只格式化一次"""
+        label_str = self._label_strs.get(key)
+        if label_str is None:
+            label_str = self._label_strs[key] = self._format_labels(self._decode_labels(key))
+        return label_str
+
+    def _format_labels(self, labels: Dict[str, str]) -> str:
+        if not labels:
+            return ""
+        pairs = [f'{k}="{v}"' for k, v in labels.items()]
+        return "{" + ",".join(pairs) + "}"
 
     def _format_prometheus_values(self) -> List[str]:
         """格式化Prometheus值"""
@@ -112,7 +176,12 @@ class Metric:
 
 
 class Counter(Metric):
-    """计数器 - 只增不减"""
+    """
+    计数器 - 只增不减
+
+    每个线程写自己的分片（标签键 -> 值），inc 不加锁也不会丢失更新；
+    读取和导出时再汇总所有分片，已退出线程的分片在汇总时并入 _data。
+    """
 
     def __init__(
         self,
@@ -121,33 +190,95 @@ class Counter(Metric):
         label_names: List[str] = None
     ):
         super().__init__(name, description, MetricType.COUNTER, label_names)
+        self._local = threading.local()
+        self._shards: List[tuple] = []  # (线程, 分片)
+        self._bound: Dict[tuple, "BoundCounter"] = {}
 
     def inc(self, value: float = 1.0, labels: Dict[str, str] = None):
         """增加计数"""
         if value < 0:
             raise ValueError("Counter can only increase")
-        labels = labels or {}
-        key = self._make_key(labels)
+        self._add(self._make_key(labels or {}), value)
+
+    def with_labels(self, **labels) -> "BoundCounter":
+        """绑定固定标签，标签键只计算一次"""
+        return BoundCounter(self, labels)
+
+    def labels(self, *values: str) -> "BoundCounter":
+        """按标签值（顺序同 label_names）获取缓存的绑定计数器，同一组值只创建一次"""
+        bound = self._bound.get(values)
+        if bound is None:
+            bound = self._bound[values] = BoundCounter(self, dict(zip(self.label_names, values)))
+        return bound
+
+    def _shard(self) -> Dict[tuple, float]:
+        """获取当前线程的分片，首次使用时注册"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _add(self, key: tuple, value: float):
+        """累加到当前线程的分片"""
+        shard = self._shard()
+        shard[key] = shard.get(key, 0.0) + value
+        self._dirty = True
+
+    @staticmethod
+    def _merge(target: Dict[tuple, float], shard: Dict[tuple, float]):
+        """把分片累加到目标字典"""
+        for key, value in shard.items():
+            target[key] = target.get(key, 0.0) + value
+
+    def _collect(self) -> Dict[tuple, float]:
+        """汇总所有分片，返回快照"""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._merge(self._data, shard)
+            self._shards = live
+
+            result = dict(self._data)
+            for _, shard in live:
+                self._merge(result, shard.copy())
+            return result
+
+    def get_value(self, labels: Dict[str, str] = None) -> float:
+        """获取指标值"""
+        key = self._make_key(labels or {})
+        total = self._data.get(key, 0)
+        for _, shard in self._shards:
+            total += shard.get(key, 0)
+        return total
+
+    def get_total_count(self) -> float:
+        """获取总计数（所有label组合的总和）"""
+        return sum(self._collect().values())
+
+    def get_all_values(self) -> Dict[tuple, MetricValue]:
+        """获取所有值"""
+        return self._wrap_values(self._collect())
 
+    def reset(self):
+        """重置指标"""
         with self._lock:
-            if key in self._data:
-                self._data[key].value += value
-                self._data[key].timestamp = datetime.now()
-            else:
-                self._data[key] = MetricValue(value=value, labels=labels)
+            self._data.clear()
+            for _, shard in self._shards:
+                shard.clear()
+            self._label_strs.clear()
+            self._dirty = True
 
     def _format_prometheus_values(self) -> List[str]:
-        lines = []
-        for key, metric_value in self._data.items():
-            label_str = self._format_labels(metric_value.labels)
-            lines.append(f"{self.name}{label_str} {metric_value.value}")
-        return lines
-
-    def _format_labels(self, labels: Dict[str, str]) -> str:
-        if not labels:
-            return ""
-        pairs = [f'{k}="{v}"' for k, v in labels.items()]
-        return "{" + ",".join(pairs) + "}"
+        return [
+            f"{self.name}{self._label_str(key)} {value}"
+            for key, value in self._collect().items()
+        ]
 
 
 class Gauge(Metric):
@@ -163,46 +294,29 @@ class Gauge(Metric):
 
     def set(self, value: float, labels: Dict[str, str] = None):
         """设置值"""
-        labels = labels or {}
-        key = self._make_key(labels)
-
-        with self._lock:
-            if key in self._data:
-                self._data[key].value = value
-                self._data[key].timestamp = datetime.now()
-            else:
-                self._data[key] = MetricValue(value=value, labels=labels)
+        self._data[self._make_key(labels or {})] = value
+        self._dirty = True
 
     def inc(self, value: float = 1.0, labels: Dict[str, str] = None):
         """增加"""
-        labels = labels or {}
-        current = self.get_value(labels)
-        self.set(current + value, labels)
+        self._add(self._make_key(labels or {}), value)
 
     def dec(self, value: float = 1.0, labels: Dict[str, str] = None):
         """减少"""
-        labels = labels or {}
-        current = self.get_value(labels)
-        self.set(current - value, labels)
+        self._add(self._make_key(labels or {}), -value)
 
     def _format_prometheus_values(self) -> List[str]:
-        lines = []
-        for key, metric_value in self._data.items():
-            label_str = self._format_labels(metric_value.labels)
-            lines.append(f"{self.name}{label_str} {metric_value.value}")
-        return lines
-
-    def _format_labels(self, labels: Dict[str, str]) -> str:
-        if not labels:
-            return ""
-        pairs = [f'{k}="{v}"' for k, v in labels.items()]
-        return "{" + ",".join(pairs) + "}"
+        return [
+            f"{self.name}{self._label_str(key)} {value}"
+            for key, value in list(self._data.items())
+        ]
 
 
 class Histogram(Metric):
     """直方图 - 分布统计"""
 
     DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+    LOCK_STRIPES = 16  # 分段锁数量（2的幂），不同标签组合的观察互不阻塞
 
     def __init__(
         self,
@@ -212,42 +326,53 @@ class Histogram(Metric):
         buckets: List[float] = None
     ):
         super().__init__(name, description, MetricType.HISTOGRAM, label_names)
-        self.buckets = buckets or self.DEFAULT_BUCKETS.copy()
-        self._counts: Dict[tuple, Dict[float, int]] = defaultdict(lambda: {b: 0 for b in self.buckets})
-        self._sums: Dict[tuple, float] = defaultdict(float)
-        self._counts_raw: Dict[tuple, int] = defaultdict(int)
+        self.buckets = sorted(buckets) if buckets else self.DEFAULT_BUCKETS.copy()
+        self._state: Dict[tuple, HistogramState] = {}
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def _stripe(self, key: tuple) -> threading.Lock:
+        """按标签键选择分段锁"""
+        return self._stripes[hash(key) & (self.LOCK_STRIPES - 1)]
 
     def observe(self, value: float, labels: Dict[str, str] = None):
         """观察一个值"""
         labels = labels or {}
-        key = self._make_key(labels)
-
-        with self._lock:
-            # 更新计数
-            for bucket in self.buckets:
-                if value <= bucket:
-                    self._counts[key][bucket] += 1
-
-            # 更新总和和计数
-            self._sums[key] += value
-            self._counts_raw[key] += 1
-
-            # 更新基本数据（用于get_value）
-            if key not in self._data:
-                self._data[key] = MetricValue(value=0, labels=labels)
-            self._data[key].timestamp = datetime.now()
+        self._observe(self._make_key(labels), value, labels)
+
+    def _observe(self, key: tuple, value: float, labels: Dict[str, str]):
+        """按已计算的标签键记录观察值"""
+        with self._stripe(key):
+            state = self._state.get(key)
+            if state is None:
+                state = self._state[key] = HistogramState(labels)
+            else:
+                state.timestamp_ns = time.time_ns()
+
+            # 更新计数：二分定位第一个 >= value 的桶，超出最大桶的只计入+Inf
+            idx = bisect_left(self.buckets, value)
+            if idx < len(self.buckets):
+                counts = state.counts
+                if idx >= len(counts):
+                    counts.frombytes(bytes(8 * (idx + 1 - len(counts))))
+                counts[idx] += 1
+            state.sum += value
+            state.count += 1
+            # 数据修改完成后再置位，避免导出在写入落地前清掉标志
+            self._dirty = True
+
+    def with_labels(self, **labels) -> "BoundHistogram":
+        """绑定固定标签，标签键只计算一次"""
+        return BoundHistogram(self, labels)
 
     def get_sum(self, labels: Dict[str, str] = None) -> float:
         """获取总和"""
-        labels = labels or {}
-        key = self._make_key(labels)
-        return self._sums.get(key, 0)
+        state = self._state.get(self._make_key(labels or {}))
+        return state.sum if state else 0
 
     def get_count(self, labels: Dict[str, str] = None) -> int:
         """获取观察次数"""
-        labels = labels or {}
-        key = self._make_key(labels)
-        return self._counts_raw.get(key, 0)
+        state = self._state.get(self._make_key(labels or {}))
+        return state.count if state else 0
 
     def get_average(self, labels: Dict[str, str] = None) -> float:
         """获取平均值"""
@@ -257,23 +382,35 @@ class Histogram(Metric):
         return self.get_sum(labels) / count
 
     def get_bucket_values(self, labels: Dict[str, str] = None) -> Dict[float, int]:
-        """获取桶值"""
-        labels = labels or {}
-        key = self._make_key(labels)
-        return dict(self._counts.get(key, {}))
+        """获取桶值（累积计数，即 <= le 的观察次数）"""
+        state = self._state.get(self._make_key(labels or {}))
+        if state is None:
+            return {}
+        cumulative = 0
+        result = {}
+        for bucket, n in zip_longest(self.buckets, state.counts, fillvalue=0):
+            cumulative += n
+            result[bucket] = cumulative
+        return result
+
+    def get_all_values(self) -> Dict[tuple, MetricValue]:
+        """获取所有值（直方图的值固定为0，仅提供标签与更新时间）"""
+        return {
+            key: MetricValue(value=0, timestamp_ns=state.timestamp_ns, labels=state.labels)
+            for key, state in list(self._state.items())
+        }
 
     def _format_prometheus_values(self) -> List[str]:
         lines = []
-        for key_tuple, counts in self._counts.items():
-            labels = {name: key_tuple[i] for i, name in enumerate(self.label_names)}
-            label_str = self._format_labels(labels)
-            sum_val = self._sums.get(key_tuple, 0)
-            count = self._counts_raw.get(key_tuple, 0)
+        for key_tuple, state in list(self._state.items()):
+            label_str = self._label_str(key_tuple)
+            sum_val = state.sum
+            count = state.count
 
             # 桶计数
             cumulative = 0
-            for bucket in self.buckets:
-                cumulative += counts.get(bucket, 0)
+            for bucket, n in zip_longest(self.buckets, state.counts, fillvalue=0):
+                cumulative += n
                 lines.append(f"{self.name}_bucket{{le=\"{bucket}\",{label_str[1:-1]}}} {cumulative}")
 
             # +Inf桶
@@ -285,19 +422,48 @@ class Histogram(Metric):
 
         return lines
 
-    def _format_labels(self, labels: Dict[str, str]) -> str:
-        if not labels:
-            return ""
-        pairs = [f'{k}="{v}"' for k, v in labels.items()]
-        return "{" + ",".join(pairs) + "}"
-
     def reset(self):
-        """重置直方图"""
-        with self._lock:
+        """重置直方图（按固定顺序获取全部分段锁）"""
+        for stripe in self._stripes:
+            stripe.acquire()
+        try:
             super().reset()
-            self._counts.clear()
-            self._sums.clear()
-            self._counts_raw.clear()
+            self._state.clear()
+            self._dirty = True
+        finally:
+            for stripe in reversed(self._stripes):
+                stripe.release()
+
+
+class BoundCounter:
+    """绑定标签的计数器，inc时跳过标签键计算"""
+
+    __slots__ = ("_counter", "_key")
+
+    def __init__(self, counter: Counter, labels: Dict[str, str]):
+        self._counter = counter
+        self._key = counter._make_key(labels)
+
+    def inc(self, value: float = 1.0):
+        """增加计数"""
+        if value < 0:
+            raise ValueError("Counter can only increase")
+        self._counter._add(self._key, value)
+
+
+class BoundHistogram:
+    """绑定标签的直方图，observe时跳过标签键计算"""
+
+    __slots__ = ("_histogram", "_key", "_labels")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self._histogram = histogram
+        self._key = histogram._make_key(labels)
+        self._labels = labels
+
+    def observe(self, value: float):
+        """观察一个值"""
+        self._histogram._observe(self._key, value, self._labels)
 
 
 # ============================================================
@@ -311,7 +477,7 @@ class MetricsCollector:
     """
 
     def __init__(self, enabled: bool = True):
-        self.enabled = enabled
+        self.enabled = enabled and METRICS_ENABLED
         self._metrics: Dict[str, Metric] = {}
         self._lock = threading.RLock()
         self._init_metrics()
@@ -320,172 +486,167 @@ class MetricsCollector:
         """初始化所有指标"""
 
         # ========== 意图分类指标 ==========
-        self.intent_total = Counter(
+        self.intent_total = self._register(Counter(
             name="intent_classification_total",
             description="Total intent classifications",
             label_names=["intent", "result"]
-        )
+        ))
 
-        self.intent_confidence = Histogram(
+        self.intent_confidence = self._register(Histogram(
             name="intent_confidence",
             description="Intent confidence distribution",
             buckets=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
-        )
+        ))
 
-        self.intent_duration = Histogram(
+        self.intent_duration = self._register(Histogram(
             name="intent_classification_duration_seconds",
             description="Intent classification duration",
             buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5]
-        )
+        ))
 
-        self.ambiguous_intent_total = Counter(
+        self.ambiguous_intent_total = self._register(Counter(
             name="ambiguous_intent_total",
             description="Total ambiguous intent detections",
             label_names=["resolved"]
-        )
+        ))
 
         # ========== Skill执行指标 ==========
-        self.skill_total = Counter(
+        self.skill_total = self._register(Counter(
             name="skill_invocation_total",
             description="Total skill invocations",
             label_names=["skill", "result"]
-        )
+        ))
 
-        self.skill_duration = Histogram(
+        self.skill_duration = self._register(Histogram(
             name="skill_execution_seconds",
             description="Skill execution time",
             label_names=["skill"],
             buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
-        )
+        ))
 
-        self.skill_errors = Counter(
+        self.skill_errors = self._register(Counter(
             name="skill_errors_total",
             description="Skill errors",
             label_names=["skill", "error_type"]
-        )
+        ))
 
-        self.skill_timeout_total = Counter(
+        self.skill_timeout_total = self._register(Counter(
             name="skill_timeout_total",
             description="Skill timeouts",
             label_names=["skill"]
-        )
+        ))
 
         # ========== 会话指标 ==========
-        self.active_sessions = Gauge(
+        self.active_sessions = self._register(Gauge(
             name="active_sessions",
             description="Number of active sessions"
-        )
+        ))
 
-        self.session_total = Counter(
+        self.session_total = self._register(Counter(
             name="session_total",
             description="Total sessions created",
             label_names=["status"]
-        )
+        ))
 
-        self.session_duration = Histogram(
+        self.session_duration = self._register(Histogram(
             name="session_duration_seconds",
             description="Session duration",
             buckets=[10, 30, 60, 300, 600, 1800, 3600]
-        )
+        ))
 
-        self.session_turns = Histogram(
+        self.session_turns = self._register(Histogram(
             name="session_turns_total",
             description="Number of turns per session",
             buckets=[1, 2, 3, 5, 10, 20, 50]
-        )
+        ))
 
         # ========== 安全指标 ==========
-        self.emergency_detected = Counter(
+        self.emergency_detected = self._register(Counter(
             name="emergency_detections_total",
             description="Emergency detections",
             label_names=["level"]
-        )
+        ))
 
-        self.safety_warnings = Counter(
+        self.safety_warnings = self._register(Counter(
             name="safety_warnings_total",
             description="Safety warnings",
             label_names=["type", "severity"]
-        )
+        ))
 
-        self.drug_interaction_detected = Counter(
+        self.drug_interaction_detected = self._register(Counter(
             name="drug_interaction_detections_total",
             description="Drug interaction detections",
             label_names=["severity"]
-        )
+        ))
 
-        self.allergy_risk_detected = Counter(
+        self.allergy_risk_detected = self._register(Counter(
             name="allergy_risk_detections_total",
             description="Allergy risk detections"
-        )
+        ))
 
         # ========== 缓存指标 ==========
-        self.cache_hits = Counter(
+        self.cache_hits = self._register(Counter(
             name="cache_hits_total",
             description="Cache hits",
             label_names=["cache_type"]
-        )
+        ))
 
-        self.cache_misses = Counter(
+        self.cache_misses = self._register(Counter(
             name="cache_misses_total",
             description="Cache misses",
             label_names=["cache_type"]
-        )
+        ))
 
-        self.cache_size = Gauge(
+        self.cache_size = self._register(Gauge(
             name="cache_size",
             description="Current cache size",
             label_names=["cache_type"]
-        )
+        ))
 
         # ========== 知识库指标 ==========
-        self.knowledge_query_total = Counter(
+        self.knowledge_query_total = self._register(Counter(
             name="knowledge_query_total",
             description="Knowledge base queries",
             label_names=["category", "result"]
-        )
+        ))
 
-        self.knowledge_query_duration = Histogram(
+        self.knowledge_query_duration = self._register(Histogram(
             name="knowledge_query_duration_seconds",
             description="Knowledge query duration",
             buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1]
-        )
+        ))
 
         # ========== 用户画像指标 ==========
-        self.profile_queries = Counter(
+        self.profile_queries = self._register(Counter(
             name="profile_queries_total",
             description="User profile queries",
             label_names=["result"]
-        )
+        ))
 
-        self.profile_updates = Counter(
+        self.profile_updates = self._register(Counter(
             name="profile_updates_total",
             description="User profile updates",
             label_names=["field"]
-        )
+        ))
 
         # ========== MCP调用指标 ==========
-        self.mcp_calls_total = Counter(
+        self.mcp_calls_total = self._register(Counter(
             name="mcp_calls_total",
             description="MCP tool calls",
             label_names=["tool", "result"]
-        )
+        ))
 
-        self.mcp_duration = Histogram(
+        self.mcp_duration = self._register(Histogram(
             name="mcp_call_duration_seconds",
             description="MCP call duration",
             label_names=["tool"],
             buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1, 2]
-        )
+        ))
 
-        # 注册所有指标
-        self._register_all()
-
-    def _register_all(self):
-        """注册所有指标"""
-        for attr_name in dir(self):
-            attr = getattr(self, attr_name)
-            if isinstance(attr, Metric):
-                self._metrics[attr.name] = attr
+    def _register(self, metric: Metric) -> Metric:
+        """注册指标并返回，供 _init_metrics 在创建时使用"""
+        self._metrics[metric.name] = metric
+        return metric
 
     def get_metric(self, name: str) -> Optional[Metric]:
         """获取指标"""
@@ -522,7 +683,7 @@ class MetricsCollector:
             return
 
         result = "success" if success else "failure"
-        self.intent_total.inc(labels={"intent": intent, "result": result})
+        self.intent_total.labels(intent, result).inc()
         self.intent_confidence.observe(confidence)
         self.intent_duration.observe(duration)
 
@@ -538,18 +699,18 @@ class MetricsCollector:
             return
 
         result = "success" if success else "failure"
-        self.skill_total.inc(labels={"skill": skill, "result": result})
+        self.skill_total.labels(skill, result).inc()
         self.skill_duration.observe(duration, labels={"skill": skill})
 
         if not success and error_type:
-            self.skill_errors.inc(labels={"skill": skill, "error_type": error_type})
+            self.skill_errors.labels(skill, error_type).inc()
 
     def record_session_start(self):
         """记录会话开始"""
         if not self.enabled:
             return
         self.active_sessions.inc()
-        self.session_total.inc(labels={"status": "started"})
+        self.session_total.labels("started").inc()
 
     def record_session_end(self, duration: float, turn_count: int):
         """记录会话结束"""
@@ -558,31 +719,31 @@ class MetricsCollector:
         self.active_sessions.dec()
         self.session_duration.observe(duration)
         self.session_turns.observe(turn_count)
-        self.session_total.inc(labels={"status": "ended"})
+        self.session_total.labels("ended").inc()
 
     def record_emergency(self, level: str):
         """记录紧急情况检测"""
         if not self.enabled:
             return
-        self.emergency_detected.inc(labels={"level": level})
+        self.emergency_detected.labels(level).inc()
 
     def record_safety_warning(self, warning_type: str, severity: str):
         """记录安全警告"""
         if not self.enabled:
             return
-        self.safety_warnings.inc(labels={"type": warning_type, "severity": severity})
+        self.safety_warnings.labels(warning_type, severity).inc()
 
     def record_cache_hit(self, cache_type: str):
         """记录缓存命中"""
         if not self.enabled:
             return
-        self.cache_hits.inc(labels={"cache_type": cache_type})
+        self.cache_hits.labels(cache_type).inc()
 
     def record_cache_miss(self, cache_type: str):
         """记录缓存未命中"""
         if not self.enabled:
             return
-        self.cache_misses.inc(labels={"cache_type": cache_type})
+        self.cache_misses.labels(cache_type).inc()
 
     def set_cache_size(self, cache_type: str, size: int):
         """设置缓存大小"""
@@ -603,7 +764,7 @@ class MetricsCollector:
             return
 
         result = "success" if success else "failure"
-        self.mcp_calls_total.inc(labels={"tool": tool, "result": result})
+        self.mcp_calls_total.labels(tool, result).inc()
         self.mcp_duration.observe(duration, labels={"tool": tool})
 
     def get_stats_summary(self) -> Dict[str, Any]:
@@ -628,91 +789,119 @@ class MetricsCollector:
         }
 
 
+def _noop(*args, **kwargs):
+    """空操作"""
+    return None
+
+
+class NullMetricsCollector(MetricsCollector):
+    """
+    指标关闭时使用的空收集器
+    记录方法均为空操作，仍保留指标属性以便装饰器等调用方照常引用
+    """
+
+    def __init__(self):
+        super().__init__(enabled=False)
+
+    record_intent_classification = staticmethod(_noop)
+    record_skill_execution = staticmethod(_noop)
+    record_session_start = staticmethod(_noop)
+    record_session_end = staticmethod(_noop)
+    record_emergency = staticmethod(_noop)
+    record_safety_warning = staticmethod(_noop)
+    record_cache_hit = staticmethod(_noop)
+    record_cache_miss = staticmethod(_noop)
+    set_cache_size = staticmethod(_noop)
+    record_mcp_call = staticmethod(_noop)
+
+
 # ============================================================
 # 装饰器
 # ============================================================
 
+def _metrics_disabled(collector: Optional[MetricsCollector]) -> bool:
+    """指标是否被关闭（全局开关或收集器开关）"""
+    return not METRICS_ENABLED or (collector is not None and not collector.enabled)
+
+
+def _no_op_decorator(func: Callable) -> Callable:
+    """指标关闭时使用的装饰器，直接返回原函数"""
+    return func
+
+
 def track_time(collector: MetricsCollector, histogram: Histogram, labels: Dict[str, str] = None):
-    """跟踪执行时间的装饰器"""
+    """跟踪执行时间的装饰器（使用整数纳秒计时）"""
+    if _metrics_disabled(collector):
+        return _no_op_decorator
+
+    # 标签键在创建装饰器时计算一次
+    bound = histogram.with_labels(**(labels or {}))
+
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        async def async_wrapper(*args, **kwargs):
-            start = time.time()
-            try:
-                result = await func(*args, **kwargs)
-                duration = time.time() - start
-                if labels:
-                    histogram.observe(duration, labels)
-                else:
-                    histogram.observe(duration)
-                return result
-            except Exception as e:
-                duration = time.time() - start
-                if labels:
-                    histogram.observe(duration, labels)
-                else:
-                    histogram.observe(duration)
-                raise
+        # 根据函数是否是协程只创建对应的包装器
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    bound.observe((time.perf_counter_ns() - start) / 1e9)
+
+            return async_wrapper
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            start = time.time()
+            start = time.perf_counter_ns()
             try:
-                result = func(*args, **kwargs)
-                duration = time.time() - start
-                if labels:
-                    histogram.observe(duration, labels)
-                else:
-                    histogram.observe(duration)
-                return result
-            except Exception as e:
-                duration = time.time() - start
-                if labels:
-                    histogram.observe(duration, labels)
-                else:
-                    histogram.observe(duration)
-                raise
+                return func(*args, **kwargs)
+            finally:
+                bound.observe((time.perf_counter_ns() - start) / 1e9)
 
-        # 根据函数是否是协程返回对应的包装器
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+        return sync_wrapper
 
     return decorator
 
 
 def track_counter(collector: MetricsCollector, counter: Counter, labels: Dict[str, str] = None, success_only: bool = True):
     """跟踪计数的装饰器"""
+    if _metrics_disabled(collector):
+        return _no_op_decorator
+
+    # 标签键在创建装饰器时计算一次
+    bound = counter.with_labels(**(labels or {}))
+    bound_failure = counter.with_labels(**{**(labels or {}), "result": "failure"})
+
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        async def async_wrapper(*args, **kwargs):
-            try:
-                result = await func(*args, **kwargs)
+        # 根据函数是否是协程只创建对应的包装器
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception:
+                    if not success_only:
+                        bound_failure.inc()
+                    raise
                 if not success_only or result is not None:
-                    counter.inc(labels=labels or {})
+                    bound.inc()
                 return result
-            except Exception:
-                if not success_only:
-                    counter.inc(labels={**(labels or {}), "result": "failure"})
-                raise
+
+            return async_wrapper
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
             try:
                 result = func(*args, **kwargs)
-                if not success_only or result is not None:
-                    counter.inc(labels=labels or {})
-                return result
             except Exception:
                 if not success_only:
-                    counter.inc(labels={**(labels or {}), "result": "failure"})
+                    bound_failure.inc()
                 raise
+            if not success_only or result is not None:
+                bound.inc()
+            return result
 
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+        return sync_wrapper
 
     return decorator
 
@@ -722,11 +911,16 @@ def track_counter(collector: MetricsCollector, counter: Counter, labels: Dict[st
 # ============================================================
 
 _global_collector: Optional[MetricsCollector] = None
+_null_collector: Optional[NullMetricsCollector] = None
 
 
 def get_metrics_collector(enabled: bool = True) -> MetricsCollector:
-    """获取全局指标收集器"""
-    global _global_collector
+    """获取全局指标收集器（指标关闭时返回空收集器单例）"""
+    global _global_collector, _null_collector
+    if not enabled or not METRICS_ENABLED:
+        if _null_collector is None:
+            _null_collector = NullMetricsCollector()
+        return _null_collector
     if _global_collector is None:
         _global_collector = MetricsCollector(enabled=enabled)
     return _global_collector
@@ -85,6 +85,7 @@ if PYDANTIC_AVAILABLE:
         port: int = Field(default=50051, ge=1024, le=65535, description="MCP端口")
         protocol: str = Field(default="grpc", description="协议类型: grpc或http")
         timeout: int = Field(default=30, ge=5, description="请求超时(秒)")
+        max_concurrent: int = Field(default=100, ge=1, description="同时进行的MCP请求上限")
 
     class Settings(BaseModel):
         """应用主配置"""
@@ -188,6 +189,7 @@ else:
         port: int = 50051
         protocol: str = "grpc"
         timeout: int = 30
+        max_concurrent: int = 100
 
     @dataclass
     class Settings:
@@ -382,7 +384,8 @@ DEFAULT_CONFIG = {
         "host": "localhost",
         "port": 50051,
         "protocol": "grpc",
-        "timeout": 30
+        "timeout": 30,
+        "max_concurrent": 100
     }
 }
 
@@ -12,6 +12,22 @@ from enum import Enum
 from pathlib import Path
 
 
+# 已编译正则缓存（模式字符串 -> 编译结果），进程内所有检测器实例共享
+_COMPILED_CACHE: Dict[str, re.Pattern] = {}
+
+# 从模式中提取中文词
+_CHINESE_WORD_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+
+
+def _compile_cached(pattern: str) -> re.Pattern:
+    """编译正则表达式并缓存，同一模式只编译一次"""
+    compiled = _COMPILED_CACHE.get(pattern)
+    if compiled is None:
+        compiled = re.compile(pattern, re.IGNORECASE)
+        _COMPILED_CACHE[pattern] = compiled
+    return compiled
+
+
 class EmergencyLevel(Enum):
     """紧急程度级别"""
     CRITICAL = "critical"    # 需要立即就医/拨打120
@@ -146,7 +162,7 @@ class EmergencyDetector:
         """编译正则表达式模式"""
         compiled = {}
         for level, patterns in self.patterns.items():
-            compiled[level] = [re.compile(p, re.IGNORECASE) for p in patterns]
+            compiled[level] = [_compile_cached(p) for p in patterns]
         return compiled
 
     def detect(self, text: str) -> Optional[EmergencyResult]:
@@ -244,7 +260,7 @@ class EmergencyDetector:
         if not symptoms:
             for pattern in patterns:
                 # 简单提取中文词
-                chinese_words = re.findall(r'[\u4e00-\u9fff]+', pattern)
+                chinese_words = _CHINESE_WORD_PATTERN.findall(pattern)
                 symptoms.extend(chinese_words[:3])  # 限制数量
 
         return list(set(symptoms))[:5]  # 去重并限制数量
@@ -343,6 +359,12 @@ class EmergencyDetector:
         self._compiled_patterns = self._compile_patterns()
 
 
+# 模块加载时预编译内置模式
+for _patterns in EmergencyDetector.DEFAULT_PATTERNS.values():
+    for _pattern in _patterns:
+        _compile_cached(_pattern)
+
+
 # ============================================================
 # 便捷函数
 # ============================================================
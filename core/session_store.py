@@ -173,7 +173,7 @@ class SessionStore:
         await self.initialize()
 
         # 序列化数据
-        history_json = json.dumps(context.history, ensure_ascii=False)
+        history_json = json.dumps(list(context.history), ensure_ascii=False)
         entities_json = json.dumps(context.accumulated_entities, ensure_ascii=False)
         metadata_json = json.dumps(context.metadata, ensure_ascii=False)
 
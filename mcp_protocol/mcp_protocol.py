@@ -609,6 +609,20 @@ class MCPClient:
                 tool_name=tool_name
             )
 
+    async def call_tools_batch(
+        self,
+        calls: List[tuple],
+        timeout: float = 30.0
+    ) -> List[MCPCallResult]:
+        """
+        批量调用工具
+        calls 为 [(tool_name, params), ...]，并发执行，结果与输入一一对应
+        """
+        logger.info(f"[MCP Client {self.client_id}] Calling {len(calls)} tools in batch")
+        return list(await asyncio.gather(
+            *(self.call_tool(tool_name, params, timeout) for tool_name, params in calls)
+        ))
+
     async def _get_server_connection(self, server_id: str) -> Optional[MCPServer]:
         """获取服务器连接"""
         # 简化实现：直接从Host获取服务器信息
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+医疗智能助手 - 异常体系测试
+测试异常序列化、用户消息格式化与恢复建议
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 导入被测试模块
+from agent.exceptions import (
+    ErrorSeverity,
+    MedicalAgentError,
+    DrugAllergyError,
+    DrugDoseError,
+    KnowledgeNotFoundError,
+    AmbiguousIntentError,
+    EmergencyAction,
+    EmergencyDetectedError,
+    SessionNotFoundError,
+    SessionExpiredError,
+    SkillTimeoutError,
+    format_error_for_user,
+    lazy_format_error_for_user,
+    get_error_recovery_suggestion,
+)
+
+
+class TestErrorSerialization:
+    """异常序列化测试"""
+
+    def test_to_dict_fields(self):
+        """测试to_dict字段"""
+        error = DrugAllergyError("过敏风险", drug="阿莫西林", allergens=["青霉素"])
+        data = error.to_dict()
+
+        assert data["error_type"] == "DrugAllergyError"
+        assert data["severity"] == "critical"
+        assert data["details"]["drug"] == "阿莫西林"
+        assert data["details"]["allergens"] == ["青霉素"]
+
+    def test_to_dict_cached(self):
+        """测试to_dict结果缓存"""
+        error = KnowledgeNotFoundError("未找到", query="头痛")
+        assert error.to_dict() is error.to_dict()
+
+    def test_emergency_action_shared_dict(self):
+        """测试同一紧急建议多次抛出时复用序列化结果"""
+        action = EmergencyAction(action="call_120", urgency="immediate", description="请立即拨打120")
+        first = EmergencyDetectedError("胸痛", severity="critical",
+                                       matched_patterns=["胸痛"], suggested_action=action)
+        second = EmergencyDetectedError("胸痛", severity="critical",
+                                        matched_patterns=["胸痛"], suggested_action=action)
+
+        assert first.details["suggested_action"] == {
+            "action": "call_120", "urgency": "immediate", "description": "请立即拨打120"
+        }
+        assert first.details["suggested_action"] is second.details["suggested_action"]
+        assert first.severity == ErrorSeverity.CRITICAL
+
+    def test_caller_details_not_mutated(self):
+        """测试不修改调用方传入的details"""
+        extra = {"request_id": "r-1"}
+        error = DrugAllergyError("过敏风险", drug="阿莫西林", allergens=["青霉素"], details=extra)
+
+        assert extra == {"request_id": "r-1"}
+        assert error.details["request_id"] == "r-1"
+        assert error.details["risk_type"] == "allergy"
+
+    def test_subclass_error_code_and_severity(self):
+        """测试子类错误码与严重程度向上传递"""
+        ambiguous = AmbiguousIntentError("不确定", candidate_intents=[])
+        assert ambiguous.error_code == "INTENT_002"
+        assert ambiguous.severity == ErrorSeverity.INFO
+
+        not_found = KnowledgeNotFoundError("未找到", query="头痛")
+        assert not_found.error_code == "KNOWLEDGE_002"
+        assert not_found.details == {"query": "头痛"}
+
+        expired = SessionExpiredError("s-001", expiry_time="2026-01-01 00:00:00")
+        assert expired.error_code == "SESSION_003"
+        assert expired.details == {"session_id": "s-001", "expiry_time": "2026-01-01 00:00:00"}
+
+    def test_base_error_defaults(self):
+        """测试基础异常默认值"""
+        error = MedicalAgentError("出错了")
+
+        assert error.error_code == "MedicalAgentError"
+        assert error.severity == ErrorSeverity.ERROR
+        assert error.details == {}
+        assert str(error) == "[MedicalAgentError] 出错了"
+
+
+class TestFormatErrorForUser:
+    """用户消息格式化测试"""
+
+    def test_exact_type_dispatch(self):
+        """测试精确类型分发"""
+        error = DrugAllergyError("过敏风险", drug="阿莫西林", allergens=["青霉素", "头孢"])
+        assert format_error_for_user(error) == "⚠️ 过敏风险\n\n过敏原: 青霉素, 头孢"
+
+    def test_subclass_falls_back_to_parent(self):
+        """测试子类沿MRO回退到父类格式"""
+        error = DrugDoseError("剂量过大", drug="布洛芬", recommended_dose="每日1200mg")
+        assert format_error_for_user(error) == "⚠️ 剂量过大"
+
+    def test_knowledge_not_found_suggestions(self):
+        """测试知识未找到时附带建议"""
+        error = KnowledgeNotFoundError("未找到", query="头疼", suggestions=["头痛", "偏头痛"])
+        assert format_error_for_user(error) == "未找到相关信息: 头疼\n\n建议尝试: 头痛, 偏头痛"
+
+    def test_default_by_severity(self):
+        """测试默认格式按严重程度区分"""
+        assert format_error_for_user(MedicalAgentError("出错了")) == "抱歉，处理您的请求时遇到问题: 出错了"
+        info = MedicalAgentError("提示", severity=ErrorSeverity.INFO)
+        assert format_error_for_user(info) == "提示"
+
+    def test_lazy_format(self):
+        """测试延迟格式化与立即格式化结果一致"""
+        error = DrugAllergyError("过敏风险", drug="阿莫西林", allergens=["青霉素"])
+        assert str(lazy_format_error_for_user(error)) == format_error_for_user(error)
+
+    def test_user_defined_subclass(self):
+        """测试未注册的自定义子类"""
+        class CustomError(MedicalAgentError):
+            pass
+
+        assert format_error_for_user(CustomError("自定义")) == "抱歉，处理您的请求时遇到问题: 自定义"
+
+
+class TestRecoverySuggestion:
+    """恢复建议测试"""
+
+    def test_most_specific_class_wins(self):
+        """测试最具体的异常类优先"""
+        error = AmbiguousIntentError("不确定", candidate_intents=[])
+        assert get_error_recovery_suggestion(error) == "请选择您感兴趣的具体内容"
+
+    def test_inherited_suggestion(self):
+        """测试子类继承父类建议"""
+        error = SessionNotFoundError("s-001")
+        assert get_error_recovery_suggestion(error) == "请重新开始对话"
+
+    def test_default_suggestion(self):
+        """测试未登记类型的默认建议"""
+        error = SkillTimeoutError("symptom_analyzer", timeout_seconds=5)
+        assert get_error_recovery_suggestion(error) == "请稍后重试，或联系技术支持"
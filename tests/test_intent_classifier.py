@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+医疗智能助手 - 意图分类测试
+测试规则分类器的边界情况、意图判定与实体提取
+"""
+
+import pytest
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 导入被测试模块
+from agent.medical_agent import IntentClassifier, IntentType, DialogueContext, _trie_regex
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    """创建规则意图分类器实例"""
+    return IntentClassifier(use_ml=False)
+
+
+@pytest.fixture
+def context():
+    """创建空对话上下文"""
+    return DialogueContext(session_id="test_session", user_id="test_user")
+
+
+def classify(classifier, text, context):
+    return classifier.classify_sync(text, context)
+
+
+class TestEdgeCases:
+    """边界情况测试"""
+
+    @pytest.mark.parametrize("text", ["你好", "Hello", "谢谢医生"])
+    def test_greeting(self, classifier, context, text):
+        """测试问候语"""
+        result = classify(classifier, text, context)
+        assert result.intent == IntentType.GREETING
+        assert result.target_skill == "greeting-handler"
+
+    @pytest.mark.parametrize("text", ["不头痛", "没有不舒服"])
+    def test_negation(self, classifier, context, text):
+        """测试否定句"""
+        result = classify(classifier, text, context)
+        assert result.intent == IntentType.UNKNOWN
+        assert result.confidence == 0.0
+
+    @pytest.mark.parametrize("cache_size", [0, 16])
+    def test_shortcut_result_not_shared(self, context, cache_size):
+        """测试边界情况返回的结果可安全修改，不影响后续调用"""
+        shortcut_classifier = IntentClassifier(use_ml=False, cache_size=cache_size)
+        first = shortcut_classifier.classify_sync("你好", context)
+        first.entities["name"] = "张三"
+        assert first is not shortcut_classifier._GREETING_RESULT
+        assert shortcut_classifier.classify_sync("你好", context).entities == {}
+
+    def test_repeated_chars(self, classifier, context):
+        """测试重复字符等无意义输入"""
+        result = classify(classifier, "啊啊啊啊", context)
+        assert result.intent == IntentType.UNKNOWN
+
+
+    def test_phone_only(self, classifier, context):
+        """测试仅输入手机号时直接路由到预约查询"""
+        result = classify(classifier, " 13812345678 ", context)
+        assert result.intent == IntentType.MY_APPOINTMENT
+        assert result.entities == {"action": "query", "phone": "13812345678"}
+
+    def test_phone_only_in_followup(self, classifier, context):
+        """测试随访流程中仅输入手机号时保持随访意图"""
+        context.history.append({"intent": IntentType.FOLLOWUP.value})
+        result = classify(classifier, "13812345678", context)
+        assert result.intent == IntentType.FOLLOWUP
+        assert result.target_skill == "followup-handler"
+
+    def test_phone_only_in_records(self, classifier, context):
+        """测试档案查询流程中仅输入手机号时保持档案意图"""
+        context.history.append({"intent": IntentType.RECORDS.value})
+        result = classify(classifier, "13812345678", context)
+        assert result.intent == IntentType.RECORDS
+        assert result.target_skill == "records-handler"
+        assert result.entities == {"action": "records", "phone": "13812345678"}
+
+
+class TestRuleClassification:
+    """规则分类测试"""
+
+    def test_symptom_entities(self, classifier, context):
+        """测试症状意图及时长、严重程度提取"""
+        result = classify(classifier, "我头痛3天了，特别难受", context)
+        assert result.intent == IntentType.SYMPTOM_INQUIRY
+        assert result.entities["symptom"] == "头痛"
+        assert result.entities["duration"] == "3天"
+        assert result.entities["severity"] == "severe"
+
+    @pytest.mark.parametrize("text, severity", [
+        ("我有点头痛，特别难受", "severe"),
+        ("我头痛，比较难受", "moderate"),
+    ])
+    def test_severity_priority(self, classifier, context, text, severity):
+        """测试多个严重程度词同时出现时取最高等级"""
+        result = classify(classifier, text, context)
+        assert result.entities["severity"] == severity
+
+    def test_medication_entities(self, classifier, context):
+        """测试用药意图及药品、查询类型提取"""
+        result = classify(classifier, "布洛芬有什么副作用", context)
+        assert result.intent == IntentType.MEDICATION_CONSULT
+        assert result.entities["drug_name"] == "布洛芬"
+        assert result.entities["query_type"] == "side_effects"
+
+    def test_department_query(self, classifier, context):
+        """测试科室查询"""
+        result = classify(classifier, "头晕挂什么科", context)
+        assert result.intent == IntentType.DEPARTMENT_QUERY
+        assert result.target_skill == "department-recommender"
+
+    def test_async_matches_sync(self, classifier, context):
+        """测试协程接口与同步接口结果一致"""
+        text = "阿莫西林怎么吃"
+        assert asyncio.run(classifier.classify(text, context)) == classifier.classify_sync(text, context)
+
+    def test_unknown(self, classifier, context):
+        """测试无法识别的输入"""
+        result = classify(classifier, "今天天气怎么说呢朋友们", context)
+        assert result.intent == IntentType.UNKNOWN
+        assert result.requires_clarification
+
+
+class _FakeBatchModel:
+    """记录调用次数的批量预测模型"""
+
+    def __init__(self):
+        self.batch_calls = []
+
+    def predict_top_k_batch(self, texts, k=3):
+        self.batch_calls.append(list(texts))
+        return [[("medication_consult", 0.9), ("symptom_inquiry", 0.05)] for _ in texts]
+
+
+class TestClassifyMany:
+    """批量分类测试"""
+
+    def test_rules_match_single(self, classifier):
+        """测试规则模式下批量结果与逐条结果一致"""
+        texts = ["你好", "我头痛3天了", "不头痛", "头晕挂什么科", "布洛芬有什么副作用"]
+        contexts = [DialogueContext(session_id=f"s{i}", user_id="u") for i in range(len(texts))]
+        expected = [classifier.classify_sync(t, c) for t, c in zip(texts, contexts)]
+        assert classifier.classify_many_sync(texts, contexts) == expected
+
+    def test_ml_single_forward_pass(self):
+        """测试ML模式下边界情况不进入模型，其余文本合并为一次预测"""
+        ml_classifier = IntentClassifier(use_ml=False)
+        model = _FakeBatchModel()
+        ml_classifier.mlp_classifier = model
+        ml_classifier.ml_enabled = True
+
+        texts = ["你好", "阿莫西林怎么吃", "不头痛", "布洛芬能一起吃吗"]
+        contexts = [DialogueContext(session_id=f"s{i}", user_id="u") for i in range(len(texts))]
+        results = ml_classifier.classify_many_sync(texts, contexts)
+
+        assert model.batch_calls == [["阿莫西林怎么吃", "布洛芬能一起吃吗"]]
+        assert [r.intent for r in results] == [
+            IntentType.GREETING, IntentType.MEDICATION_CONSULT,
+            IntentType.UNKNOWN, IntentType.MEDICATION_CONSULT,
+        ]
+        assert results[1].entities["drug_name"] == "阿莫西林"
+
+
+class TestResultCache:
+    """分类结果缓存测试"""
+
+    def test_cache_hit_returns_copy(self, context):
+        """测试重复输入命中缓存，且返回副本"""
+        cached_classifier = IntentClassifier(use_ml=False)
+        first = cached_classifier.classify_sync("我头痛3天了，特别难受", context)
+        first.entities["symptom"] = "changed"
+
+        second = cached_classifier.classify_sync("我头痛3天了，特别难受", context)
+        assert len(cached_classifier._result_cache) == 1
+        assert second.entities["symptom"] == "头痛"
+
+    def test_cache_keyed_on_last_intent(self, context):
+        """测试上一轮意图不同时不复用缓存"""
+        cached_classifier = IntentClassifier(use_ml=False)
+        cached_classifier.classify_sync("好的", context)
+        context.history.append({"intent": IntentType.SYMPTOM_INQUIRY.value})
+        cached_classifier.classify_sync("好的", context)
+        assert len(cached_classifier._result_cache) == 2
+
+    def test_cache_bounded(self, context):
+        """测试缓存容量上限"""
+        cached_classifier = IntentClassifier(use_ml=False, cache_size=2)
+        for text in ["头痛", "发烧", "咳嗽"]:
+            cached_classifier.classify_sync(text, context)
+        assert list(key[0] for key in cached_classifier._result_cache) == ["发烧", "咳嗽"]
+
+
+    def test_clear_waits_for_lock(self, context):
+        """测试清空缓存与线程池中的读写互斥"""
+        cached_classifier = IntentClassifier(use_ml=False)
+        cached_classifier.classify_sync("头痛", context)
+        clearer = threading.Thread(target=cached_classifier.clear_cache)
+        with cached_classifier._cache_lock:
+            clearer.start()
+            clearer.join(0.1)
+            assert clearer.is_alive()
+            assert len(cached_classifier._result_cache) == 1
+        clearer.join(5)
+        assert len(cached_classifier._result_cache) == 0
+
+
+class TestTrieRegex:
+    """前缀合并正则测试"""
+
+    def test_common_prefix_factored(self):
+        """测试公共前缀被合并"""
+        assert _trie_regex(["心血管", "心脏", "心律"]).pattern == "心(?:血管|脏|律)"
+
+    @pytest.mark.parametrize("text, expected", [
+        ("挂神经内科", True), ("心血管内科在几楼", True), ("皮肤痒", False),
+    ])
+    def test_matches_any_word(self, text, expected):
+        """测试与逐词子串检查结果一致"""
+        words = IntentClassifier.APPOINTMENT_DEPARTMENTS
+        assert bool(_trie_regex(words).search(text)) == any(w in text for w in words) == expected
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+医疗智能助手 - Agent会话管理测试
+测试会话容量上限与闲置过期
+"""
+
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 导入被测试模块
+from agent.medical_agent import MedicalAgent, DialogueContext, IntentResult, IntentType
+
+
+class TestSessions:
+    """会话淘汰测试"""
+
+    def test_lru_eviction(self):
+        """测试超过容量时淘汰最久未活跃的会话"""
+        agent = MedicalAgent(max_sessions=2)
+        agent.get_or_create_context("a", "u")
+        agent.get_or_create_context("b", "u")
+        agent.get_or_create_context("a", "u")
+        agent.get_or_create_context("c", "u")
+        assert list(agent.sessions) == ["a", "c"]
+
+    def test_reuse_context(self):
+        """测试同一会话返回同一上下文"""
+        agent = MedicalAgent()
+        assert agent.get_or_create_context("a", "u") is agent.get_or_create_context("a", "u")
+
+    def test_idle_expiry(self):
+        """测试闲置超过TTL的会话被清除"""
+        agent = MedicalAgent(session_ttl=-1)
+        agent.get_or_create_context("a", "u")
+        assert agent.get_context("a") is None
+        assert not agent._session_expiry
+
+    def test_clear_context(self):
+        """测试手动清除会话"""
+        agent = MedicalAgent()
+        agent.get_or_create_context("a", "u")
+        agent.clear_context("a")
+        agent.clear_context("missing")
+        assert agent.get_context("a") is None
+
+
+class TestInferPool:
+    """推理线程池测试"""
+
+    def test_pool_matches_inline(self):
+        """测试线程池中分类与事件循环内分类结果一致"""
+        inline = MedicalAgent()
+        pooled = MedicalAgent(infer_workers=2)
+        for text in ["你好", "我头痛3天了，特别难受", "布洛芬有什么副作用"]:
+            assert asyncio.run(pooled.process(text, "s")) == asyncio.run(inline.process(text, "s"))
+        asyncio.run(pooled.stop())
+        assert pooled._infer_pool is None
+
+
+class TestDialogueHistory:
+    """对话历史测试"""
+
+    def test_history_bounded(self):
+        """测试只保留最近的对话轮次"""
+        context = DialogueContext(session_id="s", user_id="u")
+        intent = IntentResult(intent=IntentType.GREETING, confidence=1.0, target_skill="greeting-handler")
+        for i in range(DialogueContext.MAX_HISTORY + 5):
+            context.add_turn(f"输入{i}", "回复", intent)
+        assert len(context.history) == DialogueContext.MAX_HISTORY
+        assert context.history[0]["turn"] == 5
+        assert context.turn_count == DialogueContext.MAX_HISTORY + 5
+
+    def test_list_history_converted(self):
+        """测试从存储恢复的列表历史转为定长缓冲"""
+        context = DialogueContext(session_id="s", user_id="u", history=[{"intent": "greeting"}])
+        assert context.history.maxlen == DialogueContext.MAX_HISTORY
+        assert context.get_last_intent() == IntentType.GREETING
+
+
+class _SlowStore:
+    """记录保存内容的会话存储"""
+
+    def __init__(self, fail=False):
+        self.saved = []
+        self.fail = fail
+
+    async def save_session(self, context):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise IOError("disk full")
+        self.saved.append((context.session_id, len(context.history)))
+
+
+class TestSessionPersistence:
+    """后台会话持久化测试"""
+
+    def test_save_in_background(self):
+        """测试响应先返回，会话写入在后台完成"""
+        store = _SlowStore()
+        agent = MedicalAgent(session_store=store)
+
+        async def run():
+            await agent.process("你好", "s")
+            assert store.saved == []
+            assert len(agent.get_context("s").history) == 1
+            await agent.stop()
+
+        asyncio.run(run())
+        assert store.saved == [("s", 1)]
+        assert not agent._pending_writes
+
+    def test_failed_save_does_not_raise(self):
+        """测试后台写入失败只记录日志，不影响响应"""
+        agent = MedicalAgent(session_store=_SlowStore(fail=True))
+
+        async def run():
+            response = await agent.process("你好", "s")
+            await agent.flush_writes()
+            return response
+
+        assert asyncio.run(run())
+        assert not agent._pending_writes
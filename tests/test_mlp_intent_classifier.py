@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+医疗智能助手 - MLP意图分类器测试
+测试数组格式模型的保存与加载
+"""
+
+import pytest
+import shutil
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("sklearn")
+
+# 导入被测试模块
+from agent.mlp_intent_classifier import MLPIntentClassifier
+
+MODEL_PATH = Path(__file__).parent.parent / "agent" / "models" / "mlp_intent_classifier.pkl"
+
+TEXTS = ["我头痛好几天了", "头痛挂什么科", "阿莫西林怎么吃", "怎么预防高血压", "你好"]
+
+
+@pytest.fixture(scope="module")
+def pickled_classifier(tmp_path_factory):
+    """从joblib文件加载的分类器（临时目录中无数组格式模型）"""
+    if not MODEL_PATH.exists():
+        pytest.skip("MLP模型文件不存在")
+    model_path = tmp_path_factory.mktemp("mlp") / "model.pkl"
+    shutil.copy(MODEL_PATH, model_path)
+    return MLPIntentClassifier(model_path=str(model_path))
+
+
+class TestArrayFormat:
+    """数组格式模型测试"""
+
+    def test_round_trip(self, pickled_classifier):
+        """测试保存为数组格式后加载，预测结果一致"""
+        assert pickled_classifier.model is not None
+        pickled_classifier._save_arrays()
+
+        loaded = MLPIntentClassifier(model_path=pickled_classifier.model_path)
+        assert loaded.is_trained
+        assert loaded.model is None
+        assert loaded.predict_top_k_batch(TEXTS) == pickled_classifier.predict_top_k_batch(TEXTS)
+
+    def test_int8_round_trip(self, pickled_classifier):
+        """测试数组格式保存的int8权重加载后直接使用"""
+        pickled_classifier._save_arrays(pickled_classifier._int8_layer_for_save())
+
+        loaded = MLPIntentClassifier(model_path=pickled_classifier.model_path, use_int8=True)
+        weights, _ = loaded._quantized_layer
+        assert weights.dtype.name == "int8"
+        assert [p[0] for p in loaded.batch_predict(TEXTS)] == [p[0] for p in pickled_classifier.batch_predict(TEXTS)]
+
+    def test_lazy_sklearn_objects(self, pickled_classifier):
+        """测试数组格式模型按需重建向量化器和标签编码器"""
+        pickled_classifier._save_arrays()
+        loaded = MLPIntentClassifier(model_path=pickled_classifier.model_path)
+        assert loaded._vectorizer is None and loaded._label_encoder is None
+        assert loaded.vectorizer.vocabulary_ == pickled_classifier.vectorizer.vocabulary_
+        assert list(loaded.label_encoder.classes_) == list(pickled_classifier.label_encoder.classes_)
+
+
+class TestVectorize:
+    """快速向量化测试"""
+
+    @pytest.mark.parametrize("text", ["阿莫西林怎么吃", "", "  HELLO\t\t你好  ", "a"])
+    def test_matches_sklearn(self, pickled_classifier, text):
+        """测试与sklearn TfidfVectorizer结果一致"""
+        assert pickled_classifier._char_features is not None
+        fast = pickled_classifier._vectorize([text, "头痛挂什么科"])
+        expected = pickled_classifier.vectorizer.transform([text, "头痛挂什么科"])
+        assert (fast.indices == expected.indices).all()
+        assert abs(fast - expected).max() < 1e-12
+
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+医疗智能助手 - 监控指标测试
+测试计数器、直方图与指标装饰器
+"""
+
+import pytest
+import asyncio
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 导入被测试模块
+from agent.monitoring import (
+    MetricsCollector,
+    NullMetricsCollector,
+    get_metrics_collector,
+    Counter,
+    Gauge,
+    Histogram,
+    Metric,
+    track_time,
+    track_counter,
+)
+
+
+@pytest.fixture
+def collector():
+    """创建指标收集器实例"""
+    return MetricsCollector()
+
+
+class TestCounter:
+    """计数器与仪表测试"""
+
+    def test_inc_existing_and_new_keys(self):
+        """测试已有标签原地累加，新标签单独计数"""
+        counter = Counter("requests_total", "Requests", label_names=["result"])
+        counter.inc(labels={"result": "success"})
+        counter.inc(2, labels={"result": "success"})
+        counter.inc(labels={"result": "failure"})
+        assert counter.get_value(labels={"result": "success"}) == 3
+        assert counter.get_total_count() == 4
+
+    def test_all_values_wrapped(self):
+        """测试get_all_values按标签键还原标签并包装为MetricValue"""
+        counter = Counter("warnings_total", "Warnings", label_names=["type", "severity"])
+        counter.inc(2, labels={"severity": "high", "type": "interaction"})
+        metric_value = counter.get_all_values()[("interaction", "high")]
+        assert metric_value.value == 2
+        assert metric_value.labels == {"type": "interaction", "severity": "high"}
+        assert abs(metric_value.timestamp - datetime.now()) < timedelta(seconds=5)
+
+    def test_negative_rejected(self):
+        """测试计数器不允许减少"""
+        with pytest.raises(ValueError):
+            Counter("requests_total", "Requests").inc(-1)
+
+    def test_concurrent_first_inc(self):
+        """测试多线程同时创建同一标签时不丢失首次计数"""
+        counter = Counter("requests_total", "Requests", label_names=["skill"])
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            counter.inc(labels={"skill": "greeting-handler"})
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert counter.get_value(labels={"skill": "greeting-handler"}) == 8
+
+    def test_thread_shards_exact(self):
+        """测试多线程并发累加不丢失更新，线程退出后分片并入汇总"""
+        counter = Counter("requests_total", "Requests", label_names=["skill"])
+
+        def worker():
+            for _ in range(10000):
+                counter.inc(labels={"skill": "a"})
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        counter.inc(labels={"skill": "a"})
+        assert counter.get_value(labels={"skill": "a"}) == 40001
+        assert counter.get_total_count() == 40001
+        assert len(counter._shards) == 1
+        assert 'requests_total{skill="a"} 40001.0' in counter.export_prometheus()
+
+    def test_reset(self):
+        """测试重置清空所有线程的计数"""
+        counter = Counter("requests_total", "Requests")
+        counter.inc(3)
+        counter.reset()
+        assert counter.get_value() == 0
+        counter.inc()
+        assert counter.get_all_values()[()].value == 1
+
+    def test_with_labels(self):
+        """测试绑定标签后与逐次传标签计入同一键"""
+        counter = Counter("requests_total", "Requests", label_names=["result"])
+        bound = counter.with_labels(result="success")
+        bound.inc()
+        counter.inc(2, labels={"result": "success"})
+        assert counter.get_value(labels={"result": "success"}) == 3
+        with pytest.raises(ValueError):
+            bound.inc(-1)
+
+    def test_labels_interned(self):
+        """测试按标签值获取的绑定计数器被复用，且与传标签字典计入同一键"""
+        counter = Counter("warnings_total", "Warnings", label_names=["type", "severity"])
+        assert counter.labels("interaction", "high") is counter.labels("interaction", "high")
+        counter.labels("interaction", "high").inc()
+        counter.inc(labels={"severity": "high", "type": "interaction"})
+        assert counter.get_value(labels={"type": "interaction", "severity": "high"}) == 2
+
+    def test_read_not_blocked_by_lock(self):
+        """测试读取不等待写锁"""
+        gauge = Gauge("active_sessions", "Sessions")
+        gauge.set(3)
+        locked, done = threading.Event(), threading.Event()
+
+        def holder():
+            with gauge._lock:
+                locked.set()
+                done.wait(5)
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        locked.wait(5)
+        try:
+            assert gauge.get_value() == 3
+            assert gauge.get_total_count() == 3
+            assert list(gauge.get_all_values()) == [()]
+        finally:
+            done.set()
+            thread.join()
+
+    def test_gauge_inc_dec(self):
+        """测试仪表增减"""
+        gauge = Gauge("active_sessions", "Sessions")
+        gauge.inc()
+        gauge.inc(2)
+        gauge.dec()
+        assert gauge.get_value() == 2
+        gauge.set(5)
+        assert gauge.get_value() == 5
+
+
+class TestHistogram:
+    """直方图测试"""
+
+    def test_concurrent_observe(self):
+        """测试多线程观察不同及相同标签时计数准确"""
+        histogram = Histogram("skill_seconds", "Skill time", label_names=["skill"], buckets=[0.1, 1])
+
+        def worker(skill):
+            for _ in range(500):
+                histogram.observe(0.05, labels={"skill": skill})
+
+        threads = [threading.Thread(target=worker, args=(f"skill{i % 4}",)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for i in range(4):
+            labels = {"skill": f"skill{i}"}
+            assert histogram.get_count(labels) == 1000
+            assert histogram.get_bucket_values(labels) == {0.1: 1000, 1: 1000}
+
+    def test_bucket_boundaries(self):
+        """测试边界值计入对应桶，超出最大桶只计入+Inf"""
+        histogram = Histogram("latency", "Latency", buckets=[1, 0.1, 0.5])
+        for value in [0.05, 0.1, 0.3, 1, 3]:
+            histogram.observe(value)
+        assert histogram.get_bucket_values() == {0.1: 2, 0.5: 3, 1: 4}
+        lines = histogram.export_prometheus().splitlines()
+        assert 'latency_bucket{le="0.5",} 3' in lines
+        assert 'latency_bucket{le="+Inf",} 5' in lines
+        assert "latency_count 5" in lines
+
+    def test_counts_grow_to_highest_hit_bucket(self):
+        """测试桶计数只分配到已命中的最高桶，未分配的桶按0导出"""
+        histogram = Histogram("skill_seconds", "Skill time", label_names=["skill"])
+        histogram.observe(0.008, labels={"skill": "a"})
+        histogram.observe(20, labels={"skill": "a"})
+        assert len(histogram._state[("a",)].counts) == 2
+        buckets = histogram.get_bucket_values({"skill": "a"})
+        assert len(buckets) == len(histogram.buckets)
+        assert buckets[0.005] == 0 and buckets[0.01] == 1 and buckets[10] == 1
+        assert 'skill_seconds_bucket{le="10",skill="a"} 1' in histogram.export_prometheus()
+
+    def test_with_labels(self):
+        """测试绑定标签的直方图观察"""
+        histogram = Histogram("skill_seconds", "Skill time", label_names=["skill"], buckets=[1])
+        histogram.with_labels(skill="a").observe(0.5)
+        histogram.observe(2, labels={"skill": "a"})
+        assert histogram.get_count({"skill": "a"}) == 2
+        assert histogram.get_sum({"skill": "a"}) == 2.5
+        assert histogram.get_all_values()[("a",)].labels == {"skill": "a"}
+
+    def test_export_during_write_not_stale(self):
+        """测试导出发生在写入进行中时，写入完成后的下次导出能反映新数据"""
+        histogram = Histogram("h", "H", buckets=[1])
+        histogram.observe(0.5)
+        histogram.export_prometheus()
+
+        writer = threading.Thread(target=histogram.observe, args=(0.5,))
+        with histogram._stripe(()):
+            writer.start()
+            writer.join(0.1)
+            assert "h_count 1" in histogram.export_prometheus()
+        writer.join(5)
+        assert histogram.get_count() == 2
+        assert "h_count 2" in histogram.export_prometheus()
+
+    def test_reset(self):
+        """测试重置清空所有标签数据"""
+        histogram = Histogram("skill_seconds", "Skill time", label_names=["skill"])
+        histogram.observe(0.2, labels={"skill": "a"})
+        histogram.reset()
+        assert histogram.get_count({"skill": "a"}) == 0
+        assert histogram.get_all_values() == {}
+        histogram.observe(0.2, labels={"skill": "a"})
+        assert histogram.get_count({"skill": "a"}) == 1
+
+
+class TestCollector:
+    """指标收集器测试"""
+
+    def test_cache_hit_rate(self, collector):
+        """测试缓存命中率统计"""
+        collector.record_cache_hit("kb")
+        collector.record_cache_hit("kb")
+        collector.record_cache_miss("kb")
+        assert collector.get_cache_hit_rate("kb") == pytest.approx(2 / 3)
+        assert collector.get_cache_hit_rate("profile") == 0
+
+    def test_export_reused_until_write(self, collector):
+        """测试无写入时复用上次导出结果，写入后重新生成"""
+        collector.record_cache_hit("kb")
+        first = collector.cache_hits.export_prometheus()
+        assert collector.cache_hits.export_prometheus() is first
+        collector.record_cache_hit("kb")
+        second = collector.cache_hits.export_prometheus()
+        assert 'cache_hits_total{cache_type="kb"} 2.0' in second
+        collector.cache_hits.reset()
+        assert collector.cache_hits.export_prometheus().splitlines()[2:] == []
+
+    def test_all_metrics_registered(self, collector):
+        """测试所有指标属性均已注册，可按名称获取"""
+        metrics = [v for v in vars(collector).values() if isinstance(v, Metric)]
+        assert len(collector._metrics) == len(metrics) == 25
+        for metric in metrics:
+            assert collector.get_metric(metric.name) is metric
+
+
+class TestNullCollector:
+    """空收集器测试"""
+
+    def test_disabled_returns_null_singleton(self):
+        """测试关闭指标时返回空收集器单例"""
+        null = get_metrics_collector(enabled=False)
+        assert isinstance(null, NullMetricsCollector)
+        assert get_metrics_collector(enabled=False) is null
+        assert not null.enabled
+
+    def test_records_nothing(self):
+        """测试记录方法为空操作，指标属性仍可引用"""
+        null = NullMetricsCollector()
+        null.record_cache_hit("kb")
+        null.record_skill_execution("symptom-analyzer", 0.1, success=False, error_type="timeout")
+        assert null.cache_hits.get_total_count() == 0
+        assert null.get_stats_summary() == {}
+        assert null.export_all() == ""
+        assert track_time(null, null.intent_duration)(len) is len
+
+
+class TestDecorators:
+    """指标装饰器测试"""
+
+    def test_track_time_sync(self, collector):
+        """测试同步函数计时"""
+        @track_time(collector, collector.intent_duration)
+        def classify():
+            return "ok"
+
+        assert classify() == "ok"
+        assert collector.intent_duration.get_count() == 1
+        assert 0 <= collector.intent_duration.get_sum() < 1
+
+    def test_track_time_async(self, collector):
+        """测试协程函数计时"""
+        @track_time(collector, collector.skill_duration, labels={"skill": "symptom-analyzer"})
+        async def invoke():
+            return "ok"
+
+        assert asyncio.run(invoke()) == "ok"
+        assert collector.skill_duration.get_count(labels={"skill": "symptom-analyzer"}) == 1
+
+    def test_track_time_records_on_exception(self, collector):
+        """测试异常时仍记录耗时"""
+        @track_time(collector, collector.intent_duration)
+        def failing():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            failing()
+        assert collector.intent_duration.get_count() == 1
+
+    def test_track_counter(self, collector):
+        """测试计数装饰器"""
+        @track_counter(collector, collector.profile_queries, labels={"result": "hit"})
+        def query():
+            return {"user_id": "u1"}
+
+        query()
+        query()
+        assert collector.profile_queries.get_value(labels={"result": "hit"}) == 2
+
+    def test_track_counter_async(self, collector):
+        """测试协程函数计数，返回None时不计数"""
+        @track_counter(collector, collector.profile_queries, labels={"result": "hit"})
+        async def query(user_id):
+            return {"user_id": user_id} if user_id else None
+
+        asyncio.run(query("u1"))
+        asyncio.run(query(None))
+        assert collector.profile_queries.get_value(labels={"result": "hit"}) == 1
+
+    def test_track_counter_failure(self, collector):
+        """测试记录失败时计入result=failure标签"""
+        @track_counter(collector, collector.profile_queries, labels={"result": "hit"}, success_only=False)
+        def query():
+            raise KeyError("u1")
+
+        with pytest.raises(KeyError):
+            query()
+        assert collector.profile_queries.get_value(labels={"result": "failure"}) == 1
+        assert collector.profile_queries.get_value(labels={"result": "hit"}) == 0
+
+    def test_disabled_collector_returns_original(self):
+        """测试关闭指标时装饰器直接返回原函数"""
+        disabled = MetricsCollector(enabled=False)
+
+        def func():
+            return 1
+
+        assert track_time(disabled, disabled.intent_duration)(func) is func
+        assert track_counter(disabled, disabled.profile_queries)(func) is func
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+医疗智能助手 - 响应格式化与知识库测试
+测试响应格式化器（表情替换、免责声明）与健康知识库查询
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 导入被测试模块
+from agent.medical_agent import ResponseFormatter, HealthKnowledgeBase
+
+
+@pytest.fixture
+def formatter():
+    """创建响应格式化器实例"""
+    return ResponseFormatter()
+
+
+class TestFormatWithEmoji:
+    """关键词表情替换测试"""
+
+    def test_default_map(self, formatter):
+        """测试默认映射一次替换全部关键词"""
+        text = formatter.format_with_emoji("头痛建议去医院看医生")
+        assert text == "🤕 头痛建议去🏥 医院看👨‍⚕️ 医生"
+
+    def test_no_keyword_unchanged(self, formatter):
+        """测试无关键词时原样返回"""
+        assert formatter.format_with_emoji("你好") == "你好"
+
+    def test_custom_map_longest_first(self, formatter):
+        """测试自定义映射长词优先匹配"""
+        text = formatter.format_with_emoji("心血管与心", {"心": "❤️", "心血管": "🫀"})
+        assert text == "🫀 心血管与❤️ 心"
+
+    def test_keyword_not_replaced_twice(self, formatter):
+        """测试替换结果不会被再次替换"""
+        text = formatter.format_with_emoji("健康", {"健康": "健康💪"})
+        assert text == "健康💪 健康"
+
+
+class TestDisclaimer:
+    """免责声明追加测试"""
+
+    def test_add_disclaimer(self, formatter):
+        """测试无免责声明时追加"""
+        assert formatter.add_disclaimer("内容") == "内容" + "\n\n---\n\n" + formatter.DISCLAIMER
+
+    def test_existing_marker_case_insensitive(self, formatter):
+        """测试已有免责声明（英文不区分大小写）时不重复追加"""
+        assert formatter.add_disclaimer("内容 DisClaimer") == "内容 DisClaimer"
+        assert formatter.add_disclaimer("内容\n免责声明") == "内容\n免责声明"
+
+
+class TestHealthKnowledgeBase:
+    """健康知识库模糊查询测试"""
+
+    def test_disease_prevention_fuzzy(self):
+        """测试疾病预防知识双向包含匹配"""
+        kb = HealthKnowledgeBase()
+        assert kb.get_disease_prevention("我有高血压怎么办") is kb.DISEASE_PREVENTION["高血压"]
+        assert kb.get_disease_prevention("血压") is kb.DISEASE_PREVENTION["高血压"]
+        assert kb.get_disease_prevention("骨折") is None
+
+    def test_food_restrictions(self):
+        """测试饮食禁忌查询"""
+        kb = HealthKnowledgeBase()
+        assert kb.get_food_restrictions("痛风") == kb.FOOD_RESTRICTIONS["痛风"]
+        assert kb.get_food_restrictions("骨折") == []
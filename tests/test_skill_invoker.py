@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+医疗智能助手 - Skill调用器测试
+测试内置Skill（问候、预约、健康教育、兜底）的响应内容
+"""
+
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 导入被测试模块
+from agent.medical_agent import SkillInvoker, SkillRequest, IntentType, DialogueContext
+
+
+@pytest.fixture
+def invoker():
+    """创建不带MCP客户端的Skill调用器"""
+    return SkillInvoker()
+
+
+class _Result:
+    def __init__(self, success, data):
+        self.success = success
+        self.data = data
+
+
+class _CountingMCP:
+    """记录调用次数的MCP客户端"""
+
+    def __init__(self, success=True):
+        self.success = success
+        self.calls = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append((name, dict(arguments)))
+        if not self.success:
+            return _Result(False, None)
+        return _Result(True, {"info": {"usage": "口服", "contraindications": []}})
+
+
+class _BatchMCP(_CountingMCP):
+    """支持批量调用的MCP客户端"""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    async def call_tools_batch(self, calls):
+        self.batches.append([name for name, _ in calls])
+        return [await self.call_tool(name, arguments) for name, arguments in calls]
+
+
+def make_request(skill_name, user_input="", **entities):
+    return SkillRequest(
+        skill_name=skill_name,
+        intent=IntentType.UNKNOWN,
+        entities=entities,
+        context=DialogueContext(session_id="test_session", user_id="test_user"),
+        metadata={"user_input": user_input}
+    )
+
+
+def invoke(invoker, skill_name, user_input="", **entities):
+    return asyncio.run(invoker.invoke(make_request(skill_name, user_input, **entities)))
+
+
+class TestStaticResponses:
+    """静态响应测试"""
+
+    @pytest.mark.parametrize("text, title", [
+        ("你好", "## 👋 您好！\n\n我是您的医疗健康助手"),
+        ("谢谢", "## 😊 不客气！"),
+        ("嗨", "## 👋 您好！\n\n我是医疗健康助手"),
+        ("谢谢，您好", "## 👋 您好！\n\n我是您的医疗健康助手"),
+    ])
+    def test_greeting(self, invoker, text, title):
+        """测试问候语按输入选择回复"""
+        response = invoke(invoker, "greeting-handler", text)
+        assert response.success
+        assert response.content.startswith(title)
+
+    def test_appointment_with_department(self, invoker):
+        """测试预约说明填入科室"""
+        response = invoke(invoker, "appointment-service", department="眼科")
+        assert "您想预约 **眼科**" in response.content
+        assert "1. 选择科室：眼科" in response.content
+
+    def test_department_list(self, invoker):
+        """测试科室列表表格"""
+        content = invoker._get_department_list()
+        assert content.startswith("## 🏥 本院科室\n\n| 科室 | 适用范围 |\n|------|---------|\n| 内科 |")
+        assert content.count("\n| ") == len(invoker._DEPARTMENTS) + 1
+
+    def test_fallback_suggestions(self, invoker):
+        """测试兜底回复追加相关建议且不修改共享文本"""
+        response = invoke(invoker, "fallback-handler", "头痛吃什么药")
+        assert "> 💡 您可以描述一下具体的症状和部位吗？" in response.content
+        assert "> 💡 请问您想了解哪种药品的信息？" in response.content
+        assert "症状和部位" not in invoker._FALLBACK_RESPONSE
+
+    def test_fallback_suggestion_order(self, invoker):
+        """测试建议按固定顺序输出，与关键词出现位置无关"""
+        response = invoke(invoker, "fallback-handler", "怎么预防吃药后难受")
+        content = response.content
+        assert content.index("症状和部位") < content.index("哪种药品") < content.index("健康生活方式")
+
+
+    def test_static_response_disclaimer(self, invoker):
+        """测试静态文本使用预先追加免责声明的结果"""
+        response = invoke(invoker, "health-educator", "运动")
+        assert response.content == invoker.formatter.add_disclaimer(invoker._EXERCISE_ADVICE)
+        assert response.content is invoker._static_disclaimed[invoker._EXERCISE_ADVICE]
+
+class TestHealthEducation:
+    """健康教育格式化测试"""
+
+    def test_food_restrictions(self, invoker):
+        """测试饮食禁忌列出禁忌食物和对应饮食建议"""
+        restrictions = invoker.health_kb.get_food_restrictions("痛风")
+        content = invoker._format_food_restrictions("痛风", restrictions)
+        assert content.startswith("## 🚫 痛风饮食禁忌\n\n### ❌ 需要避免的食物\n\n")
+        assert f"- **{restrictions[0]}**\n" in content
+        assert "### ✅ 饮食建议\n\n- 低嘌呤饮食\n- 多喝水\n" in content
+
+    def test_food_restriction_condition_order(self, invoker):
+        """测试输入含多个疾病时按知识库顺序取第一个"""
+        response = invoke(invoker, "health-educator", "痛风和高血压饮食要注意什么")
+        assert response.content.startswith("## 🚫 高血压饮食禁忌")
+
+    def test_food_restrictions_without_advice(self, invoker):
+        """测试无预置饮食建议的疾病"""
+        content = invoker._format_food_restrictions("骨折", ["酒"])
+        assert "### ✅ 饮食建议\n\n\n---" in content
+
+    def test_disease_prevention_sections(self, invoker):
+        """测试疾病预防指南按分节输出"""
+        content = invoker._format_disease_prevention(
+            "示例", {"prevention": {"lifestyle": ["戒烟"], "diet": ["少盐"]}}
+        )
+        assert content.index("**饮食建议**:\n- 少盐\n") < content.index("**生活方式**:\n- 戒烟\n")
+        assert content.endswith("保持健康生活方式是最好的预防方法。")
+
+
+class TestToolCache:
+    """MCP查询结果缓存测试"""
+
+    def test_repeated_query_hits_cache(self):
+        """测试相同药品查询只调用一次MCP，且响应一致"""
+        mcp = _CountingMCP()
+        invoker = SkillInvoker(mcp)
+        first = invoke(invoker, "medication-advisor", drug_name="布洛芬", query_type="dosage")
+        second = invoke(invoker, "medication-advisor", drug_name="布洛芬", query_type="dosage")
+        assert len(mcp.calls) == 1
+        assert first.content == second.content
+
+        invoke(invoker, "medication-advisor", drug_name="布洛芬", query_type="side_effects")
+        assert len(mcp.calls) == 2
+
+    def test_failed_result_not_cached(self):
+        """测试失败的MCP结果不缓存"""
+        mcp = _CountingMCP(success=False)
+        invoker = SkillInvoker(mcp)
+        for _ in range(2):
+            invoke(invoker, "symptom-analyzer", symptom="头痛")
+        assert len(mcp.calls) == 2
+
+    def test_expired_entry(self):
+        """测试过期条目重新查询"""
+        mcp = _CountingMCP()
+        invoker = SkillInvoker(mcp, tool_cache_ttl=-1)
+        for _ in range(2):
+            invoke(invoker, "medication-advisor", drug_name="布洛芬")
+        assert len(mcp.calls) == 2
+
+
+class TestInvokeBatch:
+    """批量Skill调用测试"""
+
+    def test_mcp_calls_coalesced(self):
+        """测试并发Skill的MCP调用合并为一次批量请求"""
+        mcp = _BatchMCP()
+        invoker = SkillInvoker(mcp)
+        requests = [
+            make_request("symptom-analyzer", symptom="头痛"),
+            make_request("medication-advisor", drug_name="布洛芬"),
+            make_request("greeting-handler", "你好"),
+        ]
+        responses = asyncio.run(invoker.invoke_batch(requests))
+        assert mcp.batches == [["medical_knowledge_query", "drug_database_query"]]
+        assert [r.success for r in responses] == [True, True, True]
+
+    def test_matches_single_invoke(self):
+        """测试批量结果与逐个调用一致"""
+        batch = asyncio.run(SkillInvoker(_BatchMCP()).invoke_batch([make_request("medication-advisor", drug_name="布洛芬")]))
+        single = invoke(SkillInvoker(_CountingMCP()), "medication-advisor", drug_name="布洛芬")
+        assert batch[0].content == single.content
+
+
+class _SlowMCP(_CountingMCP):
+    """记录最大并发数的MCP客户端"""
+
+    def __init__(self):
+        super().__init__()
+        self.active = 0
+        self.peak = 0
+
+    async def call_tool(self, name, arguments):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return await super().call_tool(name, arguments)
+
+
+class TestMCPConcurrency:
+    """MCP并发上限测试"""
+
+    def test_concurrency_bounded(self):
+        """测试同时进行的MCP请求不超过上限"""
+        mcp = _SlowMCP()
+        invoker = SkillInvoker(mcp, max_concurrent_mcp=2)
+        requests = [make_request("symptom-analyzer", symptom=f"症状{i}") for i in range(6)]
+        responses = asyncio.run(invoker.invoke_batch(requests))
+        assert len(mcp.calls) == 6
+        assert mcp.peak == 2
+        assert all(r.success for r in responses)
+
+    def test_batched_concurrency_bounded(self):
+        """测试批量发送时批内同时进行的MCP请求也不超过上限"""
+        class _SlowBatchMCP(_SlowMCP):
+            def __init__(self):
+                super().__init__()
+                self.batches = []
+
+            async def call_tools_batch(self, calls):
+                self.batches.append(len(calls))
+                return list(await asyncio.gather(*(self.call_tool(name, args) for name, args in calls)))
+
+        mcp = _SlowBatchMCP()
+        invoker = SkillInvoker(mcp, max_concurrent_mcp=2)
+        requests = [make_request("symptom-analyzer", symptom=f"症状{i}") for i in range(20)]
+        responses = asyncio.run(invoker.invoke_batch(requests))
+        assert len(mcp.calls) == 20
+        assert mcp.peak == 2
+        assert max(mcp.batches) <= 2
+        assert all(r.success for r in responses)